@@ -7,17 +7,34 @@ import os
 from crewai import Agent
 from importlib import import_module
 
+from crewai_ollama_native.llm.native_ollama_llm import NativeOllamaLLM
+from crewai_ollama_native.llm.ollama_chat import settings_from_env
+
+def create_llm(**overrides) -> NativeOllamaLLM:
+    """Builds the native Ollama LLM from OLLAMA_* environment variables."""
+    return NativeOllamaLLM(**settings_from_env(**overrides))
+
+# One instance (and so one connection) shared by all agents; with keep_alive
+# the model stays loaded from one task to the next
+llm = create_llm()
+
+def agent_llm(config: dict, shared: NativeOllamaLLM):
+    """Pops the agent's LLM settings from ``config`` and returns the LLM it uses."""
+    llm_path = config.pop('llm', None)
+    # Per-agent generation options, e.g. `llm_options: {num_predict: 512}`
+    llm_options = config.pop('llm_options', None)
+    if llm_path:
+        module_path, class_name = llm_path.rsplit('.', 1)
+        return getattr(import_module(module_path), class_name)()
+    if llm_options:
+        return create_llm(options={**shared.options, **llm_options})
+    return shared
+
 # Load the YAML config
 with open(os.path.join(os.path.dirname(__file__), 'agents.yaml'), 'r') as f:
     raw_agents = yaml.safe_load(f)
 
 agents = {}
 for name, config in raw_agents.items():
-    llm_path = config.pop('llm', None)
-    if llm_path:
-        module_path, class_name = llm_path.rsplit('.', 1)
-        mod = import_module(module_path)
-        cls = getattr(mod, class_name)
-        config['llm'] = cls()
-
+    config['llm'] = agent_llm(config, llm)
     agents[name] = Agent(**config)
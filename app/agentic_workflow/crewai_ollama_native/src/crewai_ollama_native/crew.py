@@ -3,7 +3,7 @@ from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 
 
-from langchain.llms import Ollama
+from .config.agents_ollama import agent_llm, llm
 
 @CrewBase
 class ResearchCrew:
@@ -15,20 +15,23 @@ class ResearchCrew:
     # ollama_llm = Ollama(model="ollama/smollm2:135m", base_url="http://localhost:11434")
     print("ResearchCrew init")
     
+    # Agents use the NativeOllamaLLM configured in config/agents_ollama.py
     @agent
     def research_analyst_agent(self) -> Agent:
+        config = dict(self.agents_config['researcher'])
         return Agent(
-            config=self.agents_config['researcher'],
-            # llm=self.ollama_llm,
+            config=config,
+            llm=agent_llm(config, llm),
             allow_delegation=False,
             verbose=True
         )
     
     @agent
     def content_writer_agent(self) -> Agent:
+        config = dict(self.agents_config['writer'])
         return Agent(
-            config=self.agents_config['writer'],
-            # llm=self.ollama_llm,
+            config=config,
+            llm=agent_llm(config, llm),
             allow_delegation=False,
             verbose=True
         )
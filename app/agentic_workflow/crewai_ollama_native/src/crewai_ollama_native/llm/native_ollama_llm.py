@@ -1,19 +1,33 @@
-# from crewai.llm.base_llm import BaseLLM
-from crewai import BaseLLM # problem:     from crewai import BaseLLM
-# ImportError: cannot import name 'BaseLLM' from 'crewai' (/Users/wangbo-ting/miniconda3/envs/ollama_chatbox_4/lib/python3.8/site-packages/crewai/__init__.py)
-# it means crewai doesn't expose BaseLLM at top level yet (also not expose as crewai.llm.BaseLLM    )
+"""crewAI LLM backed directly by the Ollama API (no LiteLLM / LangChain).
 
-import ollama
+The requests, streaming and stats live in ``OllamaChat`` (see ollama_chat.py);
+this class adds the crewAI ``BaseLLM`` interface on top.
+"""
+from typing import Optional
 
-class NativeOllamaLLM(BaseLLM):
-    def __init__(self, model='smollm2', system_prompt='You are a helpful assistant.'):
-        self.model = model
-        self.system_prompt = system_prompt
+try:
+    from crewai import BaseLLM
+except ImportError:
+    # Older crewAI releases don't export BaseLLM at the top level
+    from crewai.llms.base_llm import BaseLLM
 
-    def __call__(self, prompt: str, **kwargs) -> str:
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": prompt}
-        ]
-        response = ollama.chat(model=self.model, messages=messages)
-        return response['message']['content']
+# LLMCallStats is re-exported for callers that read ``stats``
+from crewai_ollama_native.llm.ollama_chat import LLMCallStats, OllamaChat  # noqa: F401
+
+class NativeOllamaLLM(OllamaChat, BaseLLM):
+    def __init__(self, model: str = 'smollm2', temperature: Optional[float] = None, **kwargs):
+        """Takes the ``OllamaChat`` arguments (host, keep_alive, options, on_token, ...)."""
+        model = model.split('/', 1)[1] if model.startswith('ollama/') else model
+        BaseLLM.__init__(self, model=model, temperature=temperature)
+        OllamaChat.__init__(self, model=model, temperature=temperature, **kwargs)
+
+    # --- crewAI interface ---
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        # Ollama's default context length unless num_ctx is set
+        return int(self.options.get('num_ctx', 2048))
@@ -0,0 +1,195 @@
+"""Streaming chat against the Ollama API, independent of crewAI.
+
+``OllamaChat`` holds everything ``NativeOllamaLLM`` does besides the crewAI
+interface: one ``ollama.Client`` (and ``AsyncClient`` for ``acall``) per
+instance, reused for every call so the HTTP connection stays open; streamed
+responses with ``on_token`` receiving each piece as it arrives; ``keep_alive``
+and generation ``options`` (num_ctx, num_predict, temperature, ...); and an
+``LLMCallStats`` recorded in ``stats`` for every call. Clients can be passed
+in, in which case the ``ollama`` package isn't needed.
+"""
+import os
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Union
+
+Messages = Union[str, List[Dict[str, str]]]
+
+class LLMCallStats(NamedTuple):
+    model: str
+    latency_s: float # Wall time of the whole call
+    time_to_first_token_s: Optional[float]
+    prompt_tokens: int
+    completion_tokens: int
+    load_duration_s: float # Time Ollama spent loading the model (0 when it was still loaded)
+
+    @property
+    def tokens_per_second(self) -> float:
+        generation_time = self.latency_s - (self.time_to_first_token_s or 0.0)
+        return self.completion_tokens / generation_time if generation_time > 0 else 0.0
+
+def _int_env(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+def settings_from_env(**overrides) -> Dict[str, Any]:
+    """Constructor arguments from the OLLAMA_* environment variables."""
+    options = {
+        key: value for key, value in {
+            'num_ctx': _int_env('OLLAMA_NUM_CTX'),
+            'num_predict': _int_env('OLLAMA_NUM_PREDICT'),
+        }.items() if value is not None
+    }
+    settings = {
+        'model': os.getenv('OLLAMA_MODEL', 'smollm2:135m'),
+        'host': os.getenv('OLLAMA_HOST'),
+        'keep_alive': os.getenv('OLLAMA_KEEP_ALIVE', '10m'),
+        'options': options,
+    }
+    settings.update(overrides)
+    return settings
+
+class OllamaChat:
+    def __init__(
+        self,
+        model: str = 'smollm2',
+        system_prompt: str = 'You are a helpful assistant.',
+        host: Optional[str] = None,
+        keep_alive: Union[str, float, None] = '10m',
+        options: Optional[Dict[str, Any]] = None,
+        temperature: Optional[float] = None,
+        timeout: Optional[float] = 300.0,
+        on_token: Optional[Callable[[str], None]] = None,
+        on_stats: Optional[Callable[[LLMCallStats], None]] = None,
+        max_stats: int = 1000,
+        client: Any = None,
+        async_client: Any = None,
+    ):
+        # crewAI/LiteLLM style "ollama/<model>" names are accepted too
+        self.model = model.split('/', 1)[1] if model.startswith('ollama/') else model
+        self.temperature = temperature
+        self.system_prompt = system_prompt
+        self.host = host
+        self.keep_alive = keep_alive
+        self.options = dict(options or {})
+        self.timeout = timeout
+        self.on_token = on_token
+        self.on_stats = on_stats
+        self.max_stats = max_stats
+        self.stats: List[LLMCallStats] = []
+        if client is None:
+            import ollama
+            # host=None lets the client fall back to OLLAMA_HOST
+            client = ollama.Client(host=host, timeout=timeout)
+        self.client = client
+        self._async_client = async_client
+
+    def call(
+        self,
+        messages: Messages,
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Runs one chat completion, streaming tokens to ``on_token``.
+
+        Extra keyword arguments (crewAI passes ``from_task`` and ``from_agent``)
+        are accepted and ignored.
+        """
+        started = time.perf_counter()
+        stream = self.client.chat(stream=True, **self._request(messages))
+        return self._collect(stream, started)
+
+    def __call__(self, prompt: Messages, **kwargs) -> str:
+        return self.call(prompt, **kwargs)
+
+    async def acall(
+        self,
+        messages: Messages,
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Async variant of ``call`` on a persistent ``ollama.AsyncClient``."""
+        if self._async_client is None:
+            import ollama
+            # Created on first use, so it belongs to the running event loop
+            self._async_client = ollama.AsyncClient(host=self.host, timeout=self.timeout)
+        started = time.perf_counter()
+        first_token_at = None
+        parts: List[str] = []
+        final: Any = None
+        async for chunk in await self._async_client.chat(stream=True, **self._request(messages)):
+            first_token_at = self._handle_chunk(chunk, parts, first_token_at)
+            if chunk['done']:
+                final = chunk
+        return self._finish(parts, final, started, first_token_at)
+
+    # --- Helpers ---
+    def _messages(self, messages: Messages) -> List[Dict[str, str]]:
+        if isinstance(messages, str):
+            messages = [{'role': 'user', 'content': messages}]
+        if not any(message.get('role') == 'system' for message in messages):
+            messages = [{'role': 'system', 'content': self.system_prompt}] + list(messages)
+        return messages
+
+    def _request(self, messages: Messages) -> Dict[str, Any]:
+        options = dict(self.options)
+        if self.temperature is not None:
+            options.setdefault('temperature', self.temperature)
+        stop = getattr(self, 'stop', None)
+        if stop:
+            options.setdefault('stop', list(stop))
+        return {
+            'model': self.model,
+            'messages': self._messages(messages),
+            'options': options or None,
+            'keep_alive': self.keep_alive,
+        }
+
+    def _handle_chunk(self, chunk: Any, parts: List[str], first_token_at: Optional[float]) -> Optional[float]:
+        content = chunk['message']['content'] or ''
+        if content:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(content)
+            if self.on_token is not None:
+                self.on_token(content)
+        return first_token_at
+
+    def _collect(self, stream: Any, started: float) -> str:
+        first_token_at = None
+        parts: List[str] = []
+        final: Any = None
+        for chunk in stream:
+            first_token_at = self._handle_chunk(chunk, parts, first_token_at)
+            if chunk['done']:
+                final = chunk
+        return self._finish(parts, final, started, first_token_at)
+
+    def _finish(self, parts: List[str], final: Any, started: float, first_token_at: Optional[float]) -> str:
+        final = final or {}
+        stats = LLMCallStats(
+            model=self.model,
+            latency_s=time.perf_counter() - started,
+            time_to_first_token_s=first_token_at - started if first_token_at is not None else None,
+            prompt_tokens=final.get('prompt_eval_count') or 0,
+            completion_tokens=final.get('eval_count') or 0,
+            # Ollama reports durations in nanoseconds
+            load_duration_s=(final.get('load_duration') or 0) / 1e9,
+        )
+        self.stats.append(stats)
+        del self.stats[:-self.max_stats]
+        if self.on_stats is not None:
+            self.on_stats(stats)
+        return ''.join(parts)
+
+    def total_stats(self) -> Dict[str, float]:
+        """Totals over the recorded calls."""
+        return {
+            'calls': len(self.stats),
+            'prompt_tokens': sum(s.prompt_tokens for s in self.stats),
+            'completion_tokens': sum(s.completion_tokens for s in self.stats),
+            'latency_s': sum(s.latency_s for s in self.stats),
+        }
@@ -0,0 +1,113 @@
+"""Response cache for identical chat prompts.
+
+Entries are keyed by (model, prompt, generation options). The memory tier is
+an LRU bounded by the total size of the cached responses; an optional SQLite
+tier keeps entries across restarts. Every entry expires after ``ttl`` seconds.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class ChatCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600.0, sqlite_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # key -> (response, expires_at)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        payload = json.dumps({"model": model, "prompt": prompt, "options": options or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _entry_size(key: str, response: str) -> int:
+        return len(key) + len(response.encode("utf-8"))
+
+    # --- Memory tier ---
+    def _remove(self, key: str) -> None:
+        response, _ = self._entries.pop(key)
+        self.current_bytes -= self._entry_size(key, response)
+
+    def _store(self, key: str, response: str, expires_at: float) -> None:
+        size = self._entry_size(key, response)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (response, expires_at)
+        self.current_bytes += size
+        # Evict least recently used entries until we fit again
+        while self.current_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    # --- SQLite tier (blocking, called via asyncio.to_thread) ---
+    def _db_get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT response, expires_at FROM chat_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] <= time.time():
+                self._db.execute("DELETE FROM chat_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+        return row
+
+    def _db_set(self, key: str, response: str, expires_at: float) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO chat_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, expires_at),
+            )
+            self._db.execute("DELETE FROM chat_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    # --- Public API ---
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._remove(key)
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._db_get, key)
+            if row is not None:
+                # Promote to the memory tier
+                self._store(key, row[0], row[1])
+                self.hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, response: str) -> None:
+        expires_at = time.time() + self.ttl
+        self._store(key, response, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._db_set, key, response, expires_at)
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
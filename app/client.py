@@ -0,0 +1,58 @@
+"""Async Python client for the chatbox API.
+
+Meant for scripts such as offline evaluations::
+
+    async with ChatboxClient("http://localhost:8000") as chatbox:
+        async for result in chatbox.chat_batch([{"message": "Hi", "model": "llama3"}]):
+            print(result["index"], result.get("response") or result["error"])
+"""
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+import httpx
+
+class ChatboxClient:
+    def __init__(self, base_url: str = "http://localhost:8000", timeout: float = 600.0, client: Optional[httpx.AsyncClient] = None):
+        # An existing client (e.g. one bound to the app in tests) can be passed in
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(base_url=base_url, timeout=timeout)
+
+    async def __aenter__(self) -> "ChatboxClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def chat(self, message: str, model: str, **fields: Any) -> Dict[str, Any]:
+        """Sends one non-streaming chat request and returns the JSON reply."""
+        response = await self._client.post("/api/chat", json={"message": message, "model": model, **fields})
+        response.raise_for_status()
+        return response.json()
+
+    async def chat_batch(
+        self,
+        requests: Iterable[Dict[str, Any]],
+        max_concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yields one result per request as soon as it completes (not in submission order).
+
+        Every result carries the ``index`` of its request; failed items have
+        ``error`` and ``status`` instead of ``response``.
+        """
+        body: Dict[str, Any] = {"requests": list(requests)}
+        if max_concurrency is not None:
+            body["max_concurrency"] = max_concurrency
+        if deadline is not None:
+            body["deadline"] = deadline
+        async with self._client.stream("POST", "/api/chat/batch", json=body) as response:
+            if response.status_code != 200:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
@@ -0,0 +1,241 @@
+"""Long-lived worker processes that run research crews in-process.
+
+Spawning ``crewai run`` pays interpreter startup, the crewai/langchain import
+and uv project resolution on every request. Workers import the crew classes
+once at startup and then call ``kickoff()`` directly.
+"""
+import asyncio
+import contextlib
+import datetime
+import importlib
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+# backend -> (crew project / package name, crew class name)
+CREW_PROJECTS = {
+    "ollama": ("test_ollama_agent", "TestOllamaAgent"),
+    "gemini": ("test_gemini_agent", "TestGeminiAgent"),
+}
+
+class CrewUnavailableError(Exception):
+    """Raised when a crew cannot be imported in the worker processes."""
+
+class CrewExecutionError(Exception):
+    """Raised when a crew run fails inside a worker."""
+
+# --- Worker process side ---
+_crew_classes: Dict[str, type] = {}
+_import_errors: Dict[str, str] = {}
+
+def _init_worker(research_path: str) -> None:
+    """Imports all crew classes once per worker process."""
+    for backend, (package, class_name) in CREW_PROJECTS.items():
+        src_path = os.path.join(research_path, package, "src")
+        if src_path not in sys.path:
+            sys.path.insert(0, src_path)
+        try:
+            module = importlib.import_module(f"{package}.crew")
+            _crew_classes[backend] = getattr(module, class_name)
+        except Exception as e:
+            _import_errors[backend] = f"{type(e).__name__}: {e}"
+
+def _ping() -> int:
+    return os.getpid()
+
+@contextlib.contextmanager
+def _project_env(crew_project_path: str):
+    """Applies the crew project's .env for one run, as ``crewai run`` would from its directory.
+
+    Like dotenv in the subprocess, it does not override: variables that are
+    already set (e.g. by the operator) win. The ones it adds are removed
+    afterwards, so they don't carry over to the next run of another crew.
+    """
+    added = []
+    env_file_path = os.path.join(crew_project_path, ".env")
+    if os.path.exists(env_file_path):
+        from dotenv import dotenv_values
+        for key, value in dotenv_values(env_file_path).items():
+            if value is not None and key not in os.environ:
+                os.environ[key] = value
+                added.append(key)
+    try:
+        yield
+    finally:
+        for key in added:
+            os.environ.pop(key, None)
+
+class TailBuffer(io.StringIO):
+    """Text buffer keeping only the last ``limit`` characters written."""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self.truncated = 0
+
+    def write(self, text: str) -> int:
+        written = super().write(text)
+        size = self.tell()
+        if self.limit and size > 2 * self.limit:
+            # Trim in batches rather than on every write
+            tail = self.getvalue()[-self.limit:]
+            self.truncated += size - len(tail)
+            self.seek(0)
+            self.truncate()
+            super().write(tail)
+        return written
+
+    def text(self) -> str:
+        value = self.getvalue()
+        if self.limit and len(value) > self.limit:
+            self.truncated += len(value) - self.limit
+            value = value[-self.limit:]
+        return f"[{self.truncated} earlier characters omitted]\n{value}" if self.truncated else value
+
+def _run_crew(
+    backend: str,
+    model: str,
+    topic: str,
+    crew_project_path: str,
+    output_file: str,
+    events_file: Optional[str] = None,
+    max_stdout_chars: int = 0,
+    checkpoint_file: Optional[str] = None,
+) -> str:
+    """Runs one crew and returns its captured stdout (the last ``max_stdout_chars``).
+
+    ``output_file`` is relative to the crew project (crewAI strips leading
+    slashes from task output paths). Crews that accept ``events_file``
+    append progress events to it as JSON lines; with ``checkpoint_file``
+    they skip the tasks whose outputs it holds. Crews with their own
+    ``kickoff`` (e.g. to pick the report mode) are started through it.
+    """
+    crew_class = _crew_classes.get(backend)
+    if crew_class is None:
+        raise CrewUnavailableError(_import_errors.get(backend, f"No crew registered for backend '{backend}'"))
+
+    # Output files are written relative to the crew project
+    os.chdir(crew_project_path)
+    inputs = {
+        'topic': topic,
+        'current_year': str(datetime.datetime.now().year)
+    }
+    output = TailBuffer(max_stdout_chars)
+    options = {"events_file": events_file} if events_file else {}
+    if checkpoint_file:
+        options["checkpoint_file"] = checkpoint_file
+    try:
+        with _project_env(crew_project_path), contextlib.redirect_stdout(output):
+            research_crew = crew_class(model=model, output_file=output_file, **options)
+            kickoff = getattr(research_crew, "kickoff", None) or research_crew.crew().kickoff
+            kickoff(inputs=inputs)
+    except Exception as e:
+        # Only pass a plain message back; crew exceptions may not pickle
+        raise CrewExecutionError(f"An error occurred while running the crew: {e}\n{output.text()}")
+    return output.text()
+
+# --- API process side ---
+class CrewWorkerPool:
+    """Pool of warm worker processes with the crews already imported.
+
+    Every worker is a single-process executor of its own (a slot), so a run
+    that times out or crashes only replaces its own worker; runs in the
+    other slots carry on.
+    """
+
+    def __init__(self, research_path: str, max_workers: int = 1, max_stdout_chars: int = 0):
+        self.research_path = research_path
+        self.max_workers = max(1, max_workers)
+        # 0 returns the complete stdout of a run
+        self.max_stdout_chars = max_stdout_chars
+        self._slots: List[ProcessPoolExecutor] = []
+        # Indexes of the slots not running a crew
+        self._idle: Optional[asyncio.Queue] = None
+
+    def _new_worker(self) -> ProcessPoolExecutor:
+        # 'spawn' avoids forking the running event loop and its threads
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.research_path,)
+        )
+
+    def start(self) -> None:
+        if self._slots:
+            return
+        self._slots = [self._new_worker() for _ in range(self.max_workers)]
+        self._idle = asyncio.Queue()
+        for slot in range(self.max_workers):
+            self._idle.put_nowait(slot)
+
+    async def warm_up(self) -> None:
+        """Starts every worker so the crew imports happen before the first request."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(worker, _ping) for worker in self._slots))
+
+    async def run(
+        self,
+        backend: str,
+        model: str,
+        topic: str,
+        crew_project_path: str,
+        output_file: str,
+        timeout: float,
+        events_file: Optional[str] = None,
+        checkpoint_file: Optional[str] = None,
+    ) -> str:
+        """Runs a crew in a worker and returns its stdout.
+
+        Raises CrewUnavailableError if the crew cannot be imported or its
+        worker process died (callers should fall back to ``crewai run``),
+        CrewExecutionError if the run fails and asyncio.TimeoutError if it
+        takes longer than ``timeout``.
+        """
+        self.start()
+        idle = self._idle
+        slot = await idle.get()
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._slots[slot], _run_crew, backend, model, topic, crew_project_path, output_file,
+                events_file, self.max_stdout_chars, checkpoint_file)
+            return await asyncio.wait_for(future, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # The worker is still busy with the crew: kill it, the other slots keep running
+            self._replace(slot, idle)
+            raise
+        except BrokenProcessPool as e:
+            # The worker died (e.g. segfault or OOM kill); later runs get a fresh one
+            self._replace(slot, idle)
+            raise CrewUnavailableError(f"Crew worker process died: {e}") from e
+        finally:
+            idle.put_nowait(slot)
+
+    def _replace(self, slot: int, idle: asyncio.Queue) -> None:
+        if idle is not self._idle:
+            # The pool was shut down or restarted meanwhile
+            return
+        worker, self._slots[slot] = self._slots[slot], self._new_worker()
+        _stop(worker, kill=True)
+
+    def restart(self) -> None:
+        self.shutdown(kill=True)
+        self.start()
+
+    def shutdown(self, kill: bool = False) -> None:
+        workers, self._slots, self._idle = self._slots, [], None
+        for worker in workers:
+            _stop(worker, kill)
+
+def _stop(worker: ProcessPoolExecutor, kill: bool) -> None:
+    if kill:
+        # ProcessPoolExecutor has no public way to stop a busy worker
+        for process in list((worker._processes or {}).values()):
+            process.kill()
+    worker.shutdown(wait=not kill, cancel_futures=True)
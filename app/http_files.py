@@ -0,0 +1,230 @@
+"""Conditional, compressed and ranged file responses.
+
+``file_response`` serves a file with a strong ETag (``If-None-Match`` gets a
+304), negotiates gzip or brotli against ``Accept-Encoding`` using compressed
+siblings that are written next to the file on first use, and answers single
+``Range`` requests with 206. Brotli is only offered if the optional
+``brotli`` package is installed.
+
+``iter_zip`` streams a zip archive of several files chunk by chunk, so the
+archive is never held in memory.
+"""
+import asyncio
+import gzip
+import hashlib
+import io
+import os
+import zipfile
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CHUNK_SIZE = 64 * 1024
+# Smaller files aren't worth a compressed copy
+MIN_COMPRESS_SIZE = 1024
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"} if brotli is not None else {"gzip": ".gz"}
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Parses Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+def choose_encoding(header: str, available: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """Picks the first of ``available`` (in order of preference) that the client accepts."""
+    accepted = accepted_encodings(header)
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak comparison, as RFC 9110 requires)."""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Returns (start, end) inclusive for a single ``bytes=`` range.
+
+    None means the header is ignored (malformed, or several ranges, which are
+    answered with the whole file); ValueError means it can't be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    first, sep, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or not sep or not (first or last):
+        return None
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and start > end:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            raise ValueError("Empty suffix range")
+    if start >= size:
+        raise ValueError("Range starts beyond the end of the file")
+    return start, min(end, size - 1)
+
+def _compress(path: str, encoding: str) -> str:
+    target = path + ENCODINGS[encoding]
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        return target
+    with open(path, "rb") as f:
+        data = f.read()
+    if encoding == "br":
+        compressed = brotli.compress(data, mode=brotli.MODE_TEXT)
+    else:
+        # mtime=0 keeps the output byte-identical for identical input
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    # Write then rename, so concurrent requests never see a partial file
+    temporary = f"{target}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(compressed)
+    os.replace(temporary, target)
+    return target
+
+async def ensure_compressed(path: str, encoding: str) -> str:
+    """Returns the path of the compressed sibling, creating it if needed."""
+    return await asyncio.to_thread(_compress, path, encoding)
+
+async def iter_file(path: str, start: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = await asyncio.to_thread(f.read, CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+async def file_response(
+    request: Request,
+    path: str,
+    etag_hash: str,
+    media_type: str,
+    headers: Optional[Dict[str, str]] = None,
+    compress: bool = True,
+) -> Response:
+    """Serves ``path`` honouring If-None-Match, Accept-Encoding and Range.
+
+    ``etag_hash`` identifies the content (e.g. its sha256); compressed
+    representations get their own ETag derived from it.
+    """
+    size = await asyncio.to_thread(os.path.getsize, path)
+    headers = dict(headers or {})
+    headers["Accept-Ranges"] = "bytes"
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    identity_etag = f'"{etag_hash}"'
+    if range_header and (not if_range or if_range == identity_etag):
+        # Ranges are served from the uncompressed file
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers.update({
+                "ETag": identity_etag,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            })
+            return StreamingResponse(iter_file(path, start, end - start + 1), status_code=206,
+                                     media_type=media_type, headers=headers)
+
+    encoding = None
+    if compress and size >= MIN_COMPRESS_SIZE:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    etag = f'"{etag_hash}-{encoding}"' if encoding else identity_etag
+    headers["ETag"] = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        path = await ensure_compressed(path, encoding)
+        headers["Content-Encoding"] = encoding
+        size = await asyncio.to_thread(os.path.getsize, path)
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(iter_file(path), media_type=media_type, headers=headers)
+
+class _ZipBuffer(io.RawIOBase):
+    """Write-only, unseekable sink collecting what ZipFile writes until it is taken."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def iter_zip(entries: List[Tuple[str, str]]) -> Iterator[bytes]:
+    """Yields a deflated zip archive of (path, name in archive) pairs piece by piece.
+
+    Blocking: iterate it in a thread (StreamingResponse does for plain iterators).
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path, name in entries:
+            with open(path, "rb") as source, archive.open(name, "w") as target:
+                for block in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    target.write(block)
+                    data = buffer.take()
+                    if data:
+                        yield data
+    # Rest of the last entry and the central directory
+    yield buffer.take()
@@ -0,0 +1,163 @@
+"""Structured JSON logging that keeps I/O off the event loop.
+
+Log calls only put the record on a queue; a ``QueueListener`` thread formats
+it as one JSON object per line and writes it to stdout. Every record carries
+the id of the HTTP request it belongs to (from the ``X-Request-ID`` header or
+generated), including records from tasks started while handling it. Long
+messages and fields, such as crew output, are truncated before being queued.
+
+Configuration:
+  LOG_LEVEL           root level (default INFO)
+  LOG_LEVELS          per-module levels, e.g. "app.main=DEBUG,httpx=WARNING"
+  LOG_MAX_FIELD_CHARS longest message / field kept (default 2000)
+  LOG_QUEUE_SIZE      records buffered before new ones are dropped (default 10000)
+"""
+import atexit
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+from typing import Dict, List, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+def truncate(value: str, limit: int = LOG_MAX_FIELD_CHARS) -> str:
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}...[truncated {len(value) - limit} chars]"
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that tags, truncates and drops instead of blocking."""
+
+    def __init__(self, log_queue: queue.Queue, max_field_chars: int = LOG_MAX_FIELD_CHARS):
+        super().__init__(log_queue)
+        self.max_field_chars = max_field_chars
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Runs on the calling thread: resolve everything that depends on its context
+        record = copy.copy(record)
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        record.msg = truncate(record.getMessage(), self.max_field_chars)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for key, value in list(vars(record).items()):
+            if key not in _STANDARD_ATTRS and isinstance(value, str):
+                setattr(record, key, truncate(value, self.max_field_chars))
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[logging.handlers.QueueListener] = None
+# Root handlers from before setup_logging, put back by shutdown_logging
+_previous_handlers: List[logging.Handler] = []
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parses "module=LEVEL,other=LEVEL" into a dict."""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging(level: str = LOG_LEVEL, module_levels: str = LOG_LEVELS) -> None:
+    """Routes all logging through the JSON queue handler (safe to call twice).
+
+    Called by the app's lifespan rather than at import, so importing the app
+    (e.g. in tests) leaves logging alone; pair it with ``shutdown_logging``.
+    """
+    global _listener, _previous_handlers
+    root = logging.getLogger()
+    root.setLevel(level)
+    for name, module_level in parse_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    _previous_handlers = root.handlers
+    root.handlers = [AsyncQueueHandler(log_queue)]
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Flushes queued records, stops the writer thread and restores the root handlers."""
+    global _listener, _previous_handlers
+    if _listener is not None:
+        logging.getLogger().handlers = _previous_handlers
+        _previous_handlers = []
+        _listener.stop()
+        _listener = None
+        atexit.unregister(shutdown_logging)
+
+class RequestIdMiddleware:
+    """ASGI middleware binding a request id to everything logged for a request.
+
+    An incoming ``X-Request-ID`` header is reused, otherwise one is generated;
+    it is echoed back in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
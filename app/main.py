@@ -1,20 +1,223 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Awaitable, NamedTuple
 import os
+import json
 import subprocess
 import shlex
-import re # <--- Add re for regex substitution
+import re
 import datetime
+import glob
+import hashlib
 import uuid # For unique filenames
-import shutil # For renaming files
+import asyncio
+import codecs
+import time
+import logging
+from contextlib import asynccontextmanager
+from app.research_jobs import ResearchJobManager, JobQueueFullError, current_job, emit_progress
+from app.crew_workers import CrewWorkerPool, CrewUnavailableError, CrewExecutionError, TailBuffer
+from app.model_registry import ModelRegistry
+from app.chat_cache import ChatCache
+from app.singleflight import SingleFlight, StreamFanout
+from app.scheduler import ModelScheduler, SchedulerRejectedError, QueueFullError
+from app.ollama_pool import OllamaPool, NoBackendAvailableError
+from app.report_store import ReportStore
+from app.research_checkpoints import CheckpointStore
+from app.sessions import ChatSession, SessionStore
+from app import metrics
+from app.logging_config import setup_logging, shutdown_logging, RequestIdMiddleware
+from app.http_files import file_response, file_sha256, iter_zip
+from app.static_assets import StaticAssets
 
-app = FastAPI(title="Ollama Chatbox API")
+OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
+# Comma-separated Ollama hosts to balance chat requests across (defaults to OLLAMA_API_URL)
+OLLAMA_API_URLS = os.getenv("OLLAMA_API_URLS", OLLAMA_API_URL).split(",")
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))
+OLLAMA_EJECT_AFTER = int(os.getenv("OLLAMA_EJECT_AFTER", "3"))
+OLLAMA_EJECT_SECONDS = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))
+OLLAMA_AFFINITY_WEIGHT = float(os.getenv("OLLAMA_AFFINITY_WEIGHT", "2"))
+# How long Ollama keeps a model (and a session's prompt cache) loaded after a chat turn
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+# Connection pool for all Ollama traffic (one client for the whole app lifetime)
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "100"))
+OLLAMA_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "30"))
+# Per-route timeouts in seconds
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_CHAT_TIMEOUT = float(os.getenv("OLLAMA_CHAT_TIMEOUT", "30"))
+OLLAMA_MODELS_TIMEOUT = float(os.getenv("OLLAMA_MODELS_TIMEOUT", "10"))
+# Research job engine
+RESEARCH_MAX_CONCURRENCY = int(os.getenv("RESEARCH_MAX_CONCURRENCY", "2"))
+RESEARCH_MAX_PENDING = int(os.getenv("RESEARCH_MAX_PENDING", "20"))
+RESEARCH_TIMEOUT = float(os.getenv("RESEARCH_TIMEOUT", "300"))
+RESEARCH_JOB_TTL = float(os.getenv("RESEARCH_JOB_TTL", "3600"))
+# 'worker' runs crews in warm worker processes, 'subprocess' spawns `crewai run` per request
+RESEARCH_EXECUTION_MODE = os.getenv("RESEARCH_EXECUTION_MODE", "worker").lower()
+RESEARCH_WORKERS = int(os.getenv("RESEARCH_WORKERS", str(RESEARCH_MAX_CONCURRENCY)))
+# Only the end of the crew's stdout is kept for `stdout_result` (0 keeps all of it)
+RESEARCH_STDOUT_MAX_CHARS = int(os.getenv("RESEARCH_STDOUT_MAX_CHARS", "65536"))
+RESEARCH_EVENTS_POLL = float(os.getenv("RESEARCH_EVENTS_POLL", "0.5"))
+RESEARCH_EVENTS_KEEPALIVE = float(os.getenv("RESEARCH_EVENTS_KEEPALIVE", "15"))
+# Model list cache (seconds)
+MODELS_CACHE_TTL = float(os.getenv("MODELS_CACHE_TTL", "60"))
+MODELS_STALE_TTL = float(os.getenv("MODELS_STALE_TTL", "300"))
+MODELS_ERROR_TTL = float(os.getenv("MODELS_ERROR_TTL", "5"))
+# Chat response cache (opt-in)
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+CHAT_CACHE_MAX_BYTES = int(os.getenv("CHAT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "3600"))
+CHAT_CACHE_SQLITE_PATH = os.getenv("CHAT_CACHE_SQLITE_PATH") # Optional on-disk tier
+# Attach identical concurrent requests to one upstream call / crew job
+# (chat requests only when sampling is deterministic, see is_deterministic)
+CHAT_COALESCE = os.getenv("CHAT_COALESCE", "true").lower() in ("1", "true", "yes")
+RESEARCH_COALESCE = os.getenv("RESEARCH_COALESCE", "true").lower() in ("1", "true", "yes")
+# Multi-turn chat sessions
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "2048"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))
+# Batch chat endpoint
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "1000"))
+CHAT_BATCH_MAX_CONCURRENCY = int(os.getenv("CHAT_BATCH_MAX_CONCURRENCY", "8"))
+CHAT_BATCH_DEADLINE = float(os.getenv("CHAT_BATCH_DEADLINE", "600"))
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "reports"))
+REPORT_RETENTION_DAYS = float(os.getenv("REPORT_RETENTION_DAYS", "30")) # 0 keeps reports forever
+REPORT_MAX_COUNT = int(os.getenv("REPORT_MAX_COUNT", "0")) # 0 means no limit
+REPORT_GC_INTERVAL = float(os.getenv("REPORT_GC_INTERVAL", "3600"))
+REPORT_ARCHIVE_MAX_ITEMS = int(os.getenv("REPORT_ARCHIVE_MAX_ITEMS", "100"))
+STATIC_MEMORY_MAX_BYTES = int(os.getenv("STATIC_MEMORY_MAX_BYTES", str(1024 * 1024))) # Larger files are streamed from disk
+RESEARCH_CACHE_TTL = float(os.getenv("RESEARCH_CACHE_TTL", "21600")) # 0 disables the research cache
+CHECKPOINTS_DIR = os.getenv("CHECKPOINTS_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "checkpoints"))
+RESEARCH_CHECKPOINT_TTL = float(os.getenv("RESEARCH_CHECKPOINT_TTL", "86400"))
+# Admission control in front of Ollama
+SCHEDULER_PER_MODEL_CONCURRENCY = int(os.getenv("SCHEDULER_PER_MODEL_CONCURRENCY", "2"))
+# Different models generating at once per backend (0 = no limit); follows Ollama's own
+# OLLAMA_MAX_LOADED_MODELS when that is set
+SCHEDULER_MAX_ACTIVE_MODELS = int(os.getenv("SCHEDULER_MAX_ACTIVE_MODELS", os.getenv("OLLAMA_MAX_LOADED_MODELS", "0")))
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "100"))
+SCHEDULER_QUEUE_TIMEOUT = float(os.getenv("SCHEDULER_QUEUE_TIMEOUT", "30"))
+SCHEDULER_SWITCH_AFTER = float(os.getenv("SCHEDULER_SWITCH_AFTER", "5"))
+
+logger = logging.getLogger(__name__)
+
+def create_ollama_client() -> httpx.AsyncClient:
+    """Creates the pooled keep-alive client used for all Ollama requests."""
+    limits = httpx.Limits(
+        max_connections=OLLAMA_MAX_CONNECTIONS,
+        max_keepalive_connections=OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+    )
+    # Default timeout only applies to connect; each route passes its own read timeout
+    timeout = httpx.Timeout(OLLAMA_CHAT_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+def route_timeout(seconds: float) -> httpx.Timeout:
+    """Builds a per-route timeout that keeps the shared connect timeout."""
+    return httpx.Timeout(seconds, connect=OLLAMA_CONNECT_TIMEOUT)
+
+BASE_RESEARCH_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "research"))
+crew_workers = CrewWorkerPool(BASE_RESEARCH_PATH, max_workers=RESEARCH_WORKERS, max_stdout_chars=RESEARCH_STDOUT_MAX_CHARS)
+model_registry = ModelRegistry(ttl=MODELS_CACHE_TTL, stale_ttl=MODELS_STALE_TTL, error_ttl=MODELS_ERROR_TTL)
+chat_cache = ChatCache(
+    max_bytes=CHAT_CACHE_MAX_BYTES,
+    ttl=CHAT_CACHE_TTL,
+    sqlite_path=CHAT_CACHE_SQLITE_PATH
+) if CHAT_CACHE_ENABLED else None
+chat_flights = SingleFlight()
+chat_streams = StreamFanout()
+ollama_pool = OllamaPool(
+    OLLAMA_API_URLS,
+    eject_after=OLLAMA_EJECT_AFTER,
+    eject_seconds=OLLAMA_EJECT_SECONDS,
+    affinity_weight=OLLAMA_AFFINITY_WEIGHT,
+    check_timeout=OLLAMA_CONNECT_TIMEOUT
+)
+sessions = SessionStore(token_budget=SESSION_TOKEN_BUDGET, max_sessions=SESSION_MAX, ttl=SESSION_TTL)
+scheduler = ModelScheduler(
+    per_model_concurrency=SCHEDULER_PER_MODEL_CONCURRENCY,
+    max_queue=SCHEDULER_MAX_QUEUE,
+    max_active_models=SCHEDULER_MAX_ACTIVE_MODELS,
+    queue_timeout=SCHEDULER_QUEUE_TIMEOUT,
+    switch_after=SCHEDULER_SWITCH_AFTER,
+    backends=len(ollama_pool.backends)
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    app.state.ollama_client = create_ollama_client()
+    # Warm the model list so the first page load doesn't wait on Ollama
+    prefetch = asyncio.create_task(model_registry.refresh(lambda: fetch_models(app.state.ollama_client)))
+    health_checks = None
+    if len(ollama_pool.backends) > 1:
+        # With a single backend there is nothing to route around
+        health_checks = asyncio.create_task(
+            ollama_pool.run_health_checks(app.state.ollama_client, OLLAMA_HEALTH_INTERVAL)
+        )
+    report_gc = asyncio.create_task(get_report_store().run_gc(REPORT_GC_INTERVAL))
+    checkpoint_gc = asyncio.create_task(get_checkpoint_store().run_gc(REPORT_GC_INTERVAL))
+    if RESEARCH_EXECUTION_MODE == "worker":
+        # Pay the crewai import cost once at startup, not on the first request
+        try:
+            await crew_workers.warm_up()
+        except Exception as e:
+            logger.warning("Could not start crew worker processes: %s", e)
+    try:
+        yield
+    finally:
+        prefetch.cancel()
+        if health_checks is not None:
+            health_checks.cancel()
+        report_gc.cancel()
+        checkpoint_gc.cancel()
+        await model_registry.aclose()
+        await research_jobs.shutdown()
+        crew_workers.shutdown(kill=True)
+        client = getattr(app.state, "ollama_client", None)
+        app.state.ollama_client = None
+        if client is not None:
+            await client.aclose()
+        shutdown_logging()
+
+async def get_ollama_client(request: Request) -> httpx.AsyncClient:
+    """Dependency returning the shared Ollama client.
+
+    Tests can replace it via ``app.dependency_overrides[get_ollama_client]``.
+    The client is created lazily if the lifespan hook has not run
+    (e.g. a TestClient used outside of a ``with`` block).
+    """
+    client = getattr(request.app.state, "ollama_client", None)
+    if client is None:
+        client = create_ollama_client()
+        request.app.state.ollama_client = client
+    return client
+
+def get_report_store() -> ReportStore:
+    """Returns the report store, opening it on first use rather than at import.
+
+    Tests can point it at a temporary directory via ``app.state.report_store``.
+    """
+    store = getattr(app.state, "report_store", None)
+    if store is None:
+        store = ReportStore(REPORTS_DIR, retention_days=REPORT_RETENTION_DAYS, max_reports=REPORT_MAX_COUNT)
+        app.state.report_store = store
+    return store
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Returns the research checkpoint store; set ``app.state.checkpoint_store`` to replace it."""
+    store = getattr(app.state, "checkpoint_store", None)
+    if store is None:
+        store = CheckpointStore(CHECKPOINTS_DIR, ttl=RESEARCH_CHECKPOINT_TTL)
+        app.state.checkpoint_store = store
+    return store
+
+app = FastAPI(title="Ollama Chatbox API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -25,144 +228,807 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.add_middleware(metrics.MetricsMiddleware)
+# Outermost, so the request id is bound for everything below (including metrics)
+app.add_middleware(RequestIdMiddleware)
+
+# Static files: loaded, hashed and compressed once at startup
+static_assets = StaticAssets("app/static", max_memory_bytes=STATIC_MEMORY_MAX_BYTES)
+
+@app.get("/static/{name:path}")
+async def static_file(name: str, request: Request):
+    return await static_assets.response(request, name)
 
 class ChatRequest(BaseModel):
     message: str
     model: str = "smollm2:135m"  # default model
     stream: bool = False
+    options: Optional[Dict[str, Any]] = None # Ollama generation options (temperature, num_predict, ...)
+    session_id: Optional[str] = Field(None, max_length=128) # From POST /api/sessions; keeps the history server-side
 
 class ChatResponse(BaseModel):
     response: str
     model: str
+    session_id: Optional[str] = None
+
+class ChatBatchRequest(BaseModel):
+    requests: List[ChatRequest] = Field(..., min_length=1, max_length=CHAT_BATCH_MAX_ITEMS)
+    max_concurrency: Optional[int] = Field(None, ge=1) # Capped by CHAT_BATCH_MAX_CONCURRENCY
+    deadline: Optional[float] = Field(None, gt=0) # Seconds for the whole batch, capped by CHAT_BATCH_DEADLINE
+
+class SessionCreateRequest(BaseModel):
+    model: str = "smollm2:135m"
+
+class SessionResponse(BaseModel):
+    session_id: str
+    model: str
+    messages: List[Dict[str, str]]
+    tokens: int # Estimated size of the stored history
 
 class ResearchRequest(BaseModel):
     topic: str
     model: str # Model selected in UI
     backend: str # Backend selected in UI ('ollama' or 'gemini')
+    force_refresh: bool = False # Run the crew even if a recent report is cached
+    resume_job_id: Optional[str] = None # Reuse the finished tasks of this failed job (set by /resume)
 
 class ResearchResponse(BaseModel):
     stdout_result: Optional[str] = None
     report_content: Optional[str] = None
     report_filename: Optional[str] = None
+    report_id: Optional[str] = None # Set once the report is in the report store
+    cached: bool = False # True if a stored report was returned instead of running the crew
+    resumable: bool = False # True if the run failed after finishing tasks; see /api/research/jobs/{id}/resume
     error: Optional[str] = None
     model: str # Will reflect the requested model/backend
 
-OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
-# Set base URL for Ollama client (if still needed elsewhere, otherwise handled by research module)
-# Check if this is still required or if research/llm_init.py handles it sufficiently
-# os.environ["OLLAMA_BASE_URL"] = OLLAMA_API_URL.replace("/api/generate", "")
+class ResearchJobResponse(BaseModel):
+    job_id: str
+    status: str # 'queued', 'running', 'completed' or 'failed'
+    model: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    subscribers: int = 1 # Identical requests attached to this job
+    error: Optional[str] = None # Set when the job itself failed
+    result: Optional[ResearchResponse] = None # Set once the job has finished
 
 @app.get("/")
-async def read_root():
-    return FileResponse("app/static/index.html")
+async def read_root(request: Request):
+    return await static_assets.response(request, static_assets.index)
+
+def generate_payload(request: ChatRequest, stream: bool) -> Dict[str, Any]:
+    """Builds the Ollama /api/generate request body."""
+    payload = {
+        "model": request.model,
+        "prompt": request.message,
+        "stream": stream
+    }
+    if request.options:
+        payload["options"] = request.options
+    return payload
+
+def chat_payload(request: ChatRequest, messages: List[Dict[str, str]], stream: bool) -> Dict[str, Any]:
+    """Builds the Ollama /api/chat request body for a session turn."""
+    payload = {
+        "model": request.model,
+        "messages": messages,
+        "stream": stream,
+        # Keep the model loaded so the next turn can reuse the evaluated prompt
+        "keep_alive": OLLAMA_KEEP_ALIVE
+    }
+    if request.options:
+        payload["options"] = request.options
+    return payload
+
+class ChatStream(NamedTuple):
+    """An open upstream Ollama stream."""
+    upstream: httpx.Response
+    backend: Any # OllamaBackend serving the stream
+    close: Callable[[], Awaitable[None]] # Closes the stream and frees the scheduler slot
+    model: str
+    started_at: float # time.perf_counter() when the request was sent
+
+async def relay_ndjson(stream: ChatStream, on_complete=None):
+    """Yields Ollama's NDJSON chunks one line at a time.
+
+    The next line is only pulled from Ollama after the previous one has been
+    sent to the client, so a slow reader applies backpressure upstream.
+    ``on_complete`` is awaited with the full response text once Ollama
+    reports ``done``. Only lines that parse as JSON are passed on; a broken
+    stream ends with an error chunk.
+    """
+    parts = []
+    first_token = True
+    try:
+        async for line in stream.upstream.aiter_lines():
+            if line.strip():
+                chunk = json.loads(line)
+                yield line + "\n"
+                if first_token:
+                    first_token = False
+                    metrics.OLLAMA_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - stream.started_at, model=stream.model)
+                # /api/generate chunks carry 'response', /api/chat chunks a 'message'
+                parts.append(chunk.get("response") or chunk.get("message", {}).get("content", ""))
+                if chunk.get("done"):
+                    metrics.observe_generation(stream.model, chunk, time.perf_counter() - stream.started_at)
+                    if on_complete is not None:
+                        await on_complete("".join(parts))
+    except (httpx.HTTPError, ValueError) as e:
+        # ValueError: Ollama sent a line that is not JSON
+        metrics.OLLAMA_ERRORS.inc(model=stream.model, reason="stream")
+        error_detail = f"Error while streaming from Ollama: {str(e)}"
+        logger.error(error_detail, extra={"model": stream.model})
+        yield json.dumps({"error": error_detail, "done": True}) + "\n"
+
+async def relay_chat_ndjson(stream: ChatStream, on_complete=None):
+    """Relays /api/chat chunks with a 'response' field added, as the UI expects."""
+    async for line in relay_ndjson(stream, on_complete):
+        chunk = json.loads(line)
+        if "message" in chunk:
+            chunk["response"] = chunk["message"].get("content", "")
+        yield json.dumps(chunk) + "\n"
+
+async def acquire_model_slot(model: str) -> float:
+    """Waits for a scheduler slot, turning rejections into 429/503 responses."""
+    # Slots are per backend; the pool spreads the admitted requests over them
+    scheduler.set_backends(ollama_pool.available_count())
+    try:
+        with metrics.OLLAMA_QUEUE_WAIT.time(model=model):
+            granted_at = await scheduler.acquire(model)
+    except SchedulerRejectedError as e:
+        full = isinstance(e, QueueFullError)
+        metrics.SCHEDULER_REJECTIONS.inc(reason="queue_full" if full else "queue_timeout")
+        logger.warning("Scheduler rejected request: %s", e, extra={"model": model})
+        raise HTTPException(status_code=429 if full else 503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    metrics.OLLAMA_IN_FLIGHT.inc(model=model)
+    return granted_at
+
+def release_model_slot(model: str, granted_at: float) -> None:
+    metrics.OLLAMA_IN_FLIGHT.dec(model=model)
+    scheduler.set_backends(ollama_pool.available_count())
+    scheduler.release(model, granted_at)
+
+async def open_chat_stream(
+    request: ChatRequest,
+    client: httpx.AsyncClient,
+    path: str = "/api/generate",
+    payload: Optional[Dict[str, Any]] = None,
+    prefer: Optional[str] = None
+) -> ChatStream:
+    """Starts a streaming Ollama generation; raises HTTPException if it can't."""
+    if payload is None:
+        payload = generate_payload(request, stream=True)
+    granted_at = await acquire_model_slot(request.model)
+    started_at = time.perf_counter()
+    try:
+        upstream, backend = await send_chat_stream(request, client, path, payload, prefer)
+    except BaseException:
+        release_model_slot(request.model, granted_at)
+        raise
+
+    async def close():
+        try:
+            await upstream.aclose()
+        finally:
+            ollama_pool.release(backend, request.model)
+            release_model_slot(request.model, granted_at)
+
+    return ChatStream(upstream, backend, close, request.model, started_at)
+
+async def send_to_backend(model: str, send, prefer: Optional[str] = None):
+    """Sends a request to the best Ollama backend for ``model``.
+
+    ``send`` is awaited with the chosen backend and returns the httpx
+    response. Connection failures fail over to the next backend, since
+    nothing reached Ollama yet, and so does a 404 from a host that doesn't
+    have the model pulled (the last host's 404 is returned as is). Returns
+    the response and the backend, which the caller must hand back via
+    ``ollama_pool.release``.
+    """
+    tried = []
+    last_error = None
+    while True:
+        try:
+            backend = ollama_pool.pick(model, exclude=tried, prefer=prefer)
+        except NoBackendAvailableError:
+            error_detail = f"Error communicating with Ollama: {str(last_error)}"
+            logger.error(error_detail, extra={"model": model})
+            raise HTTPException(status_code=503, detail=error_detail)
+        tried.append(backend)
+        try:
+            response = await send(backend)
+            if response.status_code == 404 and len(tried) < len(ollama_pool.backends):
+                await response.aclose()
+                metrics.OLLAMA_ERRORS.inc(model=model, reason="model_missing")
+                ollama_pool.model_missing(backend, model)
+                ollama_pool.release(backend)
+                logger.warning("Model not found on Ollama backend, trying the next one",
+                               extra={"model": model, "backend": backend.url})
+                continue
+            return response, backend
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            metrics.OLLAMA_ERRORS.inc(model=model, reason="connect")
+            ollama_pool.release(backend, failed=True)
+            logger.warning("Could not connect to Ollama backend: %s", e, extra={"backend": backend.url})
+            last_error = e
+        # TimeoutException is a RequestError, so it has to be handled first
+        except httpx.TimeoutException as e:
+            metrics.OLLAMA_ERRORS.inc(model=model, reason="timeout")
+            ollama_pool.release(backend, failed=True)
+            error_detail = f"Timeout while waiting for Ollama response: {str(e)}"
+            logger.error(error_detail, extra={"model": model, "backend": backend.url})
+            raise HTTPException(status_code=504, detail=error_detail)
+        except httpx.RequestError as e:
+            metrics.OLLAMA_ERRORS.inc(model=model, reason="request")
+            ollama_pool.release(backend, failed=True)
+            error_detail = f"Error communicating with Ollama: {str(e)}"
+            logger.error(error_detail, extra={"model": model, "backend": backend.url})
+            raise HTTPException(status_code=503, detail=error_detail)
+        except BaseException:
+            ollama_pool.release(backend)
+            raise
+
+async def send_chat_stream(
+    request: ChatRequest,
+    client: httpx.AsyncClient,
+    path: str,
+    payload: Dict[str, Any],
+    prefer: Optional[str] = None
+):
+    """Opens the upstream stream; returns the response and its backend."""
+    async def send(backend):
+        url = backend.url + path
+        logger.debug("Streaming request to Ollama", extra={"url": url, "model": request.model})
+        upstream_request = client.build_request(
+            "POST",
+            url,
+            json=payload,
+            timeout=route_timeout(OLLAMA_CHAT_TIMEOUT)
+        )
+        return await client.send(upstream_request, stream=True)
+
+    upstream, backend = await send_to_backend(request.model, send, prefer)
+    if upstream.status_code != 200:
+        body = await upstream.aread()
+        await upstream.aclose()
+        ollama_pool.release(backend, failed=upstream.status_code >= 500)
+        metrics.OLLAMA_ERRORS.inc(model=request.model, reason=f"status_{upstream.status_code}")
+        error_detail = f"Ollama API error: Status {upstream.status_code} - {body.decode(errors='replace')}"
+        logger.error(error_detail, extra={"model": request.model, "backend": backend.url})
+        raise HTTPException(status_code=upstream.status_code, detail=error_detail)
+    return upstream, backend
+
+def is_deterministic(options: Optional[Dict[str, Any]]) -> bool:
+    """True if Ollama gives the same reply to the same prompt: temperature 0 or a fixed seed."""
+    options = options or {}
+    return options.get("temperature") == 0 or options.get("seed") is not None
+
+def should_coalesce(request: ChatRequest) -> bool:
+    """Sampled replies differ per request, so only deterministic ones are shared."""
+    return CHAT_COALESCE and is_deterministic(request.options)
+
+async def stream_chat(request: ChatRequest, client: httpx.AsyncClient, cache_key: Optional[str] = None) -> StreamingResponse:
+    """Proxies a streaming Ollama generation as an NDJSON response."""
+    on_complete = None
+    headers = {}
+    if cache_key is not None:
+        headers["X-Cache"] = "MISS"
+        on_complete = lambda text: chat_cache.set(cache_key, text)
+
+    if should_coalesce(request):
+        # Identical concurrent requests share one upstream generation
+        async def source():
+            stream = await open_chat_stream(request, client)
+            return relay_ndjson(stream, on_complete), stream.close
+
+        flight_key = ChatCache.make_key(request.model, request.message, request.options)
+        subscription = await chat_streams.join(flight_key, source)
+        # Releases the subscription even if the client left before the body was sent
+        return StreamingResponse(
+            subscription,
+            media_type="application/x-ndjson",
+            headers=headers,
+            background=BackgroundTask(subscription.aclose)
+        )
+
+    stream = await open_chat_stream(request, client)
+    # The background task runs even when the client disconnects mid-stream,
+    # closing the upstream connection so Ollama stops generating.
+    return StreamingResponse(
+        relay_ndjson(stream, on_complete),
+        media_type="application/x-ndjson",
+        headers=headers,
+        background=BackgroundTask(stream.close)
+    )
+
+async def cached_chat_response(request: ChatRequest, cache_key: str, http_response: Response):
+    """Returns the cached reply for a chat request, or None on a miss."""
+    cached = await chat_cache.get(cache_key)
+    if cached is None:
+        return None
+    logger.debug("Chat cache hit", extra={"model": request.model})
+    if request.stream:
+        chunk = {"model": request.model, "response": cached, "done": True}
+        return StreamingResponse(
+            iter([json.dumps(chunk) + "\n"]),
+            media_type="application/x-ndjson",
+            headers={"X-Cache": "HIT"}
+        )
+    http_response.headers["X-Cache"] = "HIT"
+    return ChatResponse(response=cached, model=request.model)
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_response: Response, client: httpx.AsyncClient = Depends(get_ollama_client)):
+    if request.session_id:
+        # Conversation turns depend on the history, so they skip the cache and coalescing
+        return await session_chat(request, client)
+
+    # --- Response cache (opt-in): hits never reach Ollama ---
+    cache_key = None
+    if chat_cache is not None:
+        cache_key = ChatCache.make_key(request.model, request.message, request.options)
+        cached_response = await cached_chat_response(request, cache_key, http_response)
+        metrics.CHAT_CACHE_REQUESTS.inc(result="hit" if cached_response is not None else "miss")
+        if cached_response is not None:
+            return cached_response
+
+    if request.stream:
+        return await stream_chat(request, client, cache_key)
+
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            print(f"Sending request to Ollama: {OLLAMA_API_URL}")
-            try:
-                response = await client.post(
-                    OLLAMA_API_URL,
-                    json={
-                        "model": request.model,
-                        "prompt": request.message,
-                        "stream": request.stream
-                    }
-                )
-                
-                if response.status_code != 200:
-                    error_detail = f"Ollama API error: Status {response.status_code} - {response.text}"
-                    print(error_detail)
-                    raise HTTPException(status_code=response.status_code, detail=error_detail)
-                
-                data = response.json()
-                return ChatResponse(
-                    response=data.get("response", ""),
-                    model=request.model
-                )
-            except httpx.RequestError as e:
-                error_detail = f"Error communicating with Ollama: {str(e)}"
-                print(error_detail)
-                raise HTTPException(status_code=503, detail=error_detail)
-            except httpx.TimeoutException as e:
-                error_detail = f"Timeout while waiting for Ollama response: {str(e)}"
-                print(error_detail)
-                raise HTTPException(status_code=504, detail=error_detail)
-            
+        response_text = await complete_chat(request, client, cache_key)
+        if cache_key is not None:
+            http_response.headers["X-Cache"] = "MISS"
+        return ChatResponse(
+            response=response_text,
+            model=request.model
+        )
+    except HTTPException:
+        # Keep Ollama / scheduler status codes (and Retry-After headers)
+        raise
     except Exception as e:
         error_detail = f"Error in chat endpoint: {str(e)}, Type: {type(e)}"
-        print(error_detail)
+        logger.exception(error_detail)
         raise HTTPException(status_code=500, detail=error_detail)
 
-def update_env_model(env_file_path: str, model_name: str, backend: str):
-    """Reads a .env file, updates MODEL, prepends backend prefix, and writes it back."""
+async def complete_chat(request: ChatRequest, client: httpx.AsyncClient, cache_key: Optional[str] = None) -> str:
+    """Runs a non-streaming generation and stores the reply under ``cache_key``.
+
+    Identical concurrent requests share one generation, see should_coalesce.
+    """
+    if should_coalesce(request):
+        flight_key = ChatCache.make_key(request.model, request.message, request.options)
+        response_text = await chat_flights.do(flight_key, lambda: generate(request, client))
+    else:
+        response_text = await generate(request, client)
+
+    if cache_key is not None:
+        await chat_cache.set(cache_key, response_text)
+    return response_text
+
+async def generate(request: ChatRequest, client: httpx.AsyncClient) -> str:
+    """Runs a non-streaming Ollama generation and returns the response text."""
+    data, _ = await post_to_ollama(request, client, "/api/generate", generate_payload(request, stream=False))
+    return data.get("response", "")
+
+async def post_to_ollama(
+    request: ChatRequest,
+    client: httpx.AsyncClient,
+    path: str,
+    payload: Dict[str, Any],
+    prefer: Optional[str] = None
+):
+    """Runs a non-streaming Ollama call; returns the JSON body and the backend used."""
+    granted_at = await acquire_model_slot(request.model)
+
+    async def send(backend):
+        url = backend.url + path
+        logger.debug("Sending request to Ollama", extra={"url": url, "model": request.model})
+        return await client.post(
+            url,
+            json=payload,
+            timeout=route_timeout(OLLAMA_CHAT_TIMEOUT)
+        )
+
     try:
-        if os.path.exists(env_file_path):
-            with open(env_file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-        else:
-            print(f"Warning: .env file not found at {env_file_path}. Creating one.")
-            lines = []
-
-        # --- Construct the correct model string with prefix ---
-        # Ensure backend is lowercase for comparison
-        backend_lower = backend.lower()
-        prefixed_model_name = model_name # Default to original name if backend unknown
-
-        if backend_lower == "ollama":
-            # Prepend 'ollama/' unless it's already there (just in case)
-            if not model_name.startswith("ollama/"):
-                 prefixed_model_name = f"ollama/{model_name}"
-        elif backend_lower == "gemini":
-             # Prepend 'gemini/' unless it's already there
-            if not model_name.startswith("gemini/"):
-                prefixed_model_name = f"gemini/{model_name}"
+        started_at = time.perf_counter()
+        response, backend = await send_to_backend(request.model, send, prefer)
+        ok = response.status_code == 200
+        ollama_pool.release(backend, request.model if ok else None, failed=response.status_code >= 500)
+        if not ok:
+            metrics.OLLAMA_ERRORS.inc(model=request.model, reason=f"status_{response.status_code}")
+            error_detail = f"Ollama API error: Status {response.status_code} - {response.text}"
+            logger.error(error_detail, extra={"model": request.model, "backend": backend.url})
+            raise HTTPException(status_code=response.status_code, detail=error_detail)
+
+        data = response.json()
+        # Without streaming, the first token is ready once the model is loaded and the prompt evaluated
+        first_token_ns = (data.get("load_duration") or 0) + (data.get("prompt_eval_duration") or 0)
+        if first_token_ns:
+            metrics.OLLAMA_TIME_TO_FIRST_TOKEN.observe(first_token_ns / 1e9, model=request.model)
+        metrics.observe_generation(request.model, data, time.perf_counter() - started_at)
+        return data, backend
+    finally:
+        release_model_slot(request.model, granted_at)
+
+# --- Chat sessions ---
+async def session_chat(request: ChatRequest, client: httpx.AsyncClient):
+    """Runs one conversation turn against Ollama /api/chat.
+
+    The session lock keeps turns of one conversation in order; the turn is
+    only added to the history once the full reply has arrived.
+    """
+    session = sessions.get(request.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found. Start one with POST /api/sessions.")
+    session.model = request.model
+    await session.lock.acquire()
+    try:
+        messages = sessions.build_messages(session, request.message)
+        if request.stream:
+            stream = await open_chat_stream(
+                request, client, "/api/chat", chat_payload(request, messages, stream=True), session.backend_url
+            )
+            backend = stream.backend
         else:
-            print(f"Warning: Unknown backend '{backend}' provided for .env update. Using model name as is.")
-        # ---
-
-        updated_lines = []
-        model_updated = False
-        # Use regex to find and replace or add the MODEL line
-        model_line = f"MODEL={prefixed_model_name}\n" # <--- Target MODEL=
-
-        for line in lines:
-            # Match lines starting with optional whitespace, then MODEL, optional space, '=', any value
-            if re.match(r"^\s*MODEL\s*=", line): # <--- Target MODEL=
-                updated_lines.append(model_line)
-                model_updated = True
-                print(f"Updating existing MODEL line in {env_file_path}")
-            else:
-                # Keep other lines, ensuring they end with a newline if not empty
-                stripped_line = line.strip()
-                if stripped_line: # Avoid adding extra newlines for empty lines
-                    updated_lines.append(line.rstrip() + '\n')
+            data, backend = await post_to_ollama(
+                request, client, "/api/chat", chat_payload(request, messages, stream=False), session.backend_url
+            )
+    except BaseException:
+        session.lock.release()
+        raise
 
+    if not request.stream:
+        reply = data.get("message", {}).get("content", "")
+        sessions.record_turn(session, request.message, reply, backend.url)
+        session.lock.release()
+        return ChatResponse(response=reply, model=request.model, session_id=session.session_id)
 
-        if not model_updated:
-            print(f"Adding MODEL line to {env_file_path}")
-            updated_lines.append(model_line)
+    async def on_complete(reply: str):
+        sessions.record_turn(session, request.message, reply, backend.url)
 
-        # Write updated content back
-        final_content = "".join(updated_lines)
-        with open(env_file_path, 'w', encoding='utf-8') as f:
-            f.write(final_content)
+    async def finish():
+        try:
+            await stream.close()
+        finally:
+            session.lock.release()
 
-        print(f"Set MODEL in {env_file_path} to: {prefixed_model_name}")
-        return True, None # Success
+    return StreamingResponse(
+        relay_chat_ndjson(stream, on_complete),
+        media_type="application/x-ndjson",
+        headers={"X-Session-Id": session.session_id},
+        background=BackgroundTask(finish)
+    )
 
+# --- Batch chat ---
+async def batch_item(index: int, request: ChatRequest, client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Answers one batch item; errors are reported in the item instead of failing the batch."""
+    request = request.model_copy(update={"stream": False})
+    try:
+        if request.session_id:
+            response_text = (await session_chat(request, client)).response
+        else:
+            response_text = None
+            cache_key = None
+            if chat_cache is not None:
+                cache_key = ChatCache.make_key(request.model, request.message, request.options)
+                response_text = await chat_cache.get(cache_key)
+                metrics.CHAT_CACHE_REQUESTS.inc(result="hit" if response_text is not None else "miss")
+            if response_text is None:
+                response_text = await complete_chat(request, client, cache_key)
+        return {"index": index, "model": request.model, "response": response_text}
+    except HTTPException as e:
+        return {"index": index, "model": request.model, "error": e.detail, "status": e.status_code}
     except Exception as e:
-        error_msg = f"Error updating .env file ({env_file_path}): {str(e)}"
-        print(error_msg)
-        return False, error_msg # Failure
+        error_detail = f"Error in batch item {index}: {str(e)}"
+        logger.exception(error_detail)
+        return {"index": index, "model": request.model, "error": error_detail, "status": 500}
 
-@app.post("/api/research", response_model=ResearchResponse)
-async def research(request: ResearchRequest):
+async def run_chat_batch(batch: ChatBatchRequest, client: httpx.AsyncClient):
+    """Yields one NDJSON line per item, in completion order.
+
+    Items still unfinished at the deadline are cancelled and reported with
+    status 504. Closing the connection cancels the whole batch.
+    """
+    concurrency = min(batch.max_concurrency or CHAT_BATCH_MAX_CONCURRENCY, CHAT_BATCH_MAX_CONCURRENCY)
+    deadline = min(batch.deadline or CHAT_BATCH_DEADLINE, CHAT_BATCH_DEADLINE)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, request: ChatRequest):
+        async with semaphore:
+            return await batch_item(index, request, client)
+
+    indexes = {asyncio.create_task(run(index, request)): index for index, request in enumerate(batch.requests)}
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + deadline
+    pending = set(indexes)
+    try:
+        while pending:
+            remaining = ends_at - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=indexes.get):
+                yield json.dumps(task.result()) + "\n"
+        for task in sorted(pending, key=indexes.get):
+            task.cancel()
+            request = batch.requests[indexes[task]]
+            error = {
+                "index": indexes[task],
+                "model": request.model,
+                "error": f"Batch deadline of {deadline} seconds exceeded.",
+                "status": 504
+            }
+            yield json.dumps(error) + "\n"
+    finally:
+        for task in indexes:
+            task.cancel()
+
+@app.post("/api/chat/batch")
+async def chat_batch(batch: ChatBatchRequest, client: httpx.AsyncClient = Depends(get_ollama_client)):
+    """Answers many chat requests in one call, streaming each result as it completes."""
+    return StreamingResponse(run_chat_batch(batch, client), media_type="application/x-ndjson")
+
+def session_response(session: ChatSession) -> SessionResponse:
+    return SessionResponse(
+        session_id=session.session_id,
+        model=session.model,
+        messages=session.messages,
+        tokens=session.tokens()
+    )
+
+@app.post("/api/sessions", response_model=SessionResponse, status_code=201)
+async def create_session(request: SessionCreateRequest):
+    """Starts a conversation; its id is generated here and hard to guess."""
+    return session_response(sessions.create(request.model))
+
+@app.get("/api/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str):
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    return session_response(session)
+
+@app.delete("/api/sessions/{session_id}", status_code=204)
+async def delete_session(session_id: str):
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found.")
+    return Response(status_code=204)
+
+@app.get("/api/scheduler")
+async def scheduler_stats():
+    """Queue depth and running generations per model."""
+    return scheduler.stats()
+
+def collect_metrics() -> None:
+    """Copies queue and pool state into gauges before each scrape."""
+    metrics.SCHEDULER_QUEUE_DEPTH.set(scheduler.queue_depth())
+    for status, count in research_jobs.counts().items():
+        metrics.RESEARCH_JOBS.set(count, status=status)
+    now = time.monotonic()
+    for backend in ollama_pool.backends:
+        metrics.OLLAMA_BACKEND_OUTSTANDING.set(backend.outstanding, backend=backend.url)
+        metrics.OLLAMA_BACKEND_UP.set(1 if backend.available(now) else 0, backend=backend.url)
+
+metrics.REGISTRY.add_collector(collect_metrics)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/backends")
+async def backend_stats():
+    """Health, load and loaded models of each Ollama backend."""
+    return {"backends": ollama_pool.stats()}
+
+def prefix_model_name(model_name: str, backend: str) -> str:
+    """Returns the model name with the crewAI/litellm backend prefix (e.g. 'ollama/')."""
+    # Ensure backend is lowercase for comparison
+    backend_lower = backend.lower()
+    prefixed_model_name = model_name # Default to original name if backend unknown
+
+    if backend_lower == "ollama":
+        # Prepend 'ollama/' unless it's already there (just in case)
+        if not model_name.startswith("ollama/"):
+             prefixed_model_name = f"ollama/{model_name}"
+    elif backend_lower == "gemini":
+         # Prepend 'gemini/' unless it's already there
+        if not model_name.startswith("gemini/"):
+            prefixed_model_name = f"gemini/{model_name}"
+    else:
+        logger.warning("Unknown backend '%s' provided. Using model name as is.", backend)
+    return prefixed_model_name
+
+class CrewEventFile:
+    """Follows the progress events a crew appends to its events file (JSON lines)
+    and re-emits them on the research job."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+
+    def _read_new(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        # A line still being written is picked up on the next read
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        events = []
+        for line in data[:end].splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict) and "event" in event:
+                event.pop("id", None) # Ids are assigned by the job
+                events.append(event)
+        return events
+
+    async def forward(self) -> None:
+        for event in await asyncio.to_thread(self._read_new):
+            emit_progress(event)
+
+    async def follow(self, interval: float) -> None:
+        while True:
+            await self.forward()
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        """Forwards what is left and removes the file."""
+        await self.forward()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+async def read_stream_tail(stream: asyncio.StreamReader, limit: int) -> str:
+    """Reads a subprocess pipe to the end, keeping only the last ``limit`` characters."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = TailBuffer(limit)
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            buffer.write(decoder.decode(b"", final=True))
+            return buffer.text()
+        buffer.write(decoder.decode(chunk))
+
+async def run_crew_subprocess(
+    crew_project_path: str,
+    topic: str,
+    model: str,
+    output_file: str,
+    events_file: Optional[str] = None,
+    checkpoint_file: Optional[str] = None
+) -> str:
+    """Runs `crewai run` in the crew project and returns (the end of) its stdout.
+
+    Raises subprocess.CalledProcessError / subprocess.TimeoutExpired on failure.
+    """
+    # --- Prepare Subprocess Environment ---
+    # Everything run-specific goes through the environment, never the shared .env file
+    subprocess_env = os.environ.copy()
+    subprocess_env["RESEARCH_TOPIC"] = topic
+    subprocess_env["RESEARCH_MODEL"] = model
+    subprocess_env["RESEARCH_OUTPUT_FILE"] = output_file
+    if events_file:
+        subprocess_env["RESEARCH_EVENTS_FILE"] = events_file
+    if checkpoint_file:
+        subprocess_env["RESEARCH_CHECKPOINT_FILE"] = checkpoint_file
+    # Takes precedence over MODEL in the crew's .env (dotenv does not override)
+    subprocess_env["MODEL"] = model
+    # Propagate API keys if needed by the crew's .env setup
+    if "GOOGLE_API_KEY" in os.environ:
+        subprocess_env["GOOGLE_API_KEY"] = os.environ["GOOGLE_API_KEY"]
+    # Note: Ollama base URL is often set via OPENAI_API_BASE in the crew's .env file
+
+    # --- Execute Subprocess ---
+    command = shlex.split("crewai run")
+    logger.info("Running command: %s", " ".join(command), extra={"cwd": crew_project_path})
+
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        cwd=crew_project_path,
+        env=subprocess_env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        # Read both pipes as the crew writes them, so neither fills up and
+        # only a bounded tail of a verbose crew stays in memory
+        stdout_text, stderr_text, _ = await asyncio.wait_for(asyncio.gather(
+            read_stream_tail(process.stdout, RESEARCH_STDOUT_MAX_CHARS),
+            read_stream_tail(process.stderr, RESEARCH_STDOUT_MAX_CHARS),
+            process.wait()
+        ), timeout=RESEARCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise subprocess.TimeoutExpired(command, RESEARCH_TIMEOUT)
+    except asyncio.CancelledError:
+        # Job cancelled (e.g. on shutdown): don't leave the crew running
+        process.kill()
+        raise
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, output=stdout_text, stderr=stderr_text)
+
+    # Crew output can be hundreds of KB: debug only, and truncated by the log handler
+    logger.debug("Crew subprocess finished", extra={"stdout": stdout_text, "stderr": stderr_text})
+    return stdout_text
+
+# --- Research Cache ---
+def crew_project_dir(backend: str) -> Optional[str]:
+    agent_dir_name = {"ollama": "test_ollama_agent", "gemini": "test_gemini_agent"}.get(backend.lower())
+    return os.path.join(BASE_RESEARCH_PATH, agent_dir_name) if agent_dir_name else None
+
+def crew_config_hash(crew_project_path: str) -> str:
+    """Hashes the crew's agents.yaml and tasks.yaml, so editing the crew invalidates cached reports."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(crew_project_path, "src", "*", "config", "*.yaml"))):
+        digest.update(os.path.relpath(path, crew_project_path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+async def research_cache_key(request: ResearchRequest) -> Optional[str]:
+    """Normalized topic, model, backend and crew config; None for unknown backends."""
+    crew_project_path = crew_project_dir(request.backend)
+    if crew_project_path is None or not os.path.isdir(crew_project_path):
+        return None
+    config_hash = await asyncio.to_thread(crew_config_hash, crew_project_path)
+    return hashlib.sha256(f"{research_key(request)}|{config_hash}".encode()).hexdigest()
+
+def read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def write_json(path: str, data: Any) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+def remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def cached_research(request: ResearchRequest) -> Optional[ResearchResponse]:
+    """Returns a recent stored report for the same request, if there is one."""
+    if RESEARCH_CACHE_TTL <= 0:
+        return None
+    if request.force_refresh:
+        metrics.RESEARCH_CACHE_REQUESTS.inc(result="refresh")
+        return None
+    cache_key = await research_cache_key(request)
+    store = get_report_store()
+    record = await store.find_cached(cache_key, RESEARCH_CACHE_TTL) if cache_key else None
+    report_content = None
+    if record is not None:
+        try:
+            report_content = await asyncio.to_thread(read_text, store.full_path(record))
+        except OSError as e:
+            logger.warning("Could not read cached report: %s", e, extra={"report_id": record["id"]})
+    if report_content is None:
+        metrics.RESEARCH_CACHE_REQUESTS.inc(result="miss")
+        return None
+    metrics.RESEARCH_CACHE_REQUESTS.inc(result="hit")
+    return ResearchResponse(
+        report_content=report_content,
+        report_filename=record["filename"],
+        report_id=record["id"],
+        cached=True,
+        model=f"{request.backend}:{request.model}"
+    )
+
+async def execute_research(request: ResearchRequest) -> ResearchResponse:
+    """Runs the crew for a research request without blocking the event loop."""
     # --- Determine Crew Project Path ---
-    base_research_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "research"))
     agent_dir_name = ""
     response_model_str = f"{request.backend}:{request.model}" # Use requested info for response clarity
 
@@ -173,163 +1039,380 @@ async def research(request: ResearchRequest):
     else:
         # Handle unsupported backend - return an error response
         error_detail = f"Unsupported backend specified: {request.backend}"
-        print(error_detail)
+        logger.error(error_detail)
         # Return error via the response model, not HTTP exception directly
         return ResearchResponse(error=error_detail, model=response_model_str)
 
-    crew_project_path = os.path.join(base_research_path, agent_dir_name)
-    print(f"Selected crew project path: {crew_project_path} for backend: {request.backend}")
+    crew_project_path = os.path.join(BASE_RESEARCH_PATH, agent_dir_name)
+    logger.debug("Selected crew project path", extra={"path": crew_project_path, "backend": request.backend})
 
     if not os.path.isdir(crew_project_path):
          error_detail = f"Crew project directory not found for backend '{request.backend}' at: {crew_project_path}"
-         print(error_detail)
+         logger.error(error_detail)
          return ResearchResponse(error=error_detail, model=response_model_str)
 
-    # --- Update .env file in the selected project ---
-    env_file_path = os.path.join(crew_project_path, ".env")
-    env_updated, env_error = update_env_model(env_file_path, request.model, request.backend)
+    # --- Per-run settings: nothing shared between concurrent runs ---
+    model_name = prefix_model_name(request.model, request.backend)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    topic_slug = re.sub(r'\W+', '_', request.topic)[:50] # Basic slugify
+    unique_id = str(uuid.uuid4())[:8]
+    # The crew writes its report straight to this unique file in the crew project
+    report_final_filename = f"research_{topic_slug}_{timestamp}_{unique_id}.md"
+    # ... and its progress events to this one
+    crew_events = CrewEventFile(os.path.join(crew_project_path, f".research_events_{unique_id}.jsonl"))
 
-    if not env_updated:
-        # Return error if .env update failed
-        return ResearchResponse(error=env_error, model=response_model_str)
-
-    # --- Prepare Subprocess Environment ---
-    subprocess_env = os.environ.copy()
-    subprocess_env["RESEARCH_TOPIC"] = request.topic
-    # Propagate API keys if needed by the crew's .env setup
-    if "GOOGLE_API_KEY" in os.environ:
-        subprocess_env["GOOGLE_API_KEY"] = os.environ["GOOGLE_API_KEY"]
-    # Note: Ollama base URL is often set via OPENAI_API_BASE in the crew's .env file
-
-    # --- Execute Subprocess ---
-    command = shlex.split("crewai run")
-    print(f"Running command: {' '.join(command)} in {crew_project_path}")
+    # --- Resume: hand the tasks the failed run finished to the crew ---
+    checkpoint_file = None
+    if request.resume_job_id:
+        checkpoint = await get_checkpoint_store().load(request.resume_job_id)
+        if checkpoint is None:
+            error_detail = f"No checkpoint found for research job {request.resume_job_id}; it may have expired."
+            logger.error(error_detail)
+            return ResearchResponse(error=error_detail, model=response_model_str)
+        for task_name, output in checkpoint["tasks"].items():
+            emit_progress({"event": "task_restored", "task": task_name, "output": output})
+        checkpoint_file = os.path.join(crew_project_path, f".research_checkpoint_{unique_id}.json")
+        await asyncio.to_thread(write_json, checkpoint_file, checkpoint["tasks"])
 
+    # --- Run the crew: warm worker process first, `crewai run` as fallback ---
+    backend_label = request.backend.lower()
+    started_at = time.time()
     try:
-        process = subprocess.run(
-            command,
-            cwd=crew_project_path,
-            capture_output=True,
-            text=True,
-            env=subprocess_env,
-            check=True,
-            timeout=300
-        )
+        # Computed before the run, so the key matches the crew config that produced the report
+        cache_key = await research_cache_key(request)
+        stdout_text = None
+        follower = asyncio.create_task(crew_events.follow(RESEARCH_EVENTS_POLL))
+        try:
+            with metrics.RESEARCH_PHASE_DURATION.time(backend=backend_label, phase="crew_run"):
+                if RESEARCH_EXECUTION_MODE == "worker":
+                    try:
+                        logger.info("Running crew in worker process", extra={"backend": request.backend})
+                        stdout_text = await crew_workers.run(
+                            backend_label,
+                            model_name,
+                            request.topic,
+                            crew_project_path,
+                            report_final_filename,
+                            timeout=RESEARCH_TIMEOUT,
+                            events_file=crew_events.path,
+                            checkpoint_file=checkpoint_file
+                        )
+                    except CrewUnavailableError as e:
+                        logger.warning("In-process crew unavailable (%s), falling back to 'crewai run'", e)
+                if stdout_text is None:
+                    stdout_text = await run_crew_subprocess(
+                        crew_project_path, request.topic, model_name, report_final_filename,
+                        events_file=crew_events.path, checkpoint_file=checkpoint_file)
+        finally:
+            follower.cancel()
+            await crew_events.close()
+            if checkpoint_file:
+                await asyncio.to_thread(remove_file, checkpoint_file)
 
-        print(f"Subprocess stdout:\n{process.stdout}")
-        if process.stderr: # Only print stderr if it's not empty
-             print(f"Subprocess stderr:\n{process.stderr}")
-
-        stdout_result = process.stdout.strip()
+        stdout_result = stdout_text.strip()
         report_content = None
         read_error = None
-        report_final_filename = None # Variable for the unique filename
 
-        # --- Attempt to read and RENAME the report file ---
-        default_report_name = "report.md"
-        report_file_path = os.path.join(crew_project_path, default_report_name)
-        print(f"Checking for default report file: {report_file_path}")
+        # --- Attempt to read the report file ---
+        report_file_path = os.path.join(crew_project_path, report_final_filename)
+        logger.debug("Checking for report file", extra={"path": report_file_path})
 
         if os.path.exists(report_file_path):
             try:
-                # 1. Generate unique filename (timestamp + uuid + topic slug)
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                topic_slug = re.sub(r'\W+', '_', request.topic)[:50] # Basic slugify
-                unique_id = str(uuid.uuid4())[:8]
-                report_final_filename = f"research_{topic_slug}_{timestamp}_{unique_id}.md"
-                new_report_path = os.path.join(crew_project_path, report_final_filename)
-
-                # 2. Read the content BEFORE renaming
-                with open(report_file_path, 'r', encoding='utf-8') as f:
-                    report_content = f.read()
-                print(f"Successfully read {default_report_name}")
-
-                # 3. Rename the file
-                shutil.move(report_file_path, new_report_path)
-                print(f"Renamed {default_report_name} to {report_final_filename}")
-
+                with metrics.RESEARCH_PHASE_DURATION.time(backend=backend_label, phase="report_read"):
+                    with open(report_file_path, 'r', encoding='utf-8') as f:
+                        report_content = f.read()
+                logger.debug("Read report file", extra={"report_filename": report_final_filename})
             except Exception as file_error:
                 read_error = f"Error processing report file: {str(file_error)}"
-                print(read_error)
+                logger.error(read_error)
                 # Reset potentially partially set variables if error occurred
                 report_content = None
                 report_final_filename = None
         else:
-            read_error = f"{default_report_name} not found in {crew_project_path} after crew execution."
-            print(read_error)
-
-        # --- Log before returning ---
-        print(f"Returning ResearchResponse:")
-        print(f"  stdout_result: {'Present' if stdout_result else 'None'}")
-        print(f"  report_content: {'Present' if report_content else 'None'}")
-        print(f"  report_filename: {report_final_filename}") # <--- Check this value
-        print(f"  error: {read_error}")
-        print(f"  model: {response_model_str}")
-        # --- End Log ---
+            read_error = f"{report_final_filename} not found in {crew_project_path} after crew execution."
+            logger.error(read_error)
+            report_final_filename = None
+
+        # --- Move the report into the indexed store ---
+        report_id = None
+        if report_content is not None:
+            try:
+                record = await get_report_store().import_report(
+                    report_file_path,
+                    topic=request.topic,
+                    model=model_name,
+                    backend=backend_label,
+                    started_at=started_at,
+                    finished_at=time.time(),
+                    cache_key=cache_key
+                )
+                report_id = record["id"]
+                emit_progress({"event": "report", "report_id": report_id, "report_filename": report_final_filename})
+            except Exception as e:
+                # The report stays in the crew directory, where downloads still find it
+                logger.warning("Could not add report to the report store: %s", e)
+
+        logger.info("Research finished", extra={
+            "stdout_chars": len(stdout_result),
+            "report_chars": len(report_content) if report_content else 0,
+            "report_filename": report_final_filename,
+            "report_id": report_id,
+            "error": read_error,
+            "model": response_model_str
+        })
 
         return ResearchResponse(
             stdout_result=stdout_result,
             report_content=report_content,
             report_filename=report_final_filename,
+            report_id=report_id,
             error=read_error,
             model=response_model_str
         )
 
-    # --- Handle Subprocess Errors ---
+    # --- Handle Crew Errors ---
+    except CrewExecutionError as e:
+        error_detail = f"Crew execution failed in worker: {str(e)}"
+        logger.error(error_detail)
+        return ResearchResponse(error=error_detail, model=response_model_str)
+    except asyncio.TimeoutError:
+        error_detail = f"Crew execution timed out after {RESEARCH_TIMEOUT} seconds."
+        logger.error(error_detail)
+        return ResearchResponse(error=error_detail, model=response_model_str)
     except subprocess.CalledProcessError as e:
         error_detail = f"Crew execution failed (Exit Code {e.returncode}). Stderr: {e.stderr.strip()}"
-        print(error_detail)
-        print(f"Stdout: {e.stdout.strip()}") # Also log stdout on error
+        logger.error(error_detail, extra={"stdout": e.stdout.strip()}) # Also log stdout on error
         return ResearchResponse(error=error_detail, model=response_model_str)
     except subprocess.TimeoutExpired as e:
         error_detail = f"Crew execution timed out after {e.timeout} seconds."
-        print(error_detail)
+        logger.error(error_detail)
         return ResearchResponse(error=error_detail, model=response_model_str)
     except Exception as e:
         error_detail = f"Unexpected error running crewai subprocess: {str(e)}"
-        print(error_detail)
+        logger.exception(error_detail)
         return ResearchResponse(error=error_detail, model=response_model_str)
 
-@app.get("/api/models")
-async def list_models() -> Dict[str, List[Dict[str, Any]]]:
-    ollama_models = []
-    gemini_models = [
-        {"name": "gemini-1.5-pro-latest", "backend": "gemini"},
-        {"name": "gemini-1.5-flash-latest", "backend": "gemini"},
-        {"name": "gemini-2.5-pro-exp-03-25", "backend": "gemini"},
-    ]
-    all_models = []
+def finished_tasks(job) -> Dict[str, str]:
+    """Outputs of the tasks a job's crew finished (or got from a checkpoint), by task name."""
+    return {
+        event["task"]: event["output"]
+        for event in job.events
+        if event["event"] in ("task_finished", "task_restored")
+        and event.get("task") and isinstance(event.get("output"), str)
+    }
+
+async def save_checkpoint(request: ResearchRequest) -> bool:
+    """Saves the finished tasks of the current, failed job; False if there are none."""
+    job = current_job()
+    tasks = finished_tasks(job) if job is not None else {}
+    if not tasks:
+        return False
+    try:
+        await get_checkpoint_store().save(job.job_id, request.model_dump(exclude={"resume_job_id"}), tasks)
+    except Exception as e:
+        logger.warning("Could not save research checkpoint: %s", e, extra={"job_id": job.job_id})
+        return False
+    logger.info("Saved research checkpoint", extra={"job_id": job.job_id, "tasks": list(tasks)})
+    return True
+
+async def run_research(request: ResearchRequest) -> ResearchResponse:
+    """Job runner: executes the research and records its duration and outcome."""
+    backend = request.backend.lower()
+    with metrics.RESEARCH_PHASE_DURATION.time(backend=backend, phase="total"):
+        result = await execute_research(request)
+    metrics.RESEARCH_RUNS.inc(backend=backend, outcome="error" if result.error else "success")
+    if result.error:
+        result.resumable = await save_checkpoint(request)
+    elif request.resume_job_id:
+        # Resumed successfully: the old checkpoint is no longer needed
+        await get_checkpoint_store().delete(request.resume_job_id)
+    return result
+
+research_jobs = ResearchJobManager(
+    run_research,
+    max_concurrency=RESEARCH_MAX_CONCURRENCY,
+    max_pending=RESEARCH_MAX_PENDING,
+    job_ttl=RESEARCH_JOB_TTL
+)
+
+def job_to_response(job) -> ResearchJobResponse:
+    request = job.request
+    return ResearchJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        model=f"{request.backend}:{request.model}",
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        subscribers=job.subscribers,
+        error=job.error,
+        result=job.result
+    )
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+def research_key(request: ResearchRequest) -> str:
+    """Identifies requests that would produce the same research run."""
+    return "|".join([
+        request.backend.lower(),
+        prefix_model_name(request.model, request.backend),
+        normalize_topic(request.topic)
+    ])
+
+async def submit_research_job(request: ResearchRequest):
+    cached = await cached_research(request)
+    if cached is not None:
+        logger.info("Research served from cache", extra={"report_id": cached.report_id, "topic": request.topic})
+        return research_jobs.add_completed(request, cached)
+    key = research_key(request) if RESEARCH_COALESCE else None
+    try:
+        return research_jobs.submit(request, key=key)
+    except JobQueueFullError as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=429, detail=str(e))
+
+@app.post("/api/research/jobs", response_model=ResearchJobResponse, status_code=202)
+async def create_research_job(request: ResearchRequest):
+    """Queues a research run and returns its job id immediately."""
+    job = await submit_research_job(request)
+    logger.info("Queued research job", extra={"job_id": job.job_id, "topic": request.topic})
+    return job_to_response(job)
+
+@app.get("/api/research/jobs", response_model=List[ResearchJobResponse])
+async def list_research_jobs():
+    return [job_to_response(job) for job in research_jobs.list()]
+
+@app.get("/api/research/jobs/{job_id}", response_model=ResearchJobResponse)
+async def get_research_job(job_id: str):
+    job = research_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Research job not found.")
+    return job_to_response(job)
+
+@app.post("/api/research/jobs/{job_id}/resume", response_model=ResearchJobResponse, status_code=202)
+async def resume_research_job(job_id: str):
+    """Re-runs a failed research job; tasks it finished are taken from its checkpoint."""
+    checkpoint = await get_checkpoint_store().load(job_id)
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail="No checkpoint for this research job (it did not fail after finishing a task, or the checkpoint expired).")
+    request = ResearchRequest(**checkpoint["request"], resume_job_id=job_id)
+    try:
+        # Resuming the same job twice at once shares one run
+        job = research_jobs.submit(request, key=f"resume|{job_id}" if RESEARCH_COALESCE else None)
+    except JobQueueFullError as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=429, detail=str(e))
+    logger.info("Resuming research job", extra={"job_id": job.job_id, "resumed_job_id": job_id, "tasks": list(checkpoint["tasks"])})
+    return job_to_response(job)
+
+def sse_event(event_type: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+@app.get("/api/research/jobs/{job_id}/events")
+async def research_job_events(job_id: str, request: Request):
+    """Streams a job's progress as Server-Sent Events.
+
+    Past events are replayed first (after ``Last-Event-ID`` when reconnecting);
+    the stream ends with a ``done`` event carrying the finished job.
+    """
+    job = research_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Research job not found.")
+    last_event_id = request.headers.get("last-event-id", "")
+    start = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+
+    async def stream():
+        index = start
+        while True:
+            while index < len(job.events):
+                event = job.events[index]
+                index += 1
+                yield sse_event(event["event"], event, event["id"])
+            if job.done:
+                yield sse_event("done", job_to_response(job).model_dump())
+                return
+            if not await job.wait_for_event(RESEARCH_EVENTS_KEEPALIVE):
+                # Comment line keeping proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/research", response_model=ResearchResponse)
+async def research(request: ResearchRequest):
+    """Runs a research job and waits for its result (blocking-style API)."""
+    job = await research_jobs.wait(await submit_research_job(request))
+    if job.result is not None:
+        return job.result
+    return ResearchResponse(error=job.error, model=f"{request.backend}:{request.model}")
+
+GEMINI_MODELS = [
+    {"name": "gemini-1.5-pro-latest", "backend": "gemini"},
+    {"name": "gemini-1.5-flash-latest", "backend": "gemini"},
+    {"name": "gemini-2.5-pro-exp-03-25", "backend": "gemini"},
+]
 
-    # Try to get models from Ollama
+async def fetch_backend_models(client: httpx.AsyncClient, ollama_base_url: str) -> Optional[List[str]]:
+    """Returns the model names installed on one Ollama host, or None on error."""
     try:
-        ollama_base_url = OLLAMA_API_URL.replace('/api/generate', '')
         ollama_tags_url = f"{ollama_base_url}/api/tags"
-        print(f"Fetching Ollama models from: {ollama_tags_url}")
-
-        async with httpx.AsyncClient() as client:
-            response = await client.get(ollama_tags_url, timeout=10.0)
-            if response.status_code == 200:
-                data = response.json()
-                ollama_raw_models = data.get('models', [])
-                if isinstance(ollama_raw_models, list):
-                   ollama_models = [{"name": model.get("name"), "backend": "ollama"}
-                                    for model in ollama_raw_models if model.get("name")]
-                else:
-                    print("Warning: Ollama /api/tags did not return a list of models.")
+        logger.debug("Fetching Ollama models", extra={"url": ollama_tags_url})
+
+        response = await client.get(ollama_tags_url, timeout=route_timeout(OLLAMA_MODELS_TIMEOUT))
+        if response.status_code == 200:
+            data = response.json()
+            ollama_raw_models = data.get('models', [])
+            if isinstance(ollama_raw_models, list):
+               return [model.get("name") for model in ollama_raw_models if model.get("name")]
             else:
-                 print(f"Warning: Ollama API error fetching models: Status {response.status_code}")
+                logger.warning("Ollama /api/tags did not return a list of models.")
+        else:
+             logger.warning("Ollama API error fetching models: Status %s", response.status_code)
 
     except httpx.RequestError as e:
-        print(f"Warning: Error communicating with Ollama to fetch models: {str(e)}")
+        logger.warning("Error communicating with Ollama to fetch models: %s", e)
     except Exception as e:
-        print(f"Warning: Unexpected error fetching Ollama models: {str(e)}")
+        logger.exception("Unexpected error fetching Ollama models: %s", e)
+    return None
+
+async def fetch_models(client: httpx.AsyncClient):
+    """Builds the combined model list; the flag is False if an Ollama host could not be queried."""
+    all_models = []
+
+    # Union of the models installed on every Ollama host
+    results = await asyncio.gather(*(fetch_backend_models(client, backend.url) for backend in ollama_pool.backends))
+    ollama_names = []
+    for names in results:
+        for name in names or []:
+            if name not in ollama_names:
+                ollama_names.append(name)
+    ollama_ok = all(names is not None for names in results)
 
     # Combine lists (Ollama first, then Gemini)
-    all_models.extend(ollama_models)
-    all_models.extend(gemini_models)
+    all_models.extend({"name": name, "backend": "ollama"} for name in ollama_names)
+    all_models.extend(GEMINI_MODELS)
+    return all_models, ollama_ok
+
+@app.get("/api/models")
+async def list_models(request: Request, client: httpx.AsyncClient = Depends(get_ollama_client)) -> Dict[str, List[Dict[str, Any]]]:
+    all_models = await model_registry.get(lambda: fetch_models(client))
+    headers = {
+        "ETag": model_registry.etag,
+        "Cache-Control": f"public, max-age={model_registry.max_age()}, stale-while-revalidate={int(MODELS_STALE_TTL)}"
+    }
+    if request.headers.get("if-none-match") == model_registry.etag:
+        return Response(status_code=304, headers=headers)
 
     # Return the combined list
-    return {"models": all_models}
+    return JSONResponse({"models": all_models}, headers=headers)
 
 # --- ADD Download Endpoint ---
 from fastapi import Path as FastApiPath # Avoid conflict with os.path
@@ -339,6 +1422,7 @@ BASE_REPORTS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "res
 
 @app.get("/api/research/report/{backend}/{filename}")
 async def download_report(
+    request: Request,
     backend: str = FastApiPath(..., description="The backend used ('ollama' or 'gemini')"),
     filename: str = FastApiPath(..., description="The unique report filename to download")
     ):
@@ -348,6 +1432,11 @@ async def download_report(
     if ".." in filename or "/" in filename or "\\" in filename:
         raise HTTPException(status_code=400, detail="Invalid filename.")
 
+    # Reports are looked up in the store; crew directories only hold legacy ones
+    record = await get_report_store().find(backend.lower(), filename)
+    if record is not None:
+        return await report_file_response(request, record)
+
     # Determine the correct subdirectory based on backend
     if backend.lower() == "ollama":
         agent_dir_name = "test_ollama_agent"
@@ -361,26 +1450,130 @@ async def download_report(
 
     if not full_path.startswith(os.path.join(BASE_REPORTS_PATH, agent_dir_name)):
          # Security check failed!
-         print(f"Attempted path traversal: {full_path}")
+         logger.warning("Attempted path traversal", extra={"path": full_path})
          raise HTTPException(status_code=400, detail="Invalid filename path.")
 
     if not os.path.exists(full_path):
         raise HTTPException(status_code=404, detail="Report file not found.")
 
-    print(f"Serving report file: {full_path}")
-    
-    # Use FileResponse to serve the file with a forced filename
-    # The attachement_filename parameter forces the Content-Disposition
-    return FileResponse(
-        path=full_path,
-        filename=filename, # This becomes the suggested download name
-        media_type='text/markdown', # Set appropriate media type
-        headers={
-            # Force download with the specified filename - critical for correct download name
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
+    logger.info("Serving report file", extra={"path": full_path})
+    content_hash = await asyncio.to_thread(file_sha256, full_path)
+    # No compressed copies next to legacy reports in the crew directories
+    return await file_response(
+        request,
+        full_path,
+        content_hash,
+        media_type="text/markdown",
+        headers=report_headers(filename),
+        compress=False
+    )
+
+# --- Report Store ---
+class ReportInfo(BaseModel):
+    id: str
+    filename: str
+    topic: str
+    model: str
+    backend: str
+    size: int
+    sha256: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    duration_s: Optional[float] = None
+
+class ReportPage(BaseModel):
+    reports: List[ReportInfo]
+    total: int
+    limit: int
+    offset: int
+
+def report_headers(filename: str) -> Dict[str, str]:
+    return {
+        # Force download with the report's own filename
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        # Cache, but revalidate with the ETag (reports can be deleted)
+        "Cache-Control": "no-cache",
+    }
+
+async def report_file_response(request: Request, record: Dict[str, Any]) -> Response:
+    """Serves a stored report with its sha256 as ETag, compressed and ranged on request."""
+    full_path = get_report_store().full_path(record)
+    if not os.path.exists(full_path):
+        raise HTTPException(status_code=404, detail="Report file not found.")
+    logger.info("Serving report file", extra={"path": full_path, "report_id": record["id"]})
+    return await file_response(
+        request,
+        full_path,
+        record["sha256"],
+        media_type="text/markdown",
+        headers=report_headers(record["filename"])
+    )
+
+async def get_report_or_404(report_id: str) -> Dict[str, Any]:
+    record = await get_report_store().get(report_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Report not found.")
+    return record
+
+@app.get("/api/reports", response_model=ReportPage)
+async def list_reports(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    backend: Optional[str] = None
+):
+    """Lists stored reports, newest first."""
+    records, total = await get_report_store().list(limit=limit, offset=offset, backend=backend.lower() if backend else None)
+    return ReportPage(reports=records, total=total, limit=limit, offset=offset)
+
+@app.get("/api/reports/search", response_model=ReportPage)
+async def search_reports(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """Finds reports whose topic, model or filename contains ``q``."""
+    records, total = await get_report_store().search(q, limit=limit, offset=offset)
+    return ReportPage(reports=records, total=total, limit=limit, offset=offset)
+
+@app.get("/api/reports/archive")
+async def download_report_archive(ids: List[str] = Query(..., alias="id", min_length=1)):
+    """Streams a zip of the given reports (``?id=...&id=...``), built while it is sent."""
+    if len(ids) > REPORT_ARCHIVE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {REPORT_ARCHIVE_MAX_ITEMS} reports per archive.")
+    entries = []
+    for report_id in dict.fromkeys(ids):
+        record = await get_report_or_404(report_id)
+        full_path = get_report_store().full_path(record)
+        if not os.path.exists(full_path):
+            raise HTTPException(status_code=404, detail=f"Report file not found: {report_id}")
+        entries.append((full_path, f"{record['backend']}/{record['filename']}"))
+    # A plain iterator: Starlette runs the blocking zip writer in a thread pool
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="reports.zip"'}
     )
 
+@app.post("/api/reports/gc")
+async def collect_reports():
+    """Applies the retention policy now instead of waiting for the next run."""
+    return {"removed": await get_report_store().gc()}
+
+@app.get("/api/reports/{report_id}", response_model=ReportInfo)
+async def get_report(report_id: str):
+    return await get_report_or_404(report_id)
+
+@app.get("/api/reports/{report_id}/content")
+async def download_stored_report(report_id: str, request: Request):
+    return await report_file_response(request, await get_report_or_404(report_id))
+
+@app.delete("/api/reports/{report_id}", status_code=204)
+async def delete_report(report_id: str):
+    if not await get_report_store().delete(report_id):
+        raise HTTPException(status_code=404, detail="Report not found.")
+    return Response(status_code=204)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""Minimal Prometheus instrumentation.
+
+Counters, gauges and histograms with labels, rendered in the Prometheus text
+exposition format by ``/metrics``. Everything is updated from the event loop,
+so no locking is needed. Values that already live elsewhere (queue depth, job
+counts, backend health) are copied into gauges by collectors at scrape time.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200, 500)
+RESEARCH_BUCKETS = (0.01, 0.1, 1, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self.values.items())]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def clear(self) -> None:
+        self.values.clear()
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> ([count per bucket], sum)
+        self.values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        self.values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes the duration of the ``with`` block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        entry = self.values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """``collector`` is called before every scrape to refresh gauges."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+REGISTRY = Registry()
+
+# --- HTTP ---
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "chatbox_http_requests_total", "HTTP requests by route and status.", ["method", "route", "status"]))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "chatbox_http_request_duration_seconds", "Time until the response (including streamed bodies) finished.", ["method", "route"]))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "chatbox_http_requests_in_flight", "HTTP requests currently being handled."))
+
+# --- Ollama ---
+OLLAMA_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "chatbox_ollama_queue_wait_seconds", "Time spent waiting for a scheduler slot.", ["model"]))
+OLLAMA_IN_FLIGHT = REGISTRY.register(Gauge(
+    "chatbox_ollama_in_flight", "Ollama generations holding a scheduler slot.", ["model"]))
+OLLAMA_TIME_TO_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "chatbox_ollama_time_to_first_token_seconds", "Time from sending the request to the first token.", ["model"]))
+OLLAMA_GENERATION_DURATION = REGISTRY.register(Histogram(
+    "chatbox_ollama_generation_seconds", "Total time of an Ollama generation.", ["model"]))
+OLLAMA_TOKENS_PER_SECOND = REGISTRY.register(Histogram(
+    "chatbox_ollama_tokens_per_second", "Generation speed from Ollama's eval_count / eval_duration.", ["model"],
+    buckets=TOKENS_PER_SECOND_BUCKETS))
+OLLAMA_TOKENS = REGISTRY.register(Counter(
+    "chatbox_ollama_tokens_total", "Tokens processed by Ollama.", ["model", "kind"]))
+OLLAMA_ERRORS = REGISTRY.register(Counter(
+    "chatbox_ollama_errors_total", "Failed Ollama calls.", ["model", "reason"]))
+SCHEDULER_REJECTIONS = REGISTRY.register(Counter(
+    "chatbox_scheduler_rejections_total", "Chat requests rejected by admission control.", ["reason"]))
+SCHEDULER_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "chatbox_scheduler_queue_depth", "Chat requests waiting for a scheduler slot."))
+OLLAMA_BACKEND_OUTSTANDING = REGISTRY.register(Gauge(
+    "chatbox_ollama_backend_outstanding", "Requests in flight per Ollama host.", ["backend"]))
+OLLAMA_BACKEND_UP = REGISTRY.register(Gauge(
+    "chatbox_ollama_backend_up", "1 if the Ollama host is healthy and not ejected.", ["backend"]))
+CHAT_CACHE_REQUESTS = REGISTRY.register(Counter(
+    "chatbox_chat_cache_requests_total", "Chat cache lookups.", ["result"]))
+
+# --- Research ---
+RESEARCH_PHASE_DURATION = REGISTRY.register(Histogram(
+    "chatbox_research_phase_seconds", "Duration of research run phases.", ["backend", "phase"],
+    buckets=RESEARCH_BUCKETS))
+RESEARCH_RUNS = REGISTRY.register(Counter(
+    "chatbox_research_runs_total", "Finished research runs.", ["backend", "outcome"]))
+RESEARCH_CACHE_REQUESTS = REGISTRY.register(Counter(
+    "chatbox_research_cache_requests_total", "Research cache lookups (hit, miss or refresh).", ["result"]))
+RESEARCH_JOBS = REGISTRY.register(Gauge(
+    "chatbox_research_jobs", "Research jobs by status.", ["status"]))
+
+def observe_generation(model: str, stats: Dict[str, object], elapsed: Optional[float] = None) -> None:
+    """Records a finished generation from Ollama's final chunk / response body.
+
+    Durations in Ollama's stats are nanoseconds.
+    """
+    if elapsed is not None:
+        OLLAMA_GENERATION_DURATION.observe(elapsed, model=model)
+    eval_count = stats.get("eval_count") or 0
+    eval_duration = stats.get("eval_duration") or 0
+    if eval_count and eval_duration:
+        OLLAMA_TOKENS_PER_SECOND.observe(eval_count / (eval_duration / 1e9), model=model)
+    if eval_count:
+        OLLAMA_TOKENS.inc(eval_count, model=model, kind="generated")
+    prompt_eval_count = stats.get("prompt_eval_count") or 0
+    if prompt_eval_count:
+        OLLAMA_TOKENS.inc(prompt_eval_count, model=model, kind="prompt")
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them until the body is sent.
+
+    Requests are labelled with the route template (``/api/research/jobs/{job_id}``)
+    rather than the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=scope["method"], route=route_path)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route_path, status=str(status["code"]))
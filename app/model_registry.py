@@ -0,0 +1,79 @@
+"""Cached model list with stale-while-revalidate refresh.
+
+``/api/models`` is hit on every page load, but the list of installed Ollama
+models rarely changes. The registry keeps the last list for ``ttl`` seconds,
+serves it stale for up to ``stale_ttl`` more seconds while refreshing in the
+background, and makes sure only one refresh runs at a time.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A fetcher returns the model list and whether it is complete. Incomplete
+# lists (e.g. Ollama unreachable) are only cached for ``error_ttl`` seconds.
+Fetcher = Callable[[], Awaitable[Tuple[List[Any], bool]]]
+
+class ModelRegistry:
+    def __init__(self, ttl: float = 60.0, stale_ttl: float = 300.0, error_ttl: float = 5.0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.models: Optional[List[Any]] = None
+        self.etag: Optional[str] = None
+        self.fetched_at = 0.0
+        self.expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def invalidate(self) -> None:
+        self.models = None
+        self.etag = None
+        self.fetched_at = 0.0
+        self.expires_at = 0.0
+
+    async def aclose(self) -> None:
+        """Cancels an in-flight refresh (used on shutdown)."""
+        task, self._refresh_task = self._refresh_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def max_age(self) -> int:
+        """Seconds until the cached list goes stale (for Cache-Control)."""
+        return max(0, int(self.expires_at - time.time()))
+
+    async def refresh(self, fetcher: Fetcher) -> List[Any]:
+        """Fetches the model list; concurrent callers share one in-flight fetch."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch(fetcher))
+        # Shield so a caller that goes away doesn't cancel the shared fetch
+        return await asyncio.shield(self._refresh_task)
+
+    async def _fetch(self, fetcher: Fetcher) -> List[Any]:
+        models, complete = await fetcher()
+        now = time.time()
+        self.models = models
+        self.etag = '"' + hashlib.sha256(json.dumps(models, sort_keys=True).encode()).hexdigest()[:32] + '"'
+        self.fetched_at = now
+        self.expires_at = now + (self.ttl if complete else self.error_ttl)
+        return models
+
+    async def get(self, fetcher: Fetcher) -> List[Any]:
+        """Returns the cached list, refreshing it when it is missing or stale."""
+        now = time.time()
+        if self.models is None or now >= self.expires_at + self.stale_ttl:
+            return await self.refresh(fetcher)
+        if now >= self.expires_at:
+            # Stale but usable: answer now, refresh in the background
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._fetch(fetcher))
+                self._refresh_task.add_done_callback(_log_refresh_error)
+        return self.models
+
+def _log_refresh_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background model list refresh failed: %s", task.exception())
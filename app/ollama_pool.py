@@ -0,0 +1,200 @@
+"""Load balancing across several Ollama hosts.
+
+Each chat request goes to the backend with the fewest outstanding requests,
+with a bonus for backends that already have the model loaded (as reported by
+``/api/ps``), so a burst for one model doesn't make every host load it.
+Hosts that don't have the model pulled (per ``/api/tags``) are skipped.
+Backends are checked in the background (active health checks) and taken out
+of rotation for a while after repeated request errors (passive ejection).
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+class NoBackendAvailableError(Exception):
+    """Raised when every backend has already been tried for a request."""
+
+def normalize_model_name(name: str) -> str:
+    """Ollama reports 'llama3' as 'llama3:latest'."""
+    return name if ":" in name else f"{name}:latest"
+
+def base_url(url: str) -> str:
+    """Accepts either a host URL or a full /api/generate URL."""
+    url = url.strip().rstrip("/")
+    if url.endswith("/api/generate"):
+        url = url[:-len("/api/generate")]
+    return url
+
+class OllamaBackend:
+    def __init__(self, url: str):
+        self.url = base_url(url)
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0 # Consecutive request errors
+        self.ejected_until = 0.0
+        self.loaded_models: Set[str] = set()
+        # Models pulled on the host; None until the first health check
+        self.installed_models: Optional[Set[str]] = None
+        self.last_checked: Optional[float] = None
+
+    @property
+    def generate_url(self) -> str:
+        return f"{self.url}/api/generate"
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.url}/api/chat"
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def has_model(self, model: str) -> bool:
+        return normalize_model_name(model) in self.loaded_models
+
+    def lacks_model(self, model: str) -> bool:
+        """True if the host is known not to have ``model`` pulled."""
+        return self.installed_models is not None and normalize_model_name(model) not in self.installed_models
+
+def model_names(models: List[Dict[str, object]]) -> Set[str]:
+    """Normalized names from an /api/tags or /api/ps model list."""
+    return {
+        normalize_model_name(model.get("name") or model.get("model"))
+        for model in models if model.get("name") or model.get("model")
+    }
+
+class OllamaPool:
+    def __init__(
+        self,
+        urls: Iterable[str],
+        eject_after: int = 3,
+        eject_seconds: float = 30.0,
+        affinity_weight: float = 2.0,
+        check_timeout: float = 5.0,
+    ):
+        self.backends: List[OllamaBackend] = [OllamaBackend(url) for url in urls if url.strip()]
+        if not self.backends:
+            raise ValueError("At least one Ollama backend URL is required.")
+        self.eject_after = max(1, eject_after)
+        self.eject_seconds = eject_seconds
+        # How many extra outstanding requests a backend with the model loaded may have
+        # before an idle backend without it is preferred
+        self.affinity_weight = affinity_weight
+        self.check_timeout = check_timeout
+
+    def available_count(self) -> int:
+        """Backends currently in rotation (healthy and not ejected)."""
+        now = time.monotonic()
+        return sum(1 for backend in self.backends if backend.available(now))
+
+    # --- Routing ---
+    def pick(
+        self,
+        model: Optional[str] = None,
+        exclude: Iterable[OllamaBackend] = (),
+        prefer: Optional[str] = None,
+    ) -> OllamaBackend:
+        """Chooses a backend for ``model`` and counts the request as outstanding.
+
+        ``prefer`` names a backend URL to stick to while it is usable (e.g. the
+        host holding a conversation's prompt cache). Every call must be paired
+        with ``release``. Backends known to lack the model are skipped. If no
+        backend is healthy (or none has the model) the remaining ones are still
+        tried rather than failing outright, so Ollama's own error comes back.
+        """
+        now = time.monotonic()
+        remaining = [backend for backend in self.backends if backend not in exclude]
+        if not remaining:
+            raise NoBackendAvailableError("No Ollama backend left to try.")
+        candidates = [backend for backend in remaining if backend.available(now)] or remaining
+        if model is not None:
+            candidates = [backend for backend in candidates if not backend.lacks_model(model)] or candidates
+        preferred = [backend for backend in candidates if backend.url == prefer]
+        if preferred:
+            candidates = preferred
+
+        def score(backend: OllamaBackend) -> float:
+            if model is not None and backend.has_model(model):
+                return backend.outstanding - self.affinity_weight
+            return backend.outstanding
+
+        backend = min(candidates, key=score)
+        backend.outstanding += 1
+        return backend
+
+    def release(self, backend: OllamaBackend, model: Optional[str] = None, failed: bool = False) -> None:
+        """Ends an outstanding request; ``failed`` marks a connection or server error."""
+        backend.outstanding = max(0, backend.outstanding - 1)
+        if failed:
+            backend.failures += 1
+            if backend.failures >= self.eject_after:
+                logger.warning(
+                    "Ejecting Ollama backend for %ss after %s errors", self.eject_seconds, backend.failures,
+                    extra={"backend": backend.url}
+                )
+                backend.ejected_until = time.monotonic() + self.eject_seconds
+                backend.failures = 0
+        else:
+            backend.failures = 0
+            if model is not None:
+                # It just answered, so the model is loaded there now
+                backend.loaded_models.add(normalize_model_name(model))
+                if backend.installed_models is not None:
+                    backend.installed_models.add(normalize_model_name(model))
+
+    def model_missing(self, backend: OllamaBackend, model: str) -> None:
+        """Records that ``backend`` answered 404 for ``model``, i.e. it isn't pulled there."""
+        backend.loaded_models.discard(normalize_model_name(model))
+        if backend.installed_models is not None:
+            backend.installed_models.discard(normalize_model_name(model))
+
+    # --- Active health checks ---
+    async def check(self, client: httpx.AsyncClient, backend: OllamaBackend) -> None:
+        """Polls /api/ps and /api/tags, updating health and the loaded and installed models."""
+        try:
+            responses = await asyncio.gather(
+                client.get(f"{backend.url}/api/ps", timeout=self.check_timeout),
+                client.get(f"{backend.url}/api/tags", timeout=self.check_timeout),
+            )
+            for response in responses:
+                response.raise_for_status()
+            loaded, installed = (response.json().get("models", []) for response in responses)
+        except Exception as e:
+            if backend.healthy:
+                logger.warning("Ollama backend failed health check: %s", e, extra={"backend": backend.url})
+            backend.healthy = False
+        else:
+            backend.healthy = True
+            backend.ejected_until = 0.0
+            backend.failures = 0
+            backend.loaded_models = model_names(loaded)
+            backend.installed_models = model_names(installed)
+        backend.last_checked = time.time()
+
+    async def check_all(self, client: httpx.AsyncClient) -> None:
+        await asyncio.gather(*(self.check(client, backend) for backend in self.backends))
+
+    async def run_health_checks(self, client: httpx.AsyncClient, interval: float) -> None:
+        """Checks all backends every ``interval`` seconds until cancelled."""
+        while True:
+            await self.check_all(client)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> List[Dict[str, object]]:
+        now = time.monotonic()
+        return [
+            {
+                "url": backend.url,
+                "healthy": backend.healthy,
+                "ejected": now < backend.ejected_until,
+                "outstanding": backend.outstanding,
+                "loaded_models": sorted(backend.loaded_models),
+                "installed_models": sorted(backend.installed_models) if backend.installed_models is not None else None,
+                "last_checked": backend.last_checked,
+            }
+            for backend in self.backends
+        ]
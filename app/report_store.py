@@ -0,0 +1,210 @@
+"""Storage and index for finished research reports.
+
+Crews write their report into their own project directory; once a run has
+finished, the report is moved into ``root/YYYY/MM/DD/`` and recorded in a
+SQLite index (topic, model, backend, size, timings, sha256). Listing,
+search and downloads query the index instead of the filesystem, and ``gc``
+enforces the retention policy (maximum age and/or number of reports).
+Reports can carry a cache key so a repeated research request can be answered
+with a recent report instead of a new crew run.
+
+SQLite and file operations block, so the async API runs them in a thread.
+"""
+import asyncio
+import datetime
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Compressed copies that app.http_files writes next to a report when serving it
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+_COLUMNS = (
+    "id", "filename", "path", "topic", "model", "backend", "size", "sha256",
+    "created_at", "started_at", "finished_at", "duration_s", "cache_key",
+)
+
+class ReportStore:
+    def __init__(self, root: str, retention_days: float = 0, max_reports: int = 0):
+        self.root = os.path.abspath(root)
+        # 0 disables the respective limit
+        self.retention_days = retention_days
+        self.max_reports = max_reports
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " id TEXT PRIMARY KEY, filename TEXT NOT NULL, path TEXT NOT NULL,"
+            " topic TEXT NOT NULL, model TEXT NOT NULL, backend TEXT NOT NULL,"
+            " size INTEGER NOT NULL, sha256 TEXT NOT NULL, created_at REAL NOT NULL,"
+            " started_at REAL, finished_at REAL, duration_s REAL, cache_key TEXT);"
+            "CREATE INDEX IF NOT EXISTS reports_created_at ON reports (created_at);"
+            "CREATE UNIQUE INDEX IF NOT EXISTS reports_backend_filename ON reports (backend, filename);"
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(reports)")}
+        if "cache_key" not in columns:
+            # Index created before reports could be cached
+            self._db.execute("ALTER TABLE reports ADD COLUMN cache_key TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS reports_cache_key ON reports (cache_key, created_at)")
+        self._db.commit()
+
+    def full_path(self, record: Dict[str, Any]) -> str:
+        return os.path.join(self.root, record["path"])
+
+    # --- Blocking implementation ---
+    def _import(self, source_path: str, topic: str, model: str, backend: str,
+                started_at: Optional[float], finished_at: Optional[float],
+                cache_key: Optional[str]) -> Dict[str, Any]:
+        created_at = time.time()
+        filename = os.path.basename(source_path)
+        day = datetime.datetime.fromtimestamp(created_at).strftime("%Y/%m/%d")
+        relative_path = os.path.join(day, filename)
+        target = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # os.replace when on the same filesystem, copy + delete otherwise
+        shutil.move(source_path, target)
+
+        digest = hashlib.sha256()
+        with open(target, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+        record = {
+            "id": uuid.uuid4().hex,
+            "filename": filename,
+            "path": relative_path,
+            "topic": topic,
+            "model": model,
+            "backend": backend,
+            "size": os.path.getsize(target),
+            "sha256": digest.hexdigest(),
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "duration_s": finished_at - started_at if started_at is not None and finished_at is not None else None,
+            "cache_key": cache_key,
+        }
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO reports ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                tuple(record[column] for column in _COLUMNS),
+            )
+            self._db.commit()
+        return record
+
+    def _query(self, where: str = "", params: Tuple = (), limit: int = 50, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM reports {where}", params).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT * FROM reports {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + (limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def _get(self, where: str, params: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT * FROM reports WHERE {where}", params).fetchone()
+        return dict(row) if row is not None else None
+
+    def _find_cached(self, cache_key: str, since: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM reports WHERE cache_key = ? AND created_at >= ? ORDER BY created_at DESC",
+                (cache_key, since),
+            ).fetchall()
+        for row in rows:
+            # Skip reports whose file was removed outside of the store
+            if os.path.exists(self.full_path(row)):
+                return dict(row)
+        return None
+
+    def _delete(self, records: List[Dict[str, Any]]) -> int:
+        for record in records:
+            path = self.full_path(record)
+            for candidate in [path] + [path + suffix for suffix in COMPRESSED_SUFFIXES]:
+                try:
+                    os.remove(candidate)
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            self._db.executemany("DELETE FROM reports WHERE id = ?", [(record["id"],) for record in records])
+            self._db.commit()
+        return len(records)
+
+    def _gc(self, now: float) -> int:
+        expired: List[Dict[str, Any]] = []
+        with self._lock:
+            if self.retention_days:
+                cutoff = now - self.retention_days * 86400
+                expired += [dict(row) for row in self._db.execute(
+                    "SELECT * FROM reports WHERE created_at < ?", (cutoff,)).fetchall()]
+            if self.max_reports:
+                expired += [dict(row) for row in self._db.execute(
+                    "SELECT * FROM reports ORDER BY created_at DESC LIMIT -1 OFFSET ?", (self.max_reports,)).fetchall()]
+        unique = list({record["id"]: record for record in expired}.values())
+        return self._delete(unique)
+
+    # --- Public API ---
+    async def import_report(self, source_path: str, topic: str, model: str, backend: str,
+                            started_at: Optional[float] = None, finished_at: Optional[float] = None,
+                            cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """Moves a finished report into the store and indexes it."""
+        return await asyncio.to_thread(
+            self._import, source_path, topic, model, backend, started_at, finished_at, cache_key)
+
+    async def list(self, limit: int = 50, offset: int = 0, backend: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Returns one page of reports (newest first) and the total count."""
+        if backend:
+            return await asyncio.to_thread(self._query, "WHERE backend = ?", (backend,), limit, offset)
+        return await asyncio.to_thread(self._query, "", (), limit, offset)
+
+    async def search(self, query: str, limit: int = 50, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Case-insensitive substring search over topic, model and filename."""
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where = "WHERE topic LIKE ? ESCAPE '\\' OR model LIKE ? ESCAPE '\\' OR filename LIKE ? ESCAPE '\\'"
+        return await asyncio.to_thread(self._query, where, (pattern, pattern, pattern), limit, offset)
+
+    async def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, "id = ?", (report_id,))
+
+    async def find(self, backend: str, filename: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, "backend = ? AND filename = ?", (backend, filename))
+
+    async def find_cached(self, cache_key: str, max_age: float) -> Optional[Dict[str, Any]]:
+        """Returns the newest report with ``cache_key`` created within ``max_age`` seconds."""
+        return await asyncio.to_thread(self._find_cached, cache_key, time.time() - max_age)
+
+    async def delete(self, report_id: str) -> bool:
+        record = await self.get(report_id)
+        if record is None:
+            return False
+        await asyncio.to_thread(self._delete, [record])
+        return True
+
+    async def gc(self) -> int:
+        """Deletes reports beyond the retention policy; returns how many."""
+        return await asyncio.to_thread(self._gc, time.time())
+
+    async def run_gc(self, interval: float) -> None:
+        """Runs ``gc`` every ``interval`` seconds until cancelled."""
+        while True:
+            try:
+                removed = await self.gc()
+                if removed:
+                    logger.info("Report GC removed %d report(s)", removed)
+            except Exception as e:
+                logger.warning("Report GC failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,5 @@
+"""Modules shared by the research crews (test_ollama_agent, test_gemini_agent).
+
+The crews import them as ``crew_common``; each crew package puts
+``app/research`` on ``sys.path`` for that.
+"""
@@ -0,0 +1,287 @@
+"""Local retrieval index over the research crews' knowledge files.
+
+Markdown and text files in the knowledge directories (notes, documents,
+earlier research reports) are split into passages and indexed for BM25. With
+an embedding function and NumPy installed, passages are embedded as well: the
+vectors live in a NumPy matrix on disk that is memory-mapped, and the BM25 and
+vector rankings are merged with reciprocal rank fusion.
+
+``refresh`` only re-reads files whose size or mtime changed and drops deleted
+ones; embeddings are reused for passages whose text is unchanged. ``search``
+checks for changes at most every ``refresh_interval`` seconds, so a BM25
+lookup is a dictionary walk over the query terms' postings (well under 10 ms
+for thousands of passages).
+"""
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = ('.md', '.markdown', '.txt')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the this to was were will with'.split())
+_TOKEN = re.compile(r'\w+')
+
+# Texts -> one vector per text
+Embedder = Callable[[List[str]], Sequence[Sequence[float]]]
+
+class SearchResult(NamedTuple):
+    source: str # Path of the file the passage comes from
+    text: str
+    score: float
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+def split_passages(text: str, max_words: int = 120) -> List[str]:
+    """Packs paragraphs into passages of up to ``max_words``; longer paragraphs are cut."""
+    passages: List[str] = []
+    current: List[str] = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        words = paragraph.split()
+        for start in range(0, len(words), max_words):
+            piece = words[start:start + max_words]
+            if current and len(current) + len(piece) > max_words:
+                passages.append(' '.join(current))
+                current = []
+            current.extend(piece)
+    if current:
+        passages.append(' '.join(current))
+    return passages
+
+def ollama_embedder(model: str, host: Optional[str] = None, batch_size: int = 64) -> Embedder:
+    """Embeds texts with a local Ollama embedding model (e.g. nomic-embed-text)."""
+    import ollama
+    client = ollama.Client(host=host)
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), batch_size):
+            vectors.extend(client.embed(model=model, input=texts[start:start + batch_size])['embeddings'])
+        return vectors
+    return embed
+
+def _fuse(rankings: List[List[int]], k: int = 60) -> Dict[int, float]:
+    """Reciprocal rank fusion of several rankings of passage ids."""
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, passage_id in enumerate(ranking):
+            scores[passage_id] += 1.0 / (k + rank + 1)
+    return scores
+
+class KnowledgeIndex:
+    def __init__(
+        self,
+        paths: Sequence[str],
+        index_dir: Optional[str] = None,
+        embed: Optional[Embedder] = None,
+        max_words: int = 120,
+        refresh_interval: float = 2.0,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.paths = [os.path.abspath(path) for path in paths]
+        # Where the embedding matrix is kept; None keeps it in memory only
+        self.index_dir = index_dir
+        if embed is not None and np is None:
+            logger.warning("NumPy is not installed; knowledge search uses BM25 only")
+        self.embed = embed if np is not None else None
+        self.max_words = max_words
+        self.refresh_interval = refresh_interval
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._checked_at: Optional[float] = None
+        # path -> (size, mtime_ns) when it was indexed
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._file_passages: Dict[str, List[int]] = {}
+        self._passages: Dict[int, Tuple[str, str]] = {} # id -> (path, text)
+        self._term_counts: Dict[int, Counter] = {}
+        self._lengths: Dict[int, int] = {} # id -> number of tokens
+        self._postings: Dict[str, Dict[int, int]] = {} # term -> {passage id: term frequency}
+        self._total_length = 0
+        self._next_id = 0
+        # Row i of the (normalized) embedding matrix belongs to passage _row_ids[i]
+        self._vectors = None
+        self._row_ids: List[int] = []
+        self._row_hashes: List[str] = []
+        if self.embed is not None and index_dir:
+            self._load_vectors()
+
+    def __len__(self) -> int:
+        return len(self._passages)
+
+    # --- Files ---
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        found: Dict[str, Tuple[int, int]] = {}
+        for root in self.paths:
+            for dirpath, dirnames, filenames in os.walk(root):
+                # Skips hidden directories such as the index itself
+                dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+                for filename in filenames:
+                    if not filename.lower().endswith(EXTENSIONS):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    found[path] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def _add_file(self, path: str, text: str, stat: Tuple[int, int]) -> None:
+        ids = []
+        for passage in split_passages(text, self.max_words):
+            passage_id = self._next_id
+            self._next_id += 1
+            counts = Counter(tokenize(passage))
+            for term, frequency in counts.items():
+                self._postings.setdefault(term, {})[passage_id] = frequency
+            self._passages[passage_id] = (path, passage)
+            self._term_counts[passage_id] = counts
+            self._lengths[passage_id] = sum(counts.values())
+            self._total_length += self._lengths[passage_id]
+            ids.append(passage_id)
+        self._file_passages[path] = ids
+        self._files[path] = stat
+
+    def _remove_file(self, path: str) -> None:
+        for passage_id in self._file_passages.pop(path, []):
+            counts = self._term_counts.pop(passage_id)
+            for term in counts:
+                postings = self._postings[term]
+                del postings[passage_id]
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(passage_id)
+            del self._passages[passage_id]
+        self._files.pop(path, None)
+
+    def refresh(self) -> int:
+        """Indexes new and changed files and forgets deleted ones; returns how many changed."""
+        found = self._scan()
+        with self._lock:
+            changed = [path for path, stat in found.items() if self._files.get(path) != stat]
+            removed = [path for path in self._files if path not in found]
+            for path in removed + changed:
+                self._remove_file(path)
+            for path in changed:
+                try:
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        text = f.read()
+                except OSError as e:
+                    logger.warning("Could not index %s: %s", path, e)
+                    continue
+                self._add_file(path, text, found[path])
+            if self.embed is not None and (changed or removed or self._vectors is None):
+                self._update_vectors()
+            self._checked_at = time.monotonic()
+        return len(changed) + len(removed)
+
+    # --- Embeddings ---
+    def _vector_paths(self) -> Tuple[str, str]:
+        return os.path.join(self.index_dir, 'embeddings.npy'), os.path.join(self.index_dir, 'embeddings.json')
+
+    def _load_vectors(self) -> None:
+        matrix_path, hashes_path = self._vector_paths()
+        try:
+            with open(hashes_path, 'r', encoding='utf-8') as f:
+                hashes = json.load(f)
+            vectors = np.load(matrix_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return
+        if len(hashes) == len(vectors):
+            # Passage ids are assigned on refresh; until then the rows only serve as a cache
+            self._vectors, self._row_hashes, self._row_ids = vectors, hashes, []
+
+    def _update_vectors(self) -> None:
+        ids = sorted(self._passages)
+        hashes = [hashlib.sha256(self._passages[i][1].encode('utf-8')).hexdigest() for i in ids]
+        known = {digest: row for row, digest in enumerate(self._row_hashes)} if self._vectors is not None else {}
+        missing = [row for row, digest in enumerate(hashes) if digest not in known]
+        try:
+            embedded = self.embed([self._passages[ids[row]][1] for row in missing]) if missing else []
+        except Exception as e:
+            logger.warning("Could not embed knowledge passages, using BM25 only: %s", e)
+            self._vectors, self._row_ids, self._row_hashes = None, [], []
+            return
+        if not ids:
+            self._vectors, self._row_ids, self._row_hashes = None, [], []
+            return
+
+        dimensions = len(embedded[0]) if len(embedded) else self._vectors.shape[1]
+        matrix = np.zeros((len(ids), dimensions), dtype=np.float32)
+        for row, digest in enumerate(hashes):
+            if digest in known:
+                matrix[row] = self._vectors[known[digest]]
+        if missing:
+            new_vectors = np.asarray(embedded, dtype=np.float32)
+            norms = np.linalg.norm(new_vectors, axis=1, keepdims=True)
+            matrix[missing] = new_vectors / np.where(norms == 0, 1, norms)
+
+        if self.index_dir:
+            os.makedirs(self.index_dir, exist_ok=True)
+            matrix_path, hashes_path = self._vector_paths()
+            # Write then rename; the old mapping stays valid for readers until replaced
+            temporary = f"{matrix_path}.{os.getpid()}.tmp.npy"
+            np.save(temporary, matrix)
+            os.replace(temporary, matrix_path)
+            with open(hashes_path, 'w', encoding='utf-8') as f:
+                json.dump(hashes, f)
+            matrix = np.load(matrix_path, mmap_mode='r')
+        self._vectors, self._row_ids, self._row_hashes = matrix, ids, hashes
+
+    # --- Search ---
+    def _bm25(self, terms: List[str], limit: int) -> List[Tuple[float, int]]:
+        count = len(self._passages)
+        average_length = self._total_length / count or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, frequency in postings.items():
+                norm = frequency + self.k1 * (1 - self.b + self.b * self._lengths[passage_id] / average_length)
+                scores[passage_id] += idf * frequency * (self.k1 + 1) / norm
+        return heapq.nlargest(limit, ((score, passage_id) for passage_id, score in scores.items()))
+
+    def _nearest(self, query: str, limit: int) -> List[Tuple[float, int]]:
+        vector = np.asarray(self.embed([query])[0], dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        similarities = np.asarray(self._vectors @ vector)
+        limit = min(limit, len(similarities))
+        top = np.argpartition(-similarities, limit - 1)[:limit]
+        return sorted(((float(similarities[row]), self._row_ids[row]) for row in top), reverse=True)
+
+    def search(self, query: str, k: int = 5) -> List[SearchResult]:
+        """Returns the ``k`` passages most relevant to ``query``, best first."""
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.refresh_interval:
+            self.refresh()
+        with self._lock:
+            if not self._passages:
+                return []
+            lexical = self._bm25(tokenize(query), k if self._vectors is None else 4 * k)
+            ranked = [(score, passage_id) for score, passage_id in lexical]
+            if self._vectors is not None and self._row_ids:
+                try:
+                    dense = self._nearest(query, 4 * k)
+                    fused = _fuse([[i for _, i in lexical], [i for _, i in dense]])
+                    ranked = heapq.nlargest(k, ((score, passage_id) for passage_id, score in fused.items()))
+                except Exception as e:
+                    logger.warning("Vector search failed, using BM25 only: %s", e)
+            return [SearchResult(self._passages[i][0], self._passages[i][1], score) for score, i in ranked[:k]]
@@ -0,0 +1,125 @@
+"""Content-addressed cache for the research crews' LLM calls.
+
+Calls are keyed by model, messages and generation options and stored in a
+SQLite file, so a repeated crew run (``test()``, ``replay()``, a re-run
+after editing one task) only pays for the prompts that changed. The file is
+bounded by ``max_bytes``; least recently used entries are evicted first.
+
+Modes:
+
+- ``passthrough``: the cache is not used
+- ``record``: cached responses are returned, misses call the model and are stored
+- ``replay``: only cached responses are returned, a miss raises ``LLMCacheMiss``
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+MODES = ('passthrough', 'record', 'replay')
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode for a call that was never recorded."""
+
+class LLMCallCache:
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Several worker processes may share the file: wait for their locks
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS llm_cache ('
+            ' key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL,'
+            ' size INTEGER NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS llm_cache_used_at ON llm_cache (used_at);'
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: Any, options: Optional[Dict[str, Any]] = None) -> str:
+        # default=str: options may hold non-JSON values (e.g. a response_format class)
+        payload = json.dumps({'model': model, 'messages': messages, 'options': options or {}},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute('SELECT response FROM llm_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute('UPDATE llm_cache SET used_at = ? WHERE key = ?', (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+        return row[0]
+
+    def set(self, key: str, model: str, response: str) -> None:
+        size = len(key) + len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO llm_cache (key, model, response, size, created_at, used_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model, response, size, now, now),
+            )
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM llm_cache').fetchone()[0]
+            if total > self.max_bytes:
+                # Evict least recently used entries until we fit again
+                for old_key, old_size in self._db.execute(
+                        'SELECT key, size FROM llm_cache ORDER BY used_at').fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._db.execute('DELETE FROM llm_cache WHERE key = ?', (old_key,))
+                    total -= old_size
+            self._db.commit()
+
+    def call(self, mode: str, model: str, messages: Any, options: Dict[str, Any],
+             generate: Callable[[], Any]) -> Any:
+        """Returns the cached response or, depending on ``mode``, calls ``generate``."""
+        if mode == 'passthrough':
+            return generate()
+        key = self.make_key(model, messages, options)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        if mode == 'replay':
+            raise LLMCacheMiss(f'No recorded response for this {model} call (key {key[:12]})')
+        response = generate()
+        # Tool calls and structured outputs aren't plain text: never cached
+        if isinstance(response, str):
+            self.set(key, model, response)
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+_caches: Dict[str, LLMCallCache] = {}
+_caches_lock = threading.Lock()
+
+def shared_cache(path: str, max_bytes: int) -> LLMCallCache:
+    """One cache per file and process, shared by all agents and threads."""
+    path = os.path.abspath(path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LLMCallCache(path, max_bytes)
+        return _caches[path]
+
+def cache_mode() -> str:
+    mode = os.getenv('LLM_CACHE_MODE', 'passthrough').lower()
+    if mode not in MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be one of {', '.join(MODES)}, not '{mode}'")
+    return mode
+
+def cache_from_env() -> LLMCallCache:
+    return shared_cache(os.getenv('LLM_CACHE_PATH', '.llm_cache.sqlite3'),
+                        int(os.getenv('LLM_CACHE_MAX_BYTES', str(256 * 1024 * 1024))))
@@ -0,0 +1,68 @@
+"""Helpers for the parallel report mode.
+
+The research task answers with a bullet list; in parallel mode every bullet
+becomes its own section task, the sections are generated concurrently and
+then put together in the order of the list.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, TypeVar
+
+T = TypeVar('T')
+
+# "- item", "* item", "• item", "1. item", "2) item"
+_BULLET = re.compile(r'^\s*(?:[-*+•]|\d{1,2}[.)])\s+(.*\S)\s*$')
+_FENCE = re.compile(r'^\s*```[\w-]*\s*$', re.MULTILINE)
+
+def parse_bullets(text: str) -> List[str]:
+    """Returns the top-level items of the bullet list in ``text``.
+
+    Wrapped lines and nested bullets are joined to the item they belong to.
+    Without any bullets the whole text is a single item.
+    """
+    items: List[str] = []
+    indent = None
+    in_item = False
+    for line in text.splitlines():
+        match = _BULLET.match(line)
+        line_indent = len(line) - len(line.lstrip())
+        if match and (indent is None or line_indent <= indent):
+            indent = line_indent
+            items.append(match.group(1))
+            in_item = True
+        elif not line.strip():
+            in_item = False
+        elif items and (in_item or line_indent > indent):
+            # Wrapped text, or an indented paragraph/nested bullet of the item
+            items[-1] += ' ' + line.strip()
+            in_item = True
+    text = text.strip()
+    return items or ([text] if text else [])
+
+def section_title(item: str, max_words: int = 12) -> str:
+    """Short heading for a bullet: its bold lead-in or first clause."""
+    bold = re.match(r'\*\*(.+?)\*\*', item)
+    title = bold.group(1) if bold else re.split(r'[:.;]\s|\s[-–—]\s', item, maxsplit=1)[0]
+    words = title.strip(' *:').split()
+    return ' '.join(words[:max_words]) + (' ...' if len(words) > max_words else '')
+
+def clean_section(text: str, title: str) -> str:
+    """Strips code fences and makes sure the section starts with a heading."""
+    text = _FENCE.sub('', text).strip()
+    if not text.startswith('#'):
+        text = f'## {title}\n\n{text}'
+    return text
+
+def assemble_report(topic: str, sections: List[str]) -> str:
+    return f'# {topic} Report\n\n' + '\n\n'.join(sections) + '\n'
+
+def run_bounded(items: List[T], generate: Callable[[int, T], str], max_workers: int) -> List[str]:
+    """Calls ``generate(index, item)`` for all items, at most ``max_workers`` at once.
+
+    Results come back in the order of ``items``; the first failure is raised
+    once the running calls are done.
+    """
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        return list(executor.map(generate, range(len(items)), items))
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Makes app/research/crew_common importable, whether the crew runs via `crewai run` or in a worker
+_RESEARCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if _RESEARCH_DIR not in sys.path:
+    sys.path.append(_RESEARCH_DIR)
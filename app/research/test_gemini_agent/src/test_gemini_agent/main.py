@@ -25,8 +25,16 @@ def run():
         'current_year': str(datetime.now().year)
     }
     
+    # Set per run by the API so concurrent runs don't share state
+    model = os.getenv('RESEARCH_MODEL')
+    output_file = os.getenv('RESEARCH_OUTPUT_FILE', 'report.md')
+    events_file = os.getenv('RESEARCH_EVENTS_FILE')
+    # Outputs of tasks a failed run finished, when resuming it
+    checkpoint_file = os.getenv('RESEARCH_CHECKPOINT_FILE')
+
     try:
-        TestGeminiAgent().crew().kickoff(inputs=inputs)
+        TestGeminiAgent(model=model, output_file=output_file, events_file=events_file,
+                        checkpoint_file=checkpoint_file).kickoff(inputs=inputs)
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
 
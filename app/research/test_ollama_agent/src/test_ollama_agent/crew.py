@@ -1,10 +1,42 @@
-from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+import functools
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from crewai import Agent, Crew, LLM, Process, Task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+from crewai.tasks.task_output import TaskOutput
+
+from crew_common.llm_cache import LLMCallCache, cache_from_env, cache_mode
+from crew_common.report_sections import assemble_report, clean_section, parse_bullets, run_bounded, section_title
+from test_ollama_agent.tools.custom_tool import KnowledgeSearchTool, knowledge_context
+
+logger = logging.getLogger(__name__)
 
 # If you want to run a snippet of code before or after the crew starts,
 # you can use the @before_kickoff and @after_kickoff decorators
 # https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
 
+class CachedLLM(LLM):
+    """crewAI LLM whose calls go through an ``LLMCallCache``."""
+
+    # Settings that change the response, part of the cache key
+    KEY_OPTIONS = ('temperature', 'top_p', 'n', 'stop', 'max_tokens', 'max_completion_tokens',
+                   'presence_penalty', 'frequency_penalty', 'seed', 'response_format')
+
+    def __init__(self, model: str, cache: LLMCallCache, mode: str = 'record', **kwargs):
+        super().__init__(model=model, **kwargs)
+        self.cache = cache
+        self.cache_mode = mode
+
+    def call(self, messages, *args, **kwargs):
+        options = {name: getattr(self, name, None) for name in self.KEY_OPTIONS}
+        options['tools'] = kwargs.get('tools', args[0] if args else None)
+        generate = functools.partial(super().call, messages, *args, **kwargs)
+        return self.cache.call(self.cache_mode, self.model, messages, options, generate)
+
 @CrewBase
 class TestOllamaAgent():
     """TestOllamaAgent crew"""
@@ -15,12 +47,91 @@ class TestOllamaAgent():
     agents_config = 'config/agents.yaml'
     tasks_config = 'config/tasks.yaml'
 
-    # If you would like to add tools to your agents, you can learn more about it here:
-    # https://docs.crewai.com/concepts/agents#agent-tools
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        output_file: str = 'report.md',
+        events_file: Optional[str] = None,
+        report_mode: Optional[str] = None,
+        report_concurrency: Optional[int] = None,
+        llm_cache_mode: Optional[str] = None,
+        checkpoint_file: Optional[str] = None,
+    ):
+        # Full model name (e.g. 'ollama/<model>') used by all agents.
+        # When omitted, crewAI falls back to the MODEL environment variable.
+        self.model = model
+        # Report path relative to the working directory; unique per run so
+        # concurrent runs don't overwrite each other's report
+        self.output_file = output_file
+        # Progress events for the API, one JSON object per line (optional)
+        self.events_file = events_file
+        # 'sequential' writes the whole report in one task; 'parallel' writes
+        # one section per research finding, up to report_concurrency at once
+        self.report_mode = (report_mode or os.getenv('RESEARCH_REPORT_MODE', 'sequential')).lower()
+        self.report_concurrency = report_concurrency or int(
+            os.getenv('RESEARCH_REPORT_CONCURRENCY') or os.getenv('OLLAMA_NUM_PARALLEL') or 4)
+        # 'record' or 'replay' serve repeated LLM calls from the cache (see app/research/crew_common/llm_cache.py)
+        self.llm_cache_mode = llm_cache_mode or cache_mode()
+        # Outputs of the tasks a failed run already finished (task name -> output);
+        # these tasks are skipped when the run is resumed
+        self.completed = {}
+        if checkpoint_file:
+            with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                self.completed = json.load(f)
+
+    def _emit(self, event: str, **fields) -> None:
+        if not self.events_file:
+            return
+        with open(self.events_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'event': event, 'time': time.time(), **fields}) + '\n')
+
+    def _task_finished(self, task_name: str, next_task: Optional[tuple] = None):
+        """Task callback reporting the finished task and, if any, the one starting next."""
+        def callback(output) -> None:
+            self._emit('task_finished', task=task_name, agent=getattr(output, 'agent', None),
+                       output=getattr(output, 'raw', str(output)))
+            if next_task:
+                self._emit('task_started', task=next_task[0], agent=next_task[1])
+        return callback
+
+    @before_kickoff
+    def _crew_started(self, inputs):
+        self._emit('crew_started', topic=inputs.get('topic'))
+        # Passages from the local knowledge base, part of the research prompt
+        if 'knowledge' not in inputs:
+            inputs = {**inputs, 'knowledge': knowledge_context(inputs.get('topic', ''))}
+        # Tasks run sequentially; each one starts when the previous one finished
+        if 'research_task' in self.completed:
+            self._emit('task_started', task='reporting_task', agent='reporting_analyst')
+        else:
+            self._emit('task_started', task='research_task', agent='researcher')
+        return inputs
+
+    @after_kickoff
+    def _crew_finished(self, result):
+        self._emit('crew_finished')
+        if self.llm_cache_mode != 'passthrough':
+            cache = cache_from_env()
+            logger.info("LLM cache (%s): %d hits, %d misses in this process",
+                        self.llm_cache_mode, cache.hits, cache.misses)
+        return result
+
+    def _llm(self) -> Optional[LLM]:
+        # Without a model crewAI falls back to MODEL; the cache needs to know it up front
+        model = self.model or os.getenv('MODEL')
+        if self.llm_cache_mode != 'passthrough' and model:
+            return CachedLLM(model=model, cache=cache_from_env(), mode=self.llm_cache_mode)
+        return LLM(model=self.model) if self.model else None
+
     @agent
     def researcher(self) -> Agent:
+        # Small models often misuse tools, so searching on demand is opt-in;
+        # the research prompt gets the top passages either way
+        use_tool = os.getenv('KNOWLEDGE_TOOL', 'false').lower() in ('1', 'true', 'yes')
         return Agent(
             config=self.agents_config['researcher'],
+            llm=self._llm(),
+            tools=[KnowledgeSearchTool()] if use_tool else [],
             verbose=True
         )
 
@@ -28,6 +139,7 @@ class TestOllamaAgent():
     def reporting_analyst(self) -> Agent:
         return Agent(
             config=self.agents_config['reporting_analyst'],
+            llm=self._llm(),
             verbose=True
         )
 
@@ -38,15 +150,96 @@ class TestOllamaAgent():
     def research_task(self) -> Task:
         return Task(
             config=self.tasks_config['research_task'],
+            callback=self._task_finished('research_task', next_task=('reporting_task', 'reporting_analyst'))
         )
 
     @task
     def reporting_task(self) -> Task:
         return Task(
             config=self.tasks_config['reporting_task'],
-            output_file='report.md'
+            output_file=self.output_file,
+            callback=self._task_finished('reporting_task')
         )
 
+    def kickoff(self, inputs: dict):
+        """Runs the crew in the configured report mode, skipping checkpointed tasks."""
+        if 'reporting_task' in self.completed:
+            # The report was written, only saving it failed
+            self._write_report(self.completed['reporting_task'])
+            return self.completed['reporting_task']
+        if self.report_mode == 'parallel':
+            return self.kickoff_parallel(inputs)
+        if 'research_task' in self.completed:
+            return self.kickoff_reporting(inputs)
+        return self.crew().kickoff(inputs=inputs)
+
+    def _write_report(self, report: str) -> None:
+        if os.path.dirname(self.output_file):
+            os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            f.write(report)
+
+    def kickoff_reporting(self, inputs: dict):
+        """Runs only reporting_task, on the research output from the checkpoint."""
+        inputs = self._crew_started(inputs)
+        research = self.research_task()
+        research.output = TaskOutput(description=research.description, raw=self.completed['research_task'],
+                                     agent='researcher')
+        reporting = self.reporting_task()
+        reporting.context = [research]
+        result = Crew(
+            agents=[self.reporting_analyst()],
+            tasks=[reporting],
+            process=Process.sequential,
+            verbose=True,
+        ).kickoff(inputs=inputs)
+        return self._crew_finished(result)
+
+    def _section_agent(self) -> Agent:
+        # A fresh agent per section: agents keep per-execution state
+        return Agent(
+            config=self.agents_config['reporting_analyst'],
+            llm=self._llm(),
+            verbose=False
+        )
+
+    def kickoff_parallel(self, inputs: dict) -> str:
+        """Research as usual, then one section task per finding, run concurrently.
+
+        The sections are assembled into ``output_file`` in the order of the
+        research list; returns the report. Research and sections found in the
+        checkpoint aren't generated again.
+        """
+        inputs = self._crew_started(inputs)
+        research = self.completed.get('research_task')
+        if research is None:
+            research = Crew(
+                agents=[self.researcher()],
+                tasks=[self.research_task()],
+                process=Process.sequential,
+                verbose=True,
+            ).kickoff(inputs=inputs).raw
+        findings = parse_bullets(research)
+
+        def write_section(index: int, finding: str) -> str:
+            title = section_title(finding)
+            label = f'section {index + 1}/{len(findings)}: {title}'
+            if label in self.completed:
+                return clean_section(self.completed[label], title)
+            self._emit('task_started', task=label, agent='reporting_analyst')
+            task = Task(config=self.tasks_config['section_task'], agent=self._section_agent())
+            output = Crew(agents=[task.agent], tasks=[task], process=Process.sequential).kickoff(
+                inputs={**inputs, 'section': finding, 'research': research})
+            self._emit('task_finished', task=label, agent='reporting_analyst', output=output.raw)
+            return clean_section(output.raw, title)
+
+        sections = run_bounded(findings, write_section, self.report_concurrency)
+        report = assemble_report(inputs.get('topic', 'Research'), sections)
+        self._write_report(report)
+        self._emit('task_finished', task='reporting_task', agent='reporting_analyst', output=report)
+        self._crew_finished(None)
+        return report
+
     @crew
     def crew(self) -> Crew:
         """Creates the TestOllamaAgent crew"""
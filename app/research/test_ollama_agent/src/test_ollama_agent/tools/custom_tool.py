@@ -1,19 +1,64 @@
+import logging
+import os
+import threading
+from typing import List, Optional, Type
+
 from crewai.tools import BaseTool
-from typing import Type
 from pydantic import BaseModel, Field
 
+from crew_common.knowledge_index import KnowledgeIndex, SearchResult, ollama_embedder
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+# Reports saved by the API (REPORTS_DIR in app/main.py)
+DEFAULT_REPORTS_DIR = os.path.join(PROJECT_DIR, '..', '..', '..', 'data', 'reports')
+
+_index: Optional[KnowledgeIndex] = None
+_index_lock = threading.Lock()
+
+def shared_index() -> KnowledgeIndex:
+    """The knowledge index of this process, configured from the environment."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            paths = os.getenv('KNOWLEDGE_PATHS') or os.pathsep.join([
+                os.path.join(PROJECT_DIR, 'knowledge'),
+                os.getenv('REPORTS_DIR') or DEFAULT_REPORTS_DIR,
+            ])
+            embed_model = os.getenv('KNOWLEDGE_EMBED_MODEL')
+            _index = KnowledgeIndex(
+                [path for path in paths.split(os.pathsep) if path],
+                index_dir=os.getenv('KNOWLEDGE_INDEX_DIR', os.path.join(PROJECT_DIR, '.knowledge_index')),
+                embed=ollama_embedder(embed_model) if embed_model else None,
+            )
+        return _index
+
+def format_results(results: List[SearchResult]) -> str:
+    return '\n\n'.join(f"[{os.path.basename(result.source)}] {result.text}" for result in results)
+
+def knowledge_context(query: str) -> str:
+    """Passages about ``query`` for the task prompts; retrieval never fails a run."""
+    try:
+        results = shared_index().search(query, int(os.getenv('KNOWLEDGE_TOP_K', '3')))
+    except Exception:
+        logger.warning("Knowledge search failed", exc_info=True)
+        results = []
+    return format_results(results) if results else 'No local notes on this topic.'
 
-class MyCustomToolInput(BaseModel):
-    """Input schema for MyCustomTool."""
-    argument: str = Field(..., description="Description of the argument.")
+class KnowledgeSearchInput(BaseModel):
+    """Input schema for KnowledgeSearchTool."""
+    query: str = Field(..., description="What to look up, e.g. a topic, name or question.")
 
-class MyCustomTool(BaseTool):
-    name: str = "Name of my tool"
+class KnowledgeSearchTool(BaseTool):
+    name: str = "search_knowledge"
     description: str = (
-        "Clear description for what this tool is useful for, your agent will need this information to use it."
+        "Searches the local knowledge base (notes, documents and earlier research reports) "
+        "and returns the most relevant passages, each with the file it comes from."
     )
-    args_schema: Type[BaseModel] = MyCustomToolInput
+    args_schema: Type[BaseModel] = KnowledgeSearchInput
+    top_k: int = 5
 
-    def _run(self, argument: str) -> str:
-        # Implementation goes here
-        return "this is an example of a tool output, ignore it and move along."
+    def _run(self, query: str) -> str:
+        results = shared_index().search(query, self.top_k)
+        return format_results(results) if results else "No relevant passages found in the local knowledge base."
@@ -0,0 +1,99 @@
+"""Checkpoints of failed research runs.
+
+While a crew runs, every finished task reports its output as a progress
+event. When the run fails (e.g. it times out during ``reporting_task``),
+those outputs are saved under the job id together with the request, so the
+run can be resumed: the crew gets the saved outputs and only runs the tasks
+that didn't finish. Checkpoints expire after ``ttl`` seconds.
+
+One JSON file per job; file operations block, so the async API runs them in
+a thread.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class CheckpointStore:
+    def __init__(self, root: str, ttl: float = 86400.0):
+        self.root = os.path.abspath(root)
+        self.ttl = ttl
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        # Job ids are generated hex strings; anything else can't name a checkpoint
+        if not job_id.isalnum():
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        return os.path.join(self.root, f"{job_id}.json")
+
+    # --- Blocking implementation ---
+    def _save(self, job_id: str, request: Dict[str, Any], tasks: Dict[str, str]) -> None:
+        path = self._path(job_id)
+        checkpoint = {"job_id": job_id, "request": request, "tasks": tasks, "saved_at": time.time()}
+        # Write then rename, so a reader never sees a partial file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(temporary, path)
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            path = self._path(job_id)
+            with open(path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (ValueError, OSError):
+            return None
+        if checkpoint.get("saved_at", 0) < time.time() - self.ttl:
+            self._delete(job_id)
+            return None
+        return checkpoint
+
+    def _delete(self, job_id: str) -> bool:
+        try:
+            os.remove(self._path(job_id))
+            return True
+        except (ValueError, FileNotFoundError):
+            return False
+
+    def _gc(self, now: float) -> int:
+        removed = 0
+        cutoff = now - self.ttl
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    # --- Public API ---
+    async def save(self, job_id: str, request: Dict[str, Any], tasks: Dict[str, str]) -> None:
+        """Stores the finished task outputs (task name -> output) of a job."""
+        await asyncio.to_thread(self._save, job_id, request, tasks)
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the job's checkpoint, or None if there is none or it expired."""
+        return await asyncio.to_thread(self._load, job_id)
+
+    async def delete(self, job_id: str) -> bool:
+        return await asyncio.to_thread(self._delete, job_id)
+
+    async def gc(self) -> int:
+        """Deletes expired checkpoints; returns how many."""
+        return await asyncio.to_thread(self._gc, time.time())
+
+    async def run_gc(self, interval: float) -> None:
+        """Runs ``gc`` every ``interval`` seconds until cancelled."""
+        while True:
+            try:
+                removed = await self.gc()
+                if removed:
+                    logger.info("Checkpoint GC removed %d checkpoint(s)", removed)
+            except Exception as e:
+                logger.warning("Checkpoint GC failed: %s", e)
+            await asyncio.sleep(interval)
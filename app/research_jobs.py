@@ -0,0 +1,202 @@
+"""In-memory job engine for research runs.
+
+Research runs take minutes, so they are executed as background asyncio tasks
+instead of inside the request handler. A semaphore caps how many crews run at
+once and a bounded number of jobs may wait for a free slot.
+
+Each job keeps a log of progress events (status changes plus whatever the
+runner reports through ``emit_progress``) that clients can follow live.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+class JobQueueFullError(Exception):
+    """Raised when no more research jobs can be accepted."""
+
+# Job whose runner is executing in the current task
+_current_job: contextvars.ContextVar[Optional["ResearchJob"]] = contextvars.ContextVar("research_job", default=None)
+
+def current_job() -> Optional["ResearchJob"]:
+    """The job being run by the calling task, if any."""
+    return _current_job.get()
+
+def emit_progress(event: Dict[str, Any]) -> None:
+    """Adds an event to the job being run by the calling task (no-op outside a job)."""
+    job = _current_job.get()
+    if job is not None:
+        job.publish(event)
+
+class ResearchJob:
+    """State of a single research run."""
+
+    def __init__(self, job_id: str, request: Any, key: Optional[str] = None):
+        self.job_id = job_id
+        self.request = request
+        self.key = key
+        # Number of submissions attached to this job (identical requests share it)
+        self.subscribers = 1
+        self.status = JOB_QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        # Progress events; an event's id is its index in this list
+        self.events: List[Dict[str, Any]] = []
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.events.append({"id": len(self.events), "time": time.time(), **event})
+        # Wake everyone waiting and start a new generation of waiters
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+        self.publish({"event": "status", "status": status})
+
+    async def wait_for_event(self, timeout: float) -> bool:
+        """Waits until an event is published; returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+class ResearchJobManager:
+    """Runs research jobs in the background with a concurrency limit.
+
+    ``runner`` is an async callable taking the request and returning the
+    result object stored on the job.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[Any], Awaitable[Any]],
+        max_concurrency: int = 1,
+        max_pending: int = 20,
+        job_ttl: float = 3600.0,
+    ):
+        self.runner = runner
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.jobs: Dict[str, ResearchJob] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it is bound to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of jobs per status."""
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_COMPLETED: 0, JOB_FAILED: 0}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    def prune(self) -> None:
+        """Drops finished jobs older than the configured TTL."""
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.done and job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def find_active(self, key: str) -> Optional[ResearchJob]:
+        """Returns the unfinished job with the given key, if any."""
+        for job in self.jobs.values():
+            if job.key == key and not job.done:
+                return job
+        return None
+
+    def submit(self, request: Any, key: Optional[str] = None) -> ResearchJob:
+        """Schedules a research job and returns it immediately.
+
+        If ``key`` is given and an unfinished job with the same key exists,
+        that job is returned instead of starting a duplicate run.
+        """
+        self.prune()
+        if key is not None:
+            active = self.find_active(key)
+            if active is not None:
+                active.subscribers += 1
+                return active
+
+        if self.counts()[JOB_QUEUED] >= self.max_pending:
+            raise JobQueueFullError(f"Too many queued research jobs (limit {self.max_pending}).")
+
+        job = ResearchJob(uuid.uuid4().hex, request, key)
+        job.set_status(JOB_QUEUED)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def add_completed(self, request: Any, result: Any) -> ResearchJob:
+        """Records a job that is already answered (e.g. from a cache) without running it."""
+        self.prune()
+        job = ResearchJob(uuid.uuid4().hex, request)
+        job.result = result
+        job.started_at = job.finished_at = job.created_at
+        job.set_status(JOB_COMPLETED)
+        self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[ResearchJob]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[ResearchJob]:
+        self.prune()
+        return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    async def wait(self, job: ResearchJob) -> ResearchJob:
+        """Waits for a job to finish without cancelling it if the caller goes away."""
+        if job.task is not None:
+            await asyncio.shield(job.task)
+        return job
+
+    async def _run(self, job: ResearchJob) -> None:
+        async with self._get_semaphore():
+            job.started_at = time.time()
+            job.set_status(JOB_RUNNING)
+            _current_job.set(job)
+            status = JOB_FAILED
+            try:
+                job.result = await self.runner(job.request)
+                status = JOB_COMPLETED
+            except asyncio.CancelledError:
+                job.error = "Research job was cancelled."
+                raise
+            except Exception as e:
+                job.error = f"Unexpected error running research job: {str(e)}"
+                logger.exception(job.error, extra={"job_id": job.job_id})
+            finally:
+                job.finished_at = time.time()
+                # Last event: followers stop once they see the job is done
+                job.set_status(status)
+
+    async def shutdown(self) -> None:
+        """Cancels all unfinished jobs."""
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
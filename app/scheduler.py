@@ -0,0 +1,192 @@
+"""Admission control and per-model concurrency for Ollama requests.
+
+Every generation needs a slot for its model. A model may run at most
+``per_model_concurrency`` generations at once, and at most
+``max_active_models`` different models run at the same time (0 means no
+limit), so Ollama isn't forced to swap weights for every request in a burst. Waiting requests for a
+model that is already loaded are admitted first; once a request for another
+model has waited ``switch_after`` seconds, the running models are drained so
+that model gets its turn.
+
+When ``max_queue`` requests are already waiting, new ones are rejected at
+once instead of piling up until they time out.
+
+Both limits apply per Ollama backend. With several usable backends the
+scheduler admits that many times the slots (``set_backends``) and the pool
+spreads them over the hosts, so different models can run on different hosts.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+class SchedulerRejectedError(Exception):
+    """Base class for requests the scheduler could not admit."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class QueueFullError(SchedulerRejectedError):
+    """The wait queue is full."""
+
+class QueueTimeoutError(SchedulerRejectedError):
+    """The request waited longer than the queue timeout."""
+
+class _Waiter:
+    def __init__(self, model: str):
+        self.model = model
+        self.enqueued_at = time.monotonic()
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class ModelScheduler:
+    def __init__(
+        self,
+        per_model_concurrency: int = 2,
+        max_queue: int = 100,
+        max_active_models: int = 0,
+        queue_timeout: float = 30.0,
+        switch_after: float = 5.0,
+        backends: int = 1,
+    ):
+        self.per_model_concurrency = max(1, per_model_concurrency)
+        self.max_queue = max_queue
+        self.max_active_models = max(0, max_active_models)
+        self.queue_timeout = queue_timeout
+        self.switch_after = switch_after
+        self.backends = max(1, backends)
+        self.running: Dict[str, int] = {}
+        # Most recently used models, i.e. the ones Ollama most likely still has in memory
+        self.loaded: List[str] = []
+        self.waiters: Dict[str, Deque[_Waiter]] = {}
+        self.rejected = 0
+        self.timed_out = 0
+        # Moving average of how long a slot is held, used for Retry-After
+        self._avg_service_time = 1.0
+
+    # --- Introspection ---
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self.waiters.values())
+
+    def stats(self) -> Dict[str, object]:
+        models = sorted(set(self.running) | set(self.waiters))
+        return {
+            "backends": self.backends,
+            "queue_depth": self.queue_depth(),
+            "running": sum(self.running.values()),
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "models": {
+                model: {"running": self.running.get(model, 0), "queued": len(self.waiters.get(model, ()))}
+                for model in models
+            },
+        }
+
+    def retry_after(self) -> int:
+        """Rough number of seconds until a new request could be admitted."""
+        models = self.max_active_models or max(1, len(self.running))
+        capacity = self.per_model_concurrency * models * self.backends
+        return max(1, math.ceil(self._avg_service_time * (self.queue_depth() + 1) / capacity))
+
+    # --- Slot handling ---
+    def set_backends(self, count: int) -> None:
+        """Scales the limits to ``count`` usable backends, admitting waiters if they grew."""
+        count = max(1, count)
+        if count != self.backends:
+            self.backends = count
+            self._dispatch()
+
+    def _can_start(self, model: str) -> bool:
+        running = self.running.get(model, 0)
+        if running >= self.per_model_concurrency * self.backends:
+            return False
+        if running > 0 or not self.max_active_models:
+            return True
+        return len(self.running) < self.max_active_models * self.backends
+
+    def _starving_model(self) -> Optional[str]:
+        """Returns a model that is not loaded but has waited past switch_after."""
+        now = time.monotonic()
+        for model, queue in self.waiters.items():
+            if model not in self.loaded and queue and now - queue[0].enqueued_at >= self.switch_after:
+                return model
+        return None
+
+    def _dispatch(self) -> None:
+        while True:
+            starving = self._starving_model()
+            candidates = [
+                queue[0] for model, queue in self.waiters.items()
+                if queue and self._can_start(model)
+                # Drain the running models while another model is starving
+                and (starving is None or model == starving)
+            ]
+            if not candidates:
+                return
+            # Loaded models first (no weight reload), then oldest request
+            waiter = min(candidates, key=lambda w: (w.model not in self.loaded, w.enqueued_at))
+            self.waiters[waiter.model].popleft()
+            if not self.waiters[waiter.model]:
+                del self.waiters[waiter.model]
+            self.running[waiter.model] = self.running.get(waiter.model, 0) + 1
+            if waiter.model in self.loaded:
+                self.loaded.remove(waiter.model)
+            self.loaded.append(waiter.model)
+            if self.max_active_models:
+                del self.loaded[:-self.max_active_models * self.backends]
+            waiter.future.set_result(time.monotonic())
+
+    def _remove_waiter(self, waiter: _Waiter) -> None:
+        queue = self.waiters.get(waiter.model)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self.waiters[waiter.model]
+
+    async def acquire(self, model: str) -> float:
+        """Waits for a slot for ``model`` and returns the time it was granted.
+
+        Raises SchedulerRejectedError if no slot is available.
+        """
+        waiter = _Waiter(model)
+        self.waiters.setdefault(model, deque()).append(waiter)
+        self._dispatch()
+        if not waiter.future.done() and self.queue_depth() > self.max_queue:
+            self._remove_waiter(waiter)
+            self.rejected += 1
+            raise QueueFullError(
+                f"Too many queued requests (limit {self.max_queue}).", self.retry_after()
+            )
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                return waiter.future.result()
+            self._remove_waiter(waiter)
+            self.timed_out += 1
+            raise QueueTimeoutError(
+                f"Timed out after {self.queue_timeout} seconds waiting for model '{model}'.",
+                self.retry_after(),
+            )
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                # The slot was granted just as we were cancelled: give it back
+                self.release(model)
+            else:
+                self._remove_waiter(waiter)
+                self._dispatch()
+            raise
+
+    def release(self, model: str, granted_at: Optional[float] = None) -> None:
+        """Frees a slot; ``granted_at`` (from acquire) feeds the Retry-After estimate."""
+        running = self.running.get(model, 0) - 1
+        if running > 0:
+            self.running[model] = running
+        else:
+            self.running.pop(model, None)
+        if granted_at is not None:
+            service_time = time.monotonic() - granted_at
+            self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+        self._dispatch()
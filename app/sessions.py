@@ -0,0 +1,95 @@
+"""Server-side conversation history for multi-turn chat.
+
+A session keeps the messages exchanged so far so each turn can be sent to
+Ollama's ``/api/chat`` without the client resending the transcript. The
+history is kept under a token budget by dropping the oldest turns. Trimming
+goes down to ``trim_to`` of the budget in one step, so the retained history
+stays an unchanged prefix for several turns and Ollama can keep reusing its
+cached prompt evaluation instead of re-processing everything every turn.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) without a tokenizer."""
+    return len(text) // 4 + 1
+
+class ChatSession:
+    def __init__(self, session_id: str, model: str):
+        self.session_id = session_id
+        self.model = model
+        self.messages: List[Dict[str, str]] = []
+        # Ollama host that served the last turn and still holds its prompt cache
+        self.backend_url: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.lock = asyncio.Lock()
+
+    def tokens(self) -> int:
+        return sum(estimate_tokens(message["content"]) for message in self.messages)
+
+class SessionStore:
+    def __init__(
+        self,
+        token_budget: int = 2048,
+        trim_to: float = 0.75,
+        max_sessions: int = 1000,
+        ttl: float = 3600.0,
+    ):
+        self.token_budget = token_budget
+        self.trim_to = trim_to
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def prune(self) -> None:
+        """Drops sessions idle for longer than the TTL."""
+        cutoff = time.time() - self.ttl
+        expired = [session_id for session_id, session in self._sessions.items() if session.updated_at < cutoff]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+    def create(self, model: str) -> ChatSession:
+        """Starts a session under a new random id; clients never choose the id."""
+        self.prune()
+        session = ChatSession(uuid.uuid4().hex, model)
+        self._sessions[session.session_id] = session
+        # Evict the least recently used sessions
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        self.prune()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def build_messages(self, session: ChatSession, message: str) -> List[Dict[str, str]]:
+        """Returns the history plus the new user message, trimming the history if needed."""
+        new_tokens = estimate_tokens(message)
+        if session.tokens() + new_tokens > self.token_budget:
+            target = self.token_budget * self.trim_to - new_tokens
+            # Drop whole turns (user + assistant) from the start, keeping a system prompt
+            start = 1 if session.messages and session.messages[0]["role"] == "system" else 0
+            while len(session.messages) > start and session.tokens() > target:
+                del session.messages[start:start + 2]
+        return session.messages + [{"role": "user", "content": message}]
+
+    def record_turn(self, session: ChatSession, message: str, reply: str, backend_url: Optional[str] = None) -> None:
+        """Stores a completed turn; only called once the reply has fully arrived."""
+        session.messages.append({"role": "user", "content": message})
+        session.messages.append({"role": "assistant", "content": reply})
+        session.updated_at = time.time()
+        if backend_url is not None:
+            session.backend_url = backend_url
@@ -0,0 +1,147 @@
+"""In-flight deduplication of identical concurrent requests.
+
+``SingleFlight`` shares one awaitable result between callers with the same
+key. ``StreamFanout`` does the same for NDJSON streams: the first caller opens
+the upstream stream, later callers replay what was already received and then
+follow it live.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs ``fn`` unless a call with the same key is already running."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shield so one caller going away doesn't cancel the shared call
+        return await asyncio.shield(task)
+
+# A stream source opens the upstream stream (raising if that fails) and
+# returns the chunk iterator plus a coroutine function that closes it.
+StreamSource = Callable[[], Awaitable[Tuple[AsyncIterator[str], Callable[[], Awaitable[None]]]]]
+
+class _Broadcast:
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.finished = False
+        self.subscribers = 0
+        self.started: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self) -> None:
+        self.finished = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def unsubscribe(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.finished and self.task is not None:
+            # Nobody is listening anymore: stop the upstream generation
+            self.task.cancel()
+
+class Subscription:
+    """One caller's view of a shared stream.
+
+    Replays the chunks received so far, then follows the stream live. Closing
+    releases the subscriber whether or not it was ever iterated, so a response
+    that never starts (the client left first) doesn't keep the stream alive.
+    """
+    def __init__(self, broadcast: _Broadcast):
+        self._broadcast = broadcast
+        self._index = 0
+        self.closed = False
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> str:
+        broadcast = self._broadcast
+        try:
+            while not self.closed:
+                if self._index < len(broadcast.chunks):
+                    self._index += 1
+                    return broadcast.chunks[self._index - 1]
+                if broadcast.finished:
+                    break
+                await broadcast._changed.wait()
+        except BaseException:
+            # The client disconnected while waiting for the next chunk
+            self.close()
+            raise
+        self.close()
+        raise StopAsyncIteration
+
+    def close(self) -> None:
+        # Synchronous on purpose: this also runs when the client disconnects
+        if not self.closed:
+            self.closed = True
+            self._broadcast.unsubscribe()
+
+    async def aclose(self) -> None:
+        self.close()
+
+class StreamFanout:
+    def __init__(self):
+        self._streams: Dict[str, _Broadcast] = {}
+
+    def in_flight(self) -> int:
+        return len(self._streams)
+
+    async def join(self, key: str, source: StreamSource) -> Subscription:
+        """Returns a subscription to ``key``, opening the upstream stream if needed.
+
+        Errors raised while opening the stream are raised to every caller. The
+        caller must ``aclose`` the subscription once it is done with it.
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.create_task(self._pump(key, broadcast, source))
+        broadcast.subscribers += 1
+        try:
+            await asyncio.shield(broadcast.started)
+        except BaseException:
+            broadcast.subscribers -= 1
+            raise
+        return Subscription(broadcast)
+
+    async def _pump(self, key: str, broadcast: _Broadcast, source: StreamSource) -> None:
+        try:
+            try:
+                chunks, aclose = await source()
+            except asyncio.CancelledError:
+                broadcast.started.cancel()
+                raise
+            except BaseException as e:
+                broadcast.started.set_exception(e)
+                # Retrieved by the joiners; avoid "exception never retrieved" warnings
+                broadcast.started.exception()
+                return
+            broadcast.started.set_result(None)
+            try:
+                async for chunk in chunks:
+                    broadcast.publish(chunk)
+            finally:
+                await aclose()
+        finally:
+            broadcast.finish()
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
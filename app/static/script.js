@@ -4,12 +4,16 @@ document.addEventListener('DOMContentLoaded', () => {
     const sendButton = document.getElementById('sendButton');
     const chatContainer = document.getElementById('chatContainer');
     const modelSelect = document.getElementById('modelSelect');
+    // Opt-in: the conversation history is kept server-side under an id from POST /api/sessions
+    const historyInput = document.getElementById('historyInput');
+    let sessionId = null;
 
     // Research elements
     const topicInput = document.getElementById('topicInput');
     const researchButton = document.getElementById('researchButton');
     const researchContainer = document.getElementById('researchContainer');
     const researchModelSelect = document.getElementById('researchModelSelect');
+    const forceRefreshInput = document.getElementById('forceRefreshInput');
 
     // Load available models
     async function loadModels() {
@@ -75,6 +79,27 @@ document.addEventListener('DOMContentLoaded', () => {
         messageDiv.innerHTML = `<div class="message-content">${content}</div>`;
         chatContainer.appendChild(messageDiv);
         chatContainer.scrollTop = chatContainer.scrollHeight;
+        return messageDiv.querySelector('.message-content');
+    }
+
+    // Read an NDJSON response body, calling onChunk for every parsed line
+    async function readNdjson(response, onChunk) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            const lines = buffer.split('\n');
+            buffer = lines.pop(); // Keep the incomplete last line for the next read
+            lines.filter(line => line.trim()).forEach(line => onChunk(JSON.parse(line)));
+        }
+        if (buffer.trim()) {
+            onChunk(JSON.parse(buffer));
+        }
     }
 
     // Add research result
@@ -121,6 +146,8 @@ document.addEventListener('DOMContentLoaded', () => {
         } else {
              if (resultData.stdout_result) {
                  contentHTML = `<div class="stdout-output"><b class="block mb-1">Crew Output (stdout):</b><pre class="whitespace-pre-wrap bg-gray-100 p-2 rounded">${escapeHtml(resultData.stdout_result)}</pre></div>`;
+             } else if (resultData.cached) {
+                 contentHTML = `<div class="text-gray-500">Recent report for this topic, served from the report store. Tick "Force refresh" to run the crew again.</div>`
              } else {
                  contentHTML = `<div class="text-gray-500">Crew output (stdout) is empty.</div>`
              }
@@ -147,6 +174,33 @@ document.addEventListener('DOMContentLoaded', () => {
              .replace(/'/g, "&#039;");
      }
 
+    // Starts a server-side session the first time it is needed
+    async function ensureSession() {
+        if (!historyInput.checked) return null;
+        if (!sessionId) {
+            const response = await fetch('/api/sessions', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ model: modelSelect.value })
+            });
+            if (!response.ok) {
+                throw new Error('Could not start a conversation');
+            }
+            sessionId = (await response.json()).session_id;
+        }
+        return sessionId;
+    }
+
+    // Unticking the box forgets the conversation
+    historyInput.addEventListener('change', () => {
+        if (!historyInput.checked && sessionId) {
+            fetch(`/api/sessions/${sessionId}`, { method: 'DELETE' });
+            sessionId = null;
+        }
+    });
+
     // Send message to API
     async function sendMessage() {
         const message = messageInput.value.trim();
@@ -161,24 +215,36 @@ document.addEventListener('DOMContentLoaded', () => {
         messageInput.value = '';
 
         try {
+            const body = {
+                message: message,
+                model: modelSelect.value,
+                stream: true
+            };
+            const session = await ensureSession();
+            if (session) {
+                body.session_id = session;
+            }
             const response = await fetch('/api/chat', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({
-                    message: message,
-                    model: modelSelect.value,
-                    stream: false
-                })
+                body: JSON.stringify(body)
             });
 
             if (!response.ok) {
                 throw new Error('API request failed');
             }
 
-            const data = await response.json();
-            addMessage(data.response);
+            // Render tokens as they arrive
+            const contentDiv = addMessage('');
+            await readNdjson(response, chunk => {
+                if (chunk.error) {
+                    throw new Error(chunk.error);
+                }
+                contentDiv.textContent += chunk.response || '';
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+            });
         } catch (error) {
             console.error('Error:', error);
             addMessage('Sorry, there was an error processing your request.');
@@ -190,6 +256,145 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Poll a research job until it has finished
+    async function waitForResearchJob(jobId, intervalMs = 2000) {
+        while (true) {
+            const response = await fetch(`/api/research/jobs/${encodeURIComponent(jobId)}`);
+            if (!response.ok) {
+                throw new Error(`Failed to fetch research job status (${response.status})`);
+            }
+            const job = await response.json();
+            if (job.status === 'completed' || job.status === 'failed') {
+                return job;
+            }
+            researchContainer.innerHTML = `<div class="text-center p-4 text-gray-500">Research ${escapeHtml(job.status)}...</div>`;
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+    }
+
+    // Show one crew progress event
+    function addProgressEvent(list, event) {
+        const item = document.createElement('li');
+        item.className = 'mb-1';
+        let text = '';
+        switch (event.event) {
+            case 'status':
+                text = `Research ${event.status}`;
+                break;
+            case 'crew_started':
+                text = 'Crew started';
+                break;
+            case 'task_started':
+                text = `${event.agent || 'Agent'} started ${event.task}`;
+                break;
+            case 'task_finished':
+                text = `${event.agent || 'Agent'} finished ${event.task}`;
+                break;
+            case 'task_restored':
+                text = `Restored ${event.task} from checkpoint`;
+                break;
+            case 'crew_finished':
+                text = 'Crew finished';
+                break;
+            case 'report':
+                text = `Report saved: ${event.report_filename}`;
+                break;
+            default:
+                text = event.event;
+        }
+        item.innerHTML = `<span class="text-gray-600">${escapeHtml(text)}</span>`;
+        if (event.output) {
+            // Intermediate task output, collapsed by default
+            item.innerHTML += `<details class="ml-4"><summary class="cursor-pointer text-sm text-gray-500">Output</summary><pre class="whitespace-pre-wrap bg-gray-100 p-2 rounded text-sm">${escapeHtml(event.output)}</pre></details>`;
+        }
+        list.appendChild(item);
+        researchContainer.scrollTop = researchContainer.scrollHeight;
+    }
+
+    // Follow a research job's progress events until it has finished
+    function followResearchJob(jobId) {
+        if (!window.EventSource) {
+            return waitForResearchJob(jobId);
+        }
+        researchContainer.innerHTML = '';
+        const progressList = document.createElement('ul');
+        progressList.className = 'research-progress p-4 mb-4 text-sm';
+        researchContainer.appendChild(progressList);
+
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(`/api/research/jobs/${encodeURIComponent(jobId)}/events`);
+            ['status', 'crew_started', 'task_started', 'task_finished', 'task_restored', 'crew_finished', 'report'].forEach(type => {
+                source.addEventListener(type, e => addProgressEvent(progressList, JSON.parse(e.data)));
+            });
+            source.addEventListener('done', e => {
+                source.close();
+                resolve(JSON.parse(e.data));
+            });
+            source.onerror = () => {
+                // The browser reconnects on its own unless the stream was refused
+                if (source.readyState === EventSource.CLOSED) {
+                    reject(new Error('Lost connection to research progress'));
+                }
+            };
+        });
+    }
+
+    // Submit a research job (new or resumed), follow it and show its result
+    async function runResearchJob(url, body) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: body ? JSON.stringify(body) : undefined
+        });
+
+        // Check response status BEFORE trying to parse JSON
+        if (!response.ok) {
+            // Try to get error details from response body if possible
+            let errorDetail = `Research request failed with status ${response.status}`;
+            try {
+                const errorData = await response.json();
+                errorDetail = errorData.detail || JSON.stringify(errorData); // Use FastAPI 'detail' if available
+            } catch (e) {
+                // Ignore if response body is not JSON or empty
+            }
+            throw new Error(errorDetail);
+        }
+
+        const job = await response.json();
+        const finishedJob = await followResearchJob(job.job_id);
+        const data = finishedJob.result || { error: finishedJob.error, model: finishedJob.model };
+        // Keep the progress log above the result
+        researchContainer.querySelectorAll(':scope > :not(.research-progress)').forEach(el => el.remove());
+        addResearchResult(data); // Pass the whole data object
+        if (data.resumable) {
+            addResumeButton(finishedJob.job_id);
+        }
+    }
+
+    // Offer to resume a failed job from the tasks it finished
+    function addResumeButton(jobId) {
+        const button = document.createElement('button');
+        button.className = 'bg-blue-500 hover:bg-blue-700 text-white text-sm font-bold py-1 px-3 rounded mb-4';
+        button.textContent = 'Resume research';
+        button.addEventListener('click', async () => {
+            button.disabled = true;
+            topicInput.disabled = true;
+            researchButton.disabled = true;
+            try {
+                await runResearchJob(`/api/research/jobs/${encodeURIComponent(jobId)}/resume`);
+            } catch (error) {
+                console.error('Error resuming research:', error);
+                addResearchResult({ error: error.message || 'Sorry, the research could not be resumed.' });
+            } finally {
+                topicInput.disabled = false;
+                researchButton.disabled = false;
+            }
+        });
+        researchContainer.appendChild(button);
+    }
+
     // Start research
     async function startResearch() {
         const topic = topicInput.value.trim();
@@ -224,34 +429,12 @@ document.addEventListener('DOMContentLoaded', () => {
         researchContainer.innerHTML = '<div class="text-center p-4 text-gray-500">Running research...</div>';
 
         try {
-            const response = await fetch('/api/research', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    topic: topic,
-                    model: modelName,
-                    backend: backendName
-                })
+            await runResearchJob('/api/research/jobs', {
+                topic: topic,
+                model: modelName,
+                backend: backendName,
+                force_refresh: forceRefreshInput.checked
             });
-
-            // Check response status BEFORE trying to parse JSON
-            if (!response.ok) {
-                // Try to get error details from response body if possible
-                let errorDetail = `Research request failed with status ${response.status}`;
-                try {
-                    const errorData = await response.json();
-                    errorDetail = errorData.detail || JSON.stringify(errorData); // Use FastAPI 'detail' if available
-                } catch (e) {
-                    // Ignore if response body is not JSON or empty
-                }
-                throw new Error(errorDetail);
-            }
-
-            const data = await response.json();
-            researchContainer.innerHTML = ''; // Clear loading message
-            addResearchResult(data); // Pass the whole data object
         } catch (error) {
             console.error('Error in startResearch:', error);
             researchContainer.innerHTML = ''; // Clear loading message
@@ -0,0 +1,121 @@
+"""In-memory, precompressed static assets with content-hashed URLs.
+
+At startup every file in the static directory is read, hashed and, when
+that pays off, compressed with gzip (and brotli if installed). Each asset is
+reachable under its plain name and under a hashed name such as
+``script.3f2a9c1b7d4e.js``. ``index.html`` is rewritten to reference the
+hashed names, which are served with an immutable ``Cache-Control``: a new
+build changes the hash, so browsers never need to revalidate them. Plain
+names and the page itself are revalidated with their ETag instead.
+
+Changes to the files are picked up on restart.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from app.http_files import MIN_COMPRESS_SIZE, brotli, choose_encoding, etag_matches, file_response, file_sha256
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Asset references in HTML: src="/static/..." or href="/static/..."
+_REFERENCE = re.compile(r'((?:src|href)=["\'])/static/([^"\'?#]+)')
+
+class Asset(NamedTuple):
+    path: str
+    media_type: str
+    etag_hash: str
+    body: Optional[bytes] # None if the file is too large to keep in memory
+    encoded: Dict[str, bytes] # Content-Encoding -> compressed body
+
+def media_type_for(path: str) -> str:
+    # Responses add "charset=utf-8" to text/* types themselves
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    """Compressed bodies worth sending (smaller than the original)."""
+    if len(body) < MIN_COMPRESS_SIZE:
+        return {}
+    variants = {}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+def hashed_name(name: str, digest: str) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest[:12]}{ext}"
+
+class StaticAssets:
+    def __init__(self, directory: str, index: str = "index.html", max_memory_bytes: int = 1024 * 1024):
+        self.directory = directory
+        self.index = index
+        self.max_memory_bytes = max_memory_bytes
+        # URL name (plain or hashed) -> asset
+        self.assets: Dict[str, Asset] = {}
+        # Plain name -> hashed name
+        self.hashed: Dict[str, str] = {}
+        self.load()
+
+    def _load_file(self, path: str, body: Optional[bytes] = None) -> Asset:
+        if body is None and os.path.getsize(path) <= self.max_memory_bytes:
+            with open(path, "rb") as f:
+                body = f.read()
+        if body is None:
+            return Asset(path, media_type_for(path), file_sha256(path), None, {})
+        return Asset(path, media_type_for(path), hashlib.sha256(body).hexdigest(), body, compress_variants(body))
+
+    def load(self) -> None:
+        assets: Dict[str, Asset] = {}
+        hashed: Dict[str, str] = {}
+        for root, _, files in os.walk(self.directory):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                if name == self.index or filename.endswith((".gz", ".br")):
+                    continue
+                asset = self._load_file(path)
+                assets[name] = asset
+                hashed[name] = hashed_name(name, asset.etag_hash)
+                assets[hashed[name]] = asset
+
+        index_path = os.path.join(self.directory, self.index)
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                html = f.read()
+            html = _REFERENCE.sub(
+                lambda m: f"{m.group(1)}/static/{hashed.get(m.group(2), m.group(2))}", html)
+            assets[self.index] = self._load_file(index_path, html.encode("utf-8"))
+        self.assets, self.hashed = assets, hashed
+
+    async def response(self, request: Request, name: str) -> Response:
+        asset = self.assets.get(name)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        is_hashed = name != self.index and name not in self.hashed
+        headers = {"Cache-Control": IMMUTABLE if is_hashed else REVALIDATE}
+        if asset.body is None:
+            # Too large to cache: streamed from disk, uncompressed
+            return await file_response(request, asset.path, asset.etag_hash, asset.media_type,
+                                       headers=headers, compress=False)
+
+        body = asset.body
+        encoding = None
+        if asset.encoded:
+            headers["Vary"] = "Accept-Encoding"
+            encoding = choose_encoding(request.headers.get("accept-encoding", ""), asset.encoded)
+        headers["ETag"] = f'"{asset.etag_hash}-{encoding}"' if encoding else f'"{asset.etag_hash}"'
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            body = asset.encoded[encoding]
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=asset.media_type, headers=headers)
@@ -0,0 +1,112 @@
+"""Compares cold-spawn and warm-worker latency for research crews.
+
+Overhead mode (default) measures what each request pays before the crew does
+any LLM work:
+
+- cold: a fresh Python interpreter importing the crew module, as every
+  ``crewai run`` does (uv resolution not included, so this is a lower bound)
+- warm: dispatching a call to an already started worker with the crew imported
+
+Full mode (``--full``) runs a real research crew both ways; it needs a
+reachable model backend and takes minutes.
+
+Usage:
+    python benchmarks/bench_crew_workers.py --iterations 5
+    python benchmarks/bench_crew_workers.py --full --topic "AI LLMs" --model smollm2:135m
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from app.crew_workers import CREW_PROJECTS, CrewWorkerPool, _ping  # noqa: E402
+
+RESEARCH_PATH = os.path.join(REPO_ROOT, "app", "research")
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_s": round(statistics.mean(samples), 4),
+        "p50_s": round(ordered[len(ordered) // 2], 4),
+        "p95_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "min_s": round(ordered[0], 4),
+    }
+
+def cold_import(backend):
+    package, _ = CREW_PROJECTS[backend]
+    src_path = os.path.join(RESEARCH_PATH, package, "src")
+    code = f"import sys; sys.path.insert(0, {src_path!r}); import {package}.crew"
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=False, capture_output=True)
+    return time.perf_counter() - start
+
+def cold_crewai_run(backend, topic):
+    package, _ = CREW_PROJECTS[backend]
+    env = dict(os.environ, RESEARCH_TOPIC=topic, RESEARCH_OUTPUT_FILE="benchmark_report.md")
+    start = time.perf_counter()
+    subprocess.run(["crewai", "run"], cwd=os.path.join(RESEARCH_PATH, package), env=env,
+                   check=False, capture_output=True)
+    return time.perf_counter() - start
+
+async def warm_samples(pool, iterations, call):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="ollama", choices=sorted(CREW_PROJECTS))
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--full", action="store_true", help="Run the real crew instead of measuring overhead")
+    parser.add_argument("--topic", default="AI LLMs")
+    parser.add_argument("--model", default="smollm2:135m")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    package, _ = CREW_PROJECTS[args.backend]
+    project_path = os.path.join(RESEARCH_PATH, package)
+    pool = CrewWorkerPool(RESEARCH_PATH, max_workers=1)
+
+    start = time.perf_counter()
+    await pool.warm_up()
+    warm_up_s = time.perf_counter() - start
+
+    loop = asyncio.get_running_loop()
+    try:
+        if args.full:
+            cold = [cold_crewai_run(args.backend, args.topic) for _ in range(args.iterations)]
+            model = f"{args.backend}/{args.model}"
+            warm = await warm_samples(pool, args.iterations, lambda: pool.run(
+                args.backend, model, args.topic, project_path, "benchmark_report.md", timeout=600))
+        else:
+            cold = [cold_import(args.backend) for _ in range(args.iterations)]
+            warm = await warm_samples(pool, args.iterations, lambda: loop.run_in_executor(pool._slots[0], _ping))
+    finally:
+        pool.shutdown(kill=True)
+
+    results = {
+        "mode": "full" if args.full else "overhead",
+        "backend": args.backend,
+        "worker_warm_up_s": round(warm_up_s, 4),
+        "cold_spawn": summarize(cold),
+        "warm_worker": summarize(warm),
+    }
+    results["speedup_p50"] = round(results["cold_spawn"]["p50_s"] / max(results["warm_worker"]["p50_s"], 1e-9), 1)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,321 @@
+"""Load test for the API against a local Ollama stand-in.
+
+Starts ``fake_ollama`` and the API (uvicorn, one process each) on free ports.
+Then it runs scripted scenarios and reports p50/p95/p99 latency and
+requests/s per scenario as JSON. Research jobs run against a stub
+``crewai`` command, so no model or crewai install is needed.
+
+Scenarios:
+- chat_burst: concurrent non-streaming /api/chat requests (distinct prompts)
+- chat_stream: concurrent streaming requests, with time-to-first-token
+- models: repeated /api/models requests
+- research: research jobs submitted at once and polled until done
+
+Reports include the git commit. ``--compare`` prints the change against an
+earlier report and, with ``--max-regression``, exits non-zero if a p95 or
+the throughput got worse by more than that percentage.
+
+Usage:
+    python benchmarks/bench_load.py --output bench.json
+    python benchmarks/bench_load.py --scenarios chat_burst chat_stream --requests 500 --concurrency 64
+    python benchmarks/bench_load.py --compare bench.json --max-regression 20
+    python benchmarks/bench_load.py --target http://localhost:8000 --scenarios models
+"""
+import argparse
+import asyncio
+import datetime
+import glob
+import json
+import math
+import os
+import platform
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import httpx
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BENCH_TOPIC_PREFIX = "loadbench"
+
+# Stand-in for `crewai run`: waits, then writes the report the API expects
+FAKE_CREWAI = '''import os, sys, time
+time.sleep(float(os.environ.get("FAKE_CREW_SECONDS", "0.5")))
+with open(os.environ["RESEARCH_OUTPUT_FILE"], "w", encoding="utf-8") as f:
+    f.write("# Report on " + os.environ.get("RESEARCH_TOPIC", "") + "\\n")
+print("fake crew done")
+'''
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def summarize(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {"n": 0}
+    return {
+        "n": len(ordered),
+        "mean_s": round(sum(ordered) / len(ordered), 4),
+        "p50_s": round(percentile(ordered, 50), 4),
+        "p95_s": round(percentile(ordered, 95), 4),
+        "p99_s": round(percentile(ordered, 99), 4),
+        "max_s": round(ordered[-1], 4),
+    }
+
+async def run_load(requests, concurrency, call):
+    """Runs ``call(i)`` for every i with at most ``concurrency`` in flight.
+
+    ``call`` returns a dict of timings (at least ``latency``); exceptions
+    count as errors.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    timings, errors = [], []
+
+    async def one(i):
+        async with semaphore:
+            try:
+                timings.append(await call(i))
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    duration = time.perf_counter() - start
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "duration_s": round(duration, 4),
+        "rps": round(len(timings) / duration, 2) if duration else None,
+        "latency": summarize([t["latency"] for t in timings]),
+    }
+    ttft = [t["ttft"] for t in timings if "ttft" in t]
+    if ttft:
+        result["time_to_first_token"] = summarize(ttft)
+    if errors:
+        result["sample_errors"] = sorted(set(errors))[:5]
+    return result
+
+# --- Scenarios ---
+async def chat_burst(client, args):
+    async def call(i):
+        start = time.perf_counter()
+        response = await client.post("/api/chat", json={"message": f"bench prompt {i}", "model": args.model})
+        response.raise_for_status()
+        return {"latency": time.perf_counter() - start}
+    return await run_load(args.requests, args.concurrency, call)
+
+async def chat_stream(client, args):
+    async def call(i):
+        start = time.perf_counter()
+        ttft = None
+        body = {"message": f"bench stream prompt {i}", "model": args.model, "stream": True}
+        async with client.stream("POST", "/api/chat", json=body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip() and ttft is None:
+                    ttft = time.perf_counter() - start
+                if line.strip() and json.loads(line).get("error"):
+                    raise RuntimeError(json.loads(line)["error"])
+        return {"latency": time.perf_counter() - start, "ttft": ttft}
+    return await run_load(args.requests, args.concurrency, call)
+
+async def models(client, args):
+    async def call(i):
+        start = time.perf_counter()
+        response = await client.get("/api/models")
+        response.raise_for_status()
+        return {"latency": time.perf_counter() - start}
+    return await run_load(args.requests, args.concurrency, call)
+
+async def research(client, args):
+    async def call(i):
+        start = time.perf_counter()
+        body = {"topic": f"{BENCH_TOPIC_PREFIX} {i} {time.time()}", "model": args.model, "backend": "ollama"}
+        response = await client.post("/api/research/jobs", json=body)
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        while True:
+            job = (await client.get(f"/api/research/jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        if job["status"] == "failed" or (job.get("result") or {}).get("error"):
+            raise RuntimeError(job.get("error") or job["result"]["error"])
+        return {"latency": time.perf_counter() - start}
+    return await run_load(args.research_jobs, args.research_jobs, call)
+
+SCENARIOS = {"chat_burst": chat_burst, "chat_stream": chat_stream, "models": models, "research": research}
+
+# --- Servers ---
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_uvicorn(app, port, env, app_dir=REPO_ROOT):
+    command = [sys.executable, "-m", "uvicorn", "--app-dir", app_dir, app,
+               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL)
+
+async def wait_ready(url, processes=(), timeout=30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if any(process.poll() is not None for process in processes):
+                raise RuntimeError("A benchmark server exited during startup (is uvicorn installed?)")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+@contextmanager
+def local_servers(args):
+    """Runs fake Ollama and the API; yields the API base URL and the server processes."""
+    ollama_port, api_port = free_port(), free_port()
+    fake_env = dict(
+        os.environ,
+        FAKE_OLLAMA_TOKENS_PER_SECOND=str(args.tokens_per_second),
+        FAKE_OLLAMA_FIRST_TOKEN_LATENCY=str(args.first_token_latency),
+        FAKE_OLLAMA_RESPONSE_TOKENS=str(args.response_tokens),
+        FAKE_OLLAMA_PARALLEL=str(args.ollama_parallel),
+        FAKE_OLLAMA_MODELS=args.model,
+    )
+    with tempfile.TemporaryDirectory() as bin_dir:
+        crewai = os.path.join(bin_dir, "crewai")
+        with open(crewai, "w", encoding="utf-8") as f:
+            f.write(f"#!{sys.executable}\n{FAKE_CREWAI}")
+        os.chmod(crewai, os.stat(crewai).st_mode | stat.S_IEXEC)
+
+        api_env = dict(
+            os.environ,
+            OLLAMA_API_URL=f"http://127.0.0.1:{ollama_port}/api/generate",
+            RESEARCH_EXECUTION_MODE="subprocess",
+            PATH=bin_dir + os.pathsep + os.environ.get("PATH", ""),
+            FAKE_CREW_SECONDS=str(args.crew_seconds),
+            # Keep benchmark reports out of the real report store
+            REPORTS_DIR=os.path.join(bin_dir, "reports"),
+            CHECKPOINTS_DIR=os.path.join(bin_dir, "checkpoints"),
+            LOG_LEVEL="WARNING",
+        )
+        for item in args.env:
+            key, value = item.split("=", 1)
+            api_env[key] = value
+
+        processes = [start_uvicorn("fake_ollama:app", ollama_port, fake_env, os.path.join(REPO_ROOT, "benchmarks"))]
+        try:
+            processes.append(start_uvicorn("app.main:app", api_port, api_env))
+            yield f"http://127.0.0.1:{api_port}", processes
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=10)
+            # Reports the stub crew left behind if they never reached the store
+            for path in glob.glob(os.path.join(REPO_ROOT, "app", "research", "*", f"research_{BENCH_TOPIC_PREFIX}_*.md")):
+                os.remove(path)
+
+# --- Reporting ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def change(old, new):
+    if not old or new is None:
+        return None
+    return round((new - old) / old * 100, 1)
+
+def compare(baseline, report, max_regression=None):
+    """Prints the change per scenario; returns False if a regression exceeds the limit."""
+    ok = True
+    print(f"Compared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for name, new in report["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        for field in ("p50_s", "p95_s", "p99_s"):
+            delta = change(old["latency"].get(field), new["latency"].get(field))
+            print(f"  {name:12} {field:6} {old['latency'].get(field)} -> {new['latency'].get(field)} ({delta:+}%)"
+                  if delta is not None else f"  {name:12} {field:6} n/a")
+            if field == "p95_s" and max_regression is not None and delta is not None and delta > max_regression:
+                ok = False
+        delta = change(old.get("rps"), new.get("rps"))
+        print(f"  {name:12} rps    {old.get('rps')} -> {new.get('rps')} ({delta:+}%)"
+              if delta is not None else f"  {name:12} rps    n/a")
+        if max_regression is not None and delta is not None and -delta > max_regression:
+            ok = False
+    return ok
+
+async def run_scenarios(base_url, args, processes=()):
+    await wait_ready(f"{base_url}/api/scheduler", processes)
+    scenarios = {}
+    timeout = httpx.Timeout(120.0)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        for name in args.scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            scenarios[name] = await SCENARIOS[name](client, args)
+    return scenarios
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per chat/models scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--research-jobs", type=int, default=10)
+    parser.add_argument("--model", default="smollm2:135m")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.05)
+    parser.add_argument("--response-tokens", type=int, default=20)
+    parser.add_argument("--ollama-parallel", type=int, default=4, help="Concurrent generations of the fake Ollama")
+    parser.add_argument("--crew-seconds", type=float, default=0.5, help="Duration of a stub research crew")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra API environment variable")
+    parser.add_argument("--target", help="Benchmark an already running API instead of starting one")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, help="Fail if p95 or rps regress by more than this percentage")
+    args = parser.parse_args()
+
+    if args.target:
+        scenarios = await run_scenarios(args.target.rstrip("/"), args)
+    else:
+        with local_servers(args) as (base_url, processes):
+            scenarios = await run_scenarios(base_url, args, processes)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "target": args.target or "local",
+            "settings": {key: value for key, value in vars(args).items()
+                         if key not in ("output", "compare", "max_regression", "target")},
+        },
+        "scenarios": scenarios,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            if not compare(json.load(f), report, args.max_regression):
+                sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""Compares the sequential and parallel report modes of the research crews.
+
+Simulated mode (default) measures the reporting step against ``fake_ollama``:
+
+- sequential: one generation producing all sections, as ``reporting_task``
+  does under ``Process.sequential``
+- parallel: one generation per section, at most ``--concurrency`` at once,
+  using the crews' own ``run_bounded``
+
+The speedup depends on how many generations the server runs at once
+(``--ollama-parallel``, ``OLLAMA_NUM_PARALLEL`` for a real Ollama). The fake
+streams every generation at full speed, while a real GPU shares its
+throughput between them, so the simulated speedup is an upper bound.
+
+Full mode (``--full``) runs a real research crew in both modes; it needs
+crewAI, a reachable model backend and takes minutes.
+
+Usage:
+    python benchmarks/bench_report_mode.py --sections 10 --ollama-parallel 4
+    python benchmarks/bench_report_mode.py --full --topic "AI LLMs" --model smollm2:135m
+"""
+import argparse
+import datetime
+import importlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.crew_workers import CREW_PROJECTS  # noqa: E402
+from app.research.crew_common.report_sections import run_bounded  # noqa: E402
+from fake_ollama import create_app  # noqa: E402
+
+RESEARCH_PATH = os.path.join(REPO_ROOT, "app", "research")
+
+def summarize(samples):
+    return {
+        "n": len(samples),
+        "mean_s": round(statistics.mean(samples), 4),
+        "min_s": round(min(samples), 4),
+        "max_s": round(max(samples), 4),
+    }
+
+# --- Simulated ---
+def start_fake_ollama(args):
+    fake = create_app(tokens_per_second=args.tokens_per_second, first_token_latency=args.first_token_latency,
+                      parallel=args.ollama_parallel)
+    server = uvicorn.Server(uvicorn.Config(fake, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+def generate(client, model, tokens):
+    response = client.post("/api/chat", json={
+        "model": model,
+        "messages": [{"role": "user", "content": "Write a report section."}],
+        "options": {"num_predict": tokens},
+        "stream": False,
+    })
+    response.raise_for_status()
+    return response.json()["message"]["content"]
+
+def simulated(args):
+    server, thread, base_url = start_fake_ollama(args)
+    sequential, parallel = [], []
+    try:
+        with httpx.Client(base_url=base_url, timeout=600,
+                          limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                generate(client, args.model, args.sections * args.section_tokens)
+                sequential.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                run_bounded(list(range(args.sections)),
+                            lambda index, item: generate(client, args.model, args.section_tokens),
+                            args.concurrency)
+                parallel.append(time.perf_counter() - start)
+    finally:
+        server.should_exit = True
+        thread.join()
+    return sequential, parallel
+
+# --- Full ---
+def full(args):
+    package, class_name = CREW_PROJECTS[args.backend]
+    project_path = os.path.join(RESEARCH_PATH, package)
+    sys.path.insert(0, os.path.join(project_path, "src"))
+    crew_class = getattr(importlib.import_module(f"{package}.crew"), class_name)
+    inputs = {"topic": args.topic, "current_year": str(datetime.datetime.now().year)}
+    model = f"{args.backend}/{args.model}"
+
+    samples = {"sequential": [], "parallel": []}
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for i in range(args.iterations):
+            for mode in samples:
+                research_crew = crew_class(model=model, output_file=f"report_{mode}_{i}.md",
+                                           report_mode=mode, report_concurrency=args.concurrency)
+                start = time.perf_counter()
+                research_crew.kickoff(inputs=inputs)
+                samples[mode].append(time.perf_counter() - start)
+    return samples["sequential"], samples["parallel"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="Run the real crew instead of the simulation")
+    parser.add_argument("--backend", default="ollama", choices=sorted(CREW_PROJECTS))
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4, help="Sections generated at once")
+    parser.add_argument("--sections", type=int, default=10, help="Findings in the research list (simulated)")
+    parser.add_argument("--section-tokens", type=int, default=150, help="Tokens per section (simulated)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.1)
+    parser.add_argument("--ollama-parallel", type=int, default=4, help="Concurrent generations of the fake Ollama")
+    parser.add_argument("--topic", default="AI LLMs")
+    parser.add_argument("--model", default="smollm2:135m")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    sequential, parallel = full(args) if args.full else simulated(args)
+    results = {
+        "mode": "full" if args.full else "simulated",
+        "backend": args.backend,
+        "concurrency": args.concurrency,
+        "sequential": summarize(sequential),
+        "parallel": summarize(parallel),
+    }
+    if not args.full:
+        results.update(sections=args.sections, section_tokens=args.section_tokens,
+                       ollama_parallel=args.ollama_parallel)
+    results["speedup_mean"] = round(results["sequential"]["mean_s"] / max(results["parallel"]["mean_s"], 1e-9), 2)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
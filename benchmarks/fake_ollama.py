@@ -0,0 +1,133 @@
+"""Local stand-in for the Ollama HTTP API.
+
+Emulates ``/api/generate``, ``/api/chat`` (both with NDJSON streaming),
+``/api/tags`` and ``/api/ps`` with a configurable first-token latency and
+token rate, and reports the same timing fields as Ollama (``eval_count``,
+``eval_duration``, ...). Like Ollama, only ``parallel`` generations run at
+once; further requests wait.
+
+Settings come from the ``create_app`` arguments or, for ``app``, from
+FAKE_OLLAMA_* environment variables.
+
+Usage:
+    uvicorn --app-dir benchmarks fake_ollama:app --port 11435
+    OLLAMA_API_URL=http://127.0.0.1:11435/api/generate uvicorn app.main:app
+"""
+import asyncio
+import datetime
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+def create_app(
+    tokens_per_second: float = 50.0,
+    first_token_latency: float = 0.05,
+    response_tokens: int = 20,
+    parallel: int = 4,
+    models: Optional[List[str]] = None,
+) -> FastAPI:
+    fake = FastAPI(title="Fake Ollama")
+    models = models or ["smollm2:135m", "llama3:latest"]
+    semaphore = asyncio.Semaphore(max(1, parallel))
+    loaded: Dict[str, float] = {}
+    stats = {"requests": 0}
+
+    def token_count(body: Dict[str, Any]) -> int:
+        return int((body.get("options") or {}).get("num_predict", response_tokens))
+
+    def prompt_tokens(body: Dict[str, Any]) -> int:
+        if "messages" in body:
+            return sum(len(str(m.get("content", "")).split()) for m in body["messages"])
+        return len(str(body.get("prompt", "")).split())
+
+    def final_stats(body: Dict[str, Any], tokens: int, started: float, first_token_at: float) -> Dict[str, Any]:
+        end = time.perf_counter()
+        return {
+            "done": True,
+            "total_duration": int((end - started) * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": prompt_tokens(body),
+            "prompt_eval_duration": int((first_token_at - started) * 1e9),
+            "eval_count": tokens,
+            "eval_duration": int((end - first_token_at) * 1e9),
+        }
+
+    def chunk_for(body: Dict[str, Any], text: str) -> Dict[str, Any]:
+        if "messages" in body:
+            return {"model": body["model"], "created_at": _now(), "message": {"role": "assistant", "content": text}}
+        return {"model": body["model"], "created_at": _now(), "response": text}
+
+    async def generate(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        tokens = token_count(body)
+        delay = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+        # Ollama streams unless told otherwise
+        stream = body.get("stream", True)
+
+        async def produce():
+            async with semaphore:
+                started = time.perf_counter()
+                loaded[body["model"]] = time.time()
+                await asyncio.sleep(first_token_latency)
+                first_token_at = time.perf_counter()
+                for i in range(tokens):
+                    if i:
+                        await asyncio.sleep(delay)
+                    yield f"tok{i} "
+                yield final_stats(body, tokens, started, first_token_at)
+
+        if not stream:
+            parts, final = [], {}
+            async for item in produce():
+                if isinstance(item, dict):
+                    final = item
+                else:
+                    parts.append(item)
+            reply = chunk_for(body, "".join(parts))
+            reply.update(final)
+            return JSONResponse(reply)
+
+        async def lines():
+            async for item in produce():
+                if isinstance(item, dict):
+                    last = chunk_for(body, "")
+                    last.update(item)
+                    yield json.dumps(last) + "\n"
+                else:
+                    yield json.dumps({**chunk_for(body, item), "done": False}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    fake.add_api_route("/api/generate", generate, methods=["POST"])
+    fake.add_api_route("/api/chat", generate, methods=["POST"])
+
+    @fake.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": name, "model": name, "size": 0} for name in models]}
+
+    @fake.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": name, "model": name} for name in loaded]}
+
+    @fake.get("/stats")
+    async def fake_stats():
+        """Requests served so far (not part of the Ollama API)."""
+        return stats
+
+    return fake
+
+app = create_app(
+    tokens_per_second=float(os.getenv("FAKE_OLLAMA_TOKENS_PER_SECOND", "50")),
+    first_token_latency=float(os.getenv("FAKE_OLLAMA_FIRST_TOKEN_LATENCY", "0.05")),
+    response_tokens=int(os.getenv("FAKE_OLLAMA_RESPONSE_TOKENS", "20")),
+    parallel=int(os.getenv("FAKE_OLLAMA_PARALLEL", "4")),
+    models=[m for m in os.getenv("FAKE_OLLAMA_MODELS", "smollm2:135m,llama3:latest").split(",") if m],
+)
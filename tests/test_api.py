@@ -1,11 +1,40 @@
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+
 import pytest
 from fastapi.testclient import TestClient
-from app.main import app
+import app.main as main
+from app.main import app, get_ollama_client
+from app.chat_cache import ChatCache
+from app.client import ChatboxClient
+from app.ollama_pool import OllamaPool
+from app.report_store import ReportStore
+from app.research_checkpoints import CheckpointStore
+from app.research_jobs import ResearchJobManager
+from app.scheduler import ModelScheduler, QueueFullError
+from app.sessions import SessionStore
 import httpx
 from unittest.mock import patch, MagicMock
 
 client = TestClient(app)
 
+@pytest.fixture(autouse=True)
+def stores(tmp_path):
+    """Keeps reports and checkpoints of every test out of the repository's data directory."""
+    app.state.report_store = ReportStore(str(tmp_path / "reports"))
+    app.state.checkpoint_store = CheckpointStore(str(tmp_path / "checkpoints"))
+    yield
+    app.state.report_store.close()
+    app.state.report_store = app.state.checkpoint_store = None
+
 @pytest.fixture
 def mock_ollama_response():
     return {
@@ -88,4 +117,769 @@ def test_list_models_endpoint_error():
         
         response = client.get("/api/models")
         
-        assert response.status_code == 500 
\ No newline at end of file
+        assert response.status_code == 500 
+
+
+@pytest.fixture
+def stub_ollama():
+    """Swaps the shared Ollama client for one backed by a local stand-in."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [{"name": "smollm2:135m"}]})
+        return httpx.Response(200, json={"response": "stub reply", "done": True})
+
+    stub_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    app.dependency_overrides[get_ollama_client] = lambda: stub_client
+    yield calls
+    app.dependency_overrides.pop(get_ollama_client, None)
+
+def test_chat_uses_injected_client(stub_ollama):
+    response = client.post("/api/chat", json={"message": "Hi", "model": "smollm2:135m"})
+
+    assert response.status_code == 200
+    assert response.json()["response"] == "stub reply"
+    assert len(stub_ollama) == 1
+    assert stub_ollama[0].url.path == "/api/generate"
+
+def test_lifespan_creates_and_closes_shared_client():
+    with TestClient(app) as lifespan_client:
+        shared = app.state.ollama_client
+        assert isinstance(shared, httpx.AsyncClient)
+        assert not shared.is_closed
+        lifespan_client.get("/")
+    assert shared.is_closed
+    assert app.state.ollama_client is None
+
+class RecordingStream(httpx.AsyncByteStream):
+    """NDJSON byte stream that records whether it was closed."""
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    async def __aiter__(self):
+        for line in self.lines:
+            yield line.encode() + b"\n"
+
+    async def aclose(self):
+        self.closed = True
+
+def override_ollama(handler):
+    stub_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    app.dependency_overrides[get_ollama_client] = lambda: stub_client
+
+def test_chat_streaming_relays_ndjson():
+    chunks = [
+        json.dumps({"response": "Hel", "done": False}),
+        json.dumps({"response": "lo", "done": False}),
+        json.dumps({"response": "", "done": True}),
+    ]
+    stream = RecordingStream(chunks)
+    sent = []
+
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, stream=stream)
+
+    override_ollama(handler)
+    try:
+        response = client.post("/api/chat", json={"message": "Hi", "stream": True})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert "".join(line["response"] for line in lines) == "Hello"
+    assert lines[-1]["done"] is True
+    assert sent[0]["stream"] is True
+    assert stream.closed
+
+@pytest.mark.parametrize("use_session", [False, True])
+def test_chat_streaming_ends_with_error_on_malformed_line(use_session):
+    chunks = [json.dumps({"response": "Hel", "message": {"content": "Hel"}, "done": False}), "{not json"]
+    override_ollama(lambda request: httpx.Response(200, stream=RecordingStream(chunks)))
+    body = {"message": "Hi", "stream": True}
+    if use_session:
+        body["session_id"] = client.post("/api/sessions", json={}).json()["session_id"]
+    try:
+        response = client.post("/api/chat", json=body)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["response"] == "Hel"
+    assert lines[-1]["done"] is True
+    assert "Error while streaming from Ollama" in lines[-1]["error"]
+
+def test_chat_streaming_upstream_error():
+    override_ollama(lambda request: httpx.Response(404, text="model not found"))
+    try:
+        response = client.post("/api/chat", json={"message": "Hi", "stream": True})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 404
+    assert "model not found" in response.json()["detail"]
+
+@pytest.fixture
+def stub_research_jobs(monkeypatch, report_store):
+    """Replaces the research job manager with one running a stubbed crew."""
+    release = threading.Event()
+
+    async def fake_runner(request):
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        return main.ResearchResponse(
+            stdout_result="crew done",
+            report_content=f"# {request.topic}",
+            model=f"{request.backend}:{request.model}"
+        )
+
+    manager = ResearchJobManager(fake_runner, max_concurrency=1, max_pending=1)
+    monkeypatch.setattr(main, "research_jobs", manager)
+    return manager, release
+
+def wait_for_job(test_client, job_id, status, attempts=200):
+    for _ in range(attempts):
+        job = test_client.get(f"/api/research/jobs/{job_id}").json()
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}: {job}")
+
+def test_research_job_lifecycle(stub_research_jobs):
+    manager, release = stub_research_jobs
+    payload = {"topic": "AI", "model": "smollm2:135m", "backend": "ollama"}
+
+    with TestClient(app) as test_client:
+        response = test_client.post("/api/research/jobs", json=payload)
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        wait_for_job(test_client, job_id, "running")
+
+        # The event loop stays free while the crew runs
+        assert test_client.get("/").status_code == 200
+
+        release.set()
+        job = wait_for_job(test_client, job_id, "completed")
+        assert job["result"]["report_content"] == "# AI"
+        assert job["model"] == "ollama:smollm2:135m"
+        assert [j["job_id"] for j in test_client.get("/api/research/jobs").json()] == [job_id]
+
+def test_research_job_queue_full(stub_research_jobs):
+    manager, release = stub_research_jobs
+    payload = {"topic": "AI", "model": "smollm2:135m", "backend": "ollama"}
+
+    with TestClient(app) as test_client:
+        first = test_client.post("/api/research/jobs", json=payload).json()["job_id"]
+        wait_for_job(test_client, first, "running")
+        assert test_client.post("/api/research/jobs", json={**payload, "topic": "ML"}).status_code == 202
+        # One job running, one queued: the pending limit is reached
+        assert test_client.post("/api/research/jobs", json={**payload, "topic": "NLP"}).status_code == 429
+        release.set()
+
+def test_research_job_not_found():
+    assert client.get("/api/research/jobs/does-not-exist").status_code == 404
+
+def test_research_endpoint_waits_for_job(stub_research_jobs):
+    manager, release = stub_research_jobs
+    release.set()
+
+    with TestClient(app) as test_client:
+        response = test_client.post(
+            "/api/research",
+            json={"topic": "Baseball", "model": "gemini-1.5-pro-latest", "backend": "gemini"}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["report_content"] == "# Baseball"
+    assert response.json()["model"] == "gemini:gemini-1.5-pro-latest"
+
+async def test_concurrent_research_runs_are_isolated(tmp_path, monkeypatch):
+    """Stress test: many overlapping runs must each get their own report."""
+    (tmp_path / "test_ollama_agent").mkdir()
+    monkeypatch.setattr(main, "BASE_RESEARCH_PATH", str(tmp_path))
+    monkeypatch.setattr(main, "RESEARCH_EXECUTION_MODE", "subprocess")
+    seen_models = []
+
+    async def fake_crew(crew_project_path, topic, model, output_file, events_file=None, checkpoint_file=None):
+        seen_models.append(model)
+        await asyncio.sleep(random.uniform(0, 0.02))
+        with open(os.path.join(crew_project_path, output_file), "w", encoding="utf-8") as f:
+            f.write(f"report for {topic}")
+        await asyncio.sleep(random.uniform(0, 0.02))
+        return f"crew stdout for {topic}"
+
+    monkeypatch.setattr(main, "run_crew_subprocess", fake_crew)
+    requests = [
+        main.ResearchRequest(topic=f"topic {i}", model=f"model-{i % 3}", backend="ollama")
+        for i in range(50)
+    ]
+
+    results = await asyncio.gather(*(main.execute_research(r) for r in requests))
+
+    for request, result in zip(requests, results):
+        assert result.error is None
+        assert result.report_content == f"report for {request.topic}"
+        assert result.stdout_result == f"crew stdout for {request.topic}"
+    assert len({result.report_filename for result in results}) == len(requests)
+    assert sorted(seen_models) == sorted(f"ollama/{r.model}" for r in requests)
+    # No shared .env is written anymore
+    assert not (tmp_path / "test_ollama_agent" / ".env").exists()
+    # Every report was moved into the store and indexed
+    assert not list((tmp_path / "test_ollama_agent").glob("*.md"))
+    records, total = await main.get_report_store().list(limit=100)
+    assert total == len(requests)
+    assert {r["id"] for r in records} == {result.report_id for result in results}
+
+def test_list_models_cached_with_etag(stub_ollama):
+    main.model_registry.invalidate()
+
+    first = client.get("/api/models")
+    second = client.get("/api/models")
+
+    assert first.status_code == 200
+    assert first.json() == second.json()
+    assert first.json()["models"][0] == {"name": "smollm2:135m", "backend": "ollama"}
+    assert len([c for c in stub_ollama if c.url.path == "/api/tags"]) == 1
+    assert "max-age=" in first.headers["cache-control"]
+
+    not_modified = client.get("/api/models", headers={"If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304
+    main.model_registry.invalidate()
+
+def test_chat_cache_hit_bypasses_ollama(stub_ollama, monkeypatch):
+    monkeypatch.setattr(main, "chat_cache", ChatCache())
+    payload = {"message": "ping", "model": "smollm2:135m", "options": {"temperature": 0}}
+
+    first = client.post("/api/chat", json=payload)
+    second = client.post("/api/chat", json=payload)
+    streamed = client.post("/api/chat", json={**payload, "stream": True})
+    other_options = client.post("/api/chat", json={**payload, "options": {"temperature": 1}})
+
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+    assert streamed.headers["x-cache"] == "HIT"
+    assert '"response": "stub reply"' in streamed.text
+    assert other_options.headers["x-cache"] == "MISS"
+    assert len(stub_ollama) == 2
+
+def test_chat_cache_stores_streamed_reply(monkeypatch):
+    monkeypatch.setattr(main, "chat_cache", ChatCache())
+    chunks = [json.dumps({"response": "Hel", "done": False}), json.dumps({"response": "lo", "done": True})]
+    override_ollama(lambda request: httpx.Response(200, stream=RecordingStream(chunks)))
+    try:
+        streamed = client.post("/api/chat", json={"message": "Hi", "stream": True})
+        cached = client.post("/api/chat", json={"message": "Hi"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert streamed.headers["x-cache"] == "MISS"
+    assert cached.headers["x-cache"] == "HIT"
+    assert cached.json()["response"] == "Hello"
+
+def test_identical_research_requests_share_one_job(stub_research_jobs):
+    manager, release = stub_research_jobs
+    payload = {"topic": "AI Trends", "model": "smollm2:135m", "backend": "ollama"}
+
+    with TestClient(app) as test_client:
+        first = test_client.post("/api/research/jobs", json=payload).json()
+        same = test_client.post("/api/research/jobs", json={**payload, "topic": "  ai   trends "}).json()
+        other_model = test_client.post("/api/research/jobs", json={**payload, "model": "llama3"}).json()
+        release.set()
+        job = wait_for_job(test_client, first["job_id"], "completed")
+
+    assert same["job_id"] == first["job_id"]
+    assert other_model["job_id"] != first["job_id"]
+    assert job["subscribers"] == 2
+
+async def test_identical_chat_requests_share_one_generation():
+    calls = []
+
+    async def handler(request):
+        calls.append(json.loads(request.content))
+        await asyncio.sleep(0.05)
+        if calls[-1]["stream"]:
+            chunks = [json.dumps({"response": "po", "done": False}), json.dumps({"response": "ng", "done": True})]
+            return httpx.Response(200, content="\n".join(chunks).encode())
+        return httpx.Response(200, json={"response": "pong", "done": True})
+
+    stub_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    app.dependency_overrides[get_ollama_client] = lambda: stub_client
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as api:
+            body = {"message": "ping", "options": {"temperature": 0}}
+            replies = await asyncio.gather(*(api.post("/api/chat", json=body) for _ in range(5)))
+            streams = await asyncio.gather(*(api.post("/api/chat", json={**body, "stream": True})
+                                             for _ in range(5)))
+            # Sampled replies differ per request, so these are not shared
+            sampled = await asyncio.gather(*(api.post("/api/chat", json={"message": "ping"}) for _ in range(2)))
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [r.json()["response"] for r in replies + sampled] == ["pong"] * 7
+    for r in streams:
+        assert "".join(json.loads(line)["response"] for line in r.text.splitlines()) == "pong"
+    assert [c["stream"] for c in calls] == [False, True, False, False]
+    assert main.chat_streams.in_flight() == 0
+
+def test_chat_rejected_with_retry_after_when_queue_full(stub_ollama, monkeypatch):
+    async def reject(model):
+        raise QueueFullError("Too many queued requests (limit 0).", retry_after=7)
+
+    monkeypatch.setattr(main.scheduler, "acquire", reject)
+    response = client.post("/api/chat", json={"message": "Hi", "model": "smollm2:135m"})
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
+    assert stub_ollama == []
+
+def test_scheduler_stats_endpoint():
+    response = client.get("/api/scheduler")
+
+    assert response.status_code == 200
+    assert response.json()["queue_depth"] == 0
+
+def test_chat_fails_over_to_next_backend(monkeypatch):
+    pool = OllamaPool(["http://down:11434", "http://up:11434"], eject_after=1)
+    monkeypatch.setattr(main, "ollama_pool", pool)
+    hosts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        if request.url.host == "down":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"response": "from up", "done": True})
+
+    override_ollama(handler)
+    try:
+        first = client.post("/api/chat", json={"message": "one", "model": "smollm2:135m"})
+        second = client.post("/api/chat", json={"message": "two", "model": "smollm2:135m"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert first.json()["response"] == second.json()["response"] == "from up"
+    # The failed host is ejected, so the second request goes straight to the healthy one
+    assert hosts == ["down", "up", "up"]
+    assert client.get("/api/backends").json()["backends"][0]["ejected"] is True
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_chat_retries_backend_that_has_the_model(monkeypatch, stream):
+    pool = OllamaPool(["http://a:11434", "http://b:11434"])
+    monkeypatch.setattr(main, "ollama_pool", pool)
+    hosts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        if request.url.host == "a":
+            return httpx.Response(404, json={"error": "model 'llama3' not found"})
+        return httpx.Response(200, json={"response": "from b", "done": True})
+
+    override_ollama(handler)
+    try:
+        response = client.post("/api/chat", json={"message": "Hi", "model": "llama3", "stream": stream})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert "from b" in response.text
+    assert hosts == ["a", "b"]
+    assert [backend.outstanding for backend in pool.backends] == [0, 0]
+
+async def test_concurrent_chats_spread_over_all_backends(monkeypatch):
+    pool = OllamaPool(["http://a:11434", "http://b:11434", "http://c:11434"])
+    monkeypatch.setattr(main, "ollama_pool", pool)
+    monkeypatch.setattr(main, "scheduler", ModelScheduler(per_model_concurrency=2, max_active_models=1,
+                                                          backends=len(pool.backends)))
+    running = []
+    hosts = set()
+    peak = 0
+
+    async def handler(request):
+        nonlocal peak
+        running.append(request.url.host)
+        hosts.add(request.url.host)
+        peak = max(peak, len(running))
+        await asyncio.sleep(0.1)
+        running.remove(request.url.host)
+        return httpx.Response(200, json={"response": "ok", "done": True})
+
+    override_ollama(handler)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as api:
+            replies = await asyncio.gather(*(
+                api.post("/api/chat", json={"message": f"prompt {i}", "model": ["m1", "m2", "m3"][i % 3]})
+                for i in range(9)
+            ))
+    finally:
+        app.dependency_overrides.clear()
+
+    assert all(reply.status_code == 200 for reply in replies)
+    assert hosts == {"a", "b", "c"}
+    # Limits are per backend: three models, three prompts each, all run at once
+    # (a fleet-wide limit let only two generations run)
+    assert peak == 9
+
+def test_chat_session_keeps_history(monkeypatch):
+    monkeypatch.setattr(main, "sessions", SessionStore())
+    payloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        payloads.append(payload)
+        reply = f"reply {len(payloads)}"
+        if payload["stream"]:
+            body = json.dumps({"message": {"role": "assistant", "content": reply}, "done": True}) + "\n"
+            return httpx.Response(200, content=body.encode())
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": reply}, "done": True})
+
+    override_ollama(handler)
+    created = client.post("/api/sessions", json={"model": "llama3"})
+    session_id = created.json()["session_id"]
+    try:
+        first = client.post("/api/chat", json={"message": "Hi", "model": "llama3", "session_id": session_id})
+        second = client.post("/api/chat", json={"message": "More", "model": "llama3", "session_id": session_id, "stream": True})
+        # Ids are only handed out by the server
+        unknown = client.post("/api/chat", json={"message": "Hi", "model": "llama3", "session_id": "abc"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert created.status_code == 201
+    assert first.json() == {"response": "reply 1", "model": "llama3", "session_id": session_id}
+    assert json.loads(second.text.splitlines()[0])["response"] == "reply 2"
+    assert payloads[1]["messages"] == [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "reply 1"},
+        {"role": "user", "content": "More"},
+    ]
+    assert payloads[1]["keep_alive"] == main.OLLAMA_KEEP_ALIVE
+
+    assert unknown.status_code == 404
+    assert len(payloads) == 2
+
+    history = client.get(f"/api/sessions/{session_id}").json()
+    assert [m["content"] for m in history["messages"]] == ["Hi", "reply 1", "More", "reply 2"]
+    assert client.delete(f"/api/sessions/{session_id}").status_code == 204
+    assert client.get(f"/api/sessions/{session_id}").status_code == 404
+
+def test_chat_batch_streams_in_completion_order(monkeypatch):
+    # Let all items reach Ollama at once
+    monkeypatch.setattr(main, "scheduler", ModelScheduler(per_model_concurrency=10))
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["prompt"]
+        if prompt == "boom":
+            return httpx.Response(500, text="model crashed")
+        # Earlier prompts take longer, so results arrive in reverse order
+        await asyncio.sleep(0.05 * (3 - int(prompt)))
+        return httpx.Response(200, json={"response": f"answer {prompt}", "done": True})
+
+    override_ollama(handler)
+    try:
+        response = client.post("/api/chat/batch", json={"requests": [
+            {"message": "0", "model": "m"},
+            {"message": "1", "model": "m"},
+            {"message": "boom", "model": "m"},
+            {"message": "2", "model": "m"},
+        ]})
+    finally:
+        app.dependency_overrides.clear()
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert [r["index"] for r in results] == [2, 3, 1, 0]
+    assert results[0]["status"] == 500
+    assert results[-1]["response"] == "answer 0"
+
+def test_chat_batch_deadline_reports_unfinished_items():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if json.loads(request.content)["prompt"] == "slow":
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"response": "ok", "done": True})
+
+    override_ollama(handler)
+    try:
+        response = client.post("/api/chat/batch", json={
+            "requests": [{"message": "slow", "model": "m"}, {"message": "fast", "model": "m"}],
+            "deadline": 0.2
+        })
+    finally:
+        app.dependency_overrides.clear()
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["index"], r.get("status")) for r in results] == [(1, None), (0, 504)]
+
+async def test_client_helper_chat_batch():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"response": "stub reply", "done": True})
+
+    override_ollama(handler)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://chatbox") as http_client:
+            chatbox = ChatboxClient(client=http_client)
+            results = [r async for r in chatbox.chat_batch([{"message": "a", "model": "m"}, {"message": "b", "model": "m"}])]
+    finally:
+        app.dependency_overrides.clear()
+
+    assert sorted(r["index"] for r in results) == [0, 1]
+    assert {r["response"] for r in results} == {"stub reply"}
+
+def test_metrics_endpoint_reports_chat_latency():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={
+            "response": "stub reply", "done": True,
+            "eval_count": 20, "eval_duration": 1_000_000_000,
+            "load_duration": 100_000_000, "prompt_eval_duration": 50_000_000
+        })
+
+    override_ollama(handler)
+    try:
+        client.post("/api/chat", json={"message": "metrics please", "model": "metrics-model"})
+    finally:
+        app.dependency_overrides.clear()
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'chatbox_ollama_time_to_first_token_seconds_count{model="metrics-model"} 1' in text
+    assert 'chatbox_ollama_tokens_per_second_sum{model="metrics-model"} 20' in text
+    assert 'chatbox_ollama_in_flight{model="metrics-model"} 0' in text
+    assert 'chatbox_http_requests_total{method="POST",route="/api/chat",status="200"}' in text
+    assert "chatbox_scheduler_queue_depth 0" in text
+
+def test_request_id_header_is_echoed_or_generated():
+    response = client.get("/api/scheduler", headers={"X-Request-ID": "trace-42"})
+    assert response.headers["x-request-id"] == "trace-42"
+
+    generated = client.get("/api/scheduler").headers["x-request-id"]
+    assert len(generated) == 32
+
+@pytest.fixture
+def report_store():
+    return main.get_report_store()
+
+def test_stores_are_opened_on_first_use(tmp_path):
+    data = tmp_path / "data"
+    env = {**os.environ, "REPORTS_DIR": str(data / "reports"), "CHECKPOINTS_DIR": str(data / "checkpoints")}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=root, env=env, check=True)
+    assert not data.exists()
+
+    subprocess.run([sys.executable, "-c", "import app.main as m; m.get_report_store(); m.get_checkpoint_store()"],
+                   cwd=root, env=env, check=True)
+    assert (data / "reports" / "index.sqlite3").exists() and (data / "checkpoints").is_dir()
+
+async def add_report(store, tmp_path, filename, topic, backend="ollama"):
+    source = tmp_path / filename
+    source.write_text(f"# {topic}", encoding="utf-8")
+    return await store.import_report(str(source), topic=topic, model="ollama/llama3", backend=backend)
+
+async def test_report_endpoints(report_store, tmp_path):
+    first = await add_report(report_store, tmp_path, "research_AI_1.md", "AI trends")
+    await asyncio.sleep(0.01)
+    second = await add_report(report_store, tmp_path, "research_Baseball_2.md", "Baseball", backend="gemini")
+
+    page = client.get("/api/reports", params={"limit": 1}).json()
+    assert page["total"] == 2
+    assert [r["id"] for r in page["reports"]] == [second["id"]]
+    assert client.get("/api/reports", params={"backend": "ollama"}).json()["reports"][0]["id"] == first["id"]
+
+    found = client.get("/api/reports/search", params={"q": "baseball"}).json()
+    assert [r["filename"] for r in found["reports"]] == ["research_Baseball_2.md"]
+
+    # The old download URL resolves through the index
+    download = client.get("/api/research/report/ollama/research_AI_1.md")
+    assert download.status_code == 200
+    assert download.text == "# AI trends"
+    assert client.get(f"/api/reports/{second['id']}/content").text == "# Baseball"
+
+    assert client.delete(f"/api/reports/{first['id']}").status_code == 204
+    assert client.get(f"/api/reports/{first['id']}").status_code == 404
+    assert client.get("/api/research/report/ollama/research_AI_1.md").status_code == 404
+
+def test_research_cache_reuses_recent_reports(report_store, tmp_path, monkeypatch):
+    config_dir = tmp_path / "crews" / "test_ollama_agent" / "src" / "test_ollama_agent" / "config"
+    config_dir.mkdir(parents=True)
+    (config_dir / "agents.yaml").write_text("researcher: {}", encoding="utf-8")
+    (config_dir / "tasks.yaml").write_text("research_task: {}", encoding="utf-8")
+    monkeypatch.setattr(main, "BASE_RESEARCH_PATH", str(tmp_path / "crews"))
+    monkeypatch.setattr(main, "RESEARCH_EXECUTION_MODE", "subprocess")
+    monkeypatch.setattr(main, "research_jobs", ResearchJobManager(main.run_research))
+    runs = []
+
+    async def fake_crew(crew_project_path, topic, model, output_file, events_file=None, checkpoint_file=None):
+        runs.append(topic)
+        with open(os.path.join(crew_project_path, output_file), "w", encoding="utf-8") as f:
+            f.write(f"report {len(runs)}")
+        return "crew stdout"
+
+    monkeypatch.setattr(main, "run_crew_subprocess", fake_crew)
+    payload = {"topic": "AI trends", "model": "llama3", "backend": "ollama"}
+
+    with TestClient(app) as test_client:
+        first = test_client.post("/api/research", json=payload).json()
+        assert first["cached"] is False
+        assert first["report_content"] == "report 1"
+
+        # Topic normalization: same cache entry, no crew run
+        again = test_client.post("/api/research", json={**payload, "topic": "  ai   TRENDS"}).json()
+        assert again["cached"] is True
+        assert again["report_id"] == first["report_id"]
+        assert again["report_content"] == "report 1"
+        job = test_client.post("/api/research/jobs", json=payload).json()
+        assert job["status"] == "completed"
+        assert job["result"]["report_id"] == first["report_id"]
+        assert len(runs) == 1
+
+        refreshed = test_client.post("/api/research", json={**payload, "force_refresh": True}).json()
+        assert refreshed["cached"] is False
+        assert refreshed["report_content"] == "report 2"
+        # Later requests get the newest report
+        assert test_client.post("/api/research", json=payload).json()["report_id"] == refreshed["report_id"]
+
+        # Editing the crew config invalidates the cache
+        (config_dir / "tasks.yaml").write_text("research_task: {expected_output: more}", encoding="utf-8")
+        assert test_client.post("/api/research", json=payload).json()["cached"] is False
+        assert len(runs) == 3
+
+        monkeypatch.setattr(main, "RESEARCH_CACHE_TTL", 0)
+        assert test_client.post("/api/research", json=payload).json()["cached"] is False
+        assert len(runs) == 4
+
+
+def read_sse(response):
+    """Parses a Server-Sent Events body into (event, data) pairs."""
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_research_progress_events(report_store, tmp_path, monkeypatch):
+    (tmp_path / "crews" / "test_ollama_agent").mkdir(parents=True)
+    monkeypatch.setattr(main, "BASE_RESEARCH_PATH", str(tmp_path / "crews"))
+    monkeypatch.setattr(main, "RESEARCH_EXECUTION_MODE", "subprocess")
+    monkeypatch.setattr(main, "RESEARCH_EVENTS_POLL", 0.01)
+    monkeypatch.setattr(main, "research_jobs", ResearchJobManager(main.run_research))
+    events_files = []
+
+    async def fake_crew(crew_project_path, topic, model, output_file, events_file=None, checkpoint_file=None):
+        events_files.append(events_file)
+        for event in ({"event": "task_started", "task": "research_task", "agent": "researcher"},
+                      {"event": "task_finished", "task": "research_task", "output": "- point 1"}):
+            with open(events_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event) + "\n")
+            await asyncio.sleep(0.05)
+        with open(os.path.join(crew_project_path, output_file), "w", encoding="utf-8") as f:
+            f.write(f"# {topic}")
+        return "crew stdout"
+
+    monkeypatch.setattr(main, "run_crew_subprocess", fake_crew)
+
+    with TestClient(app) as test_client:
+        job_id = test_client.post("/api/research/jobs", json={"topic": "AI", "model": "llama3", "backend": "ollama"}).json()["job_id"]
+        with test_client.stream("GET", f"/api/research/jobs/{job_id}/events") as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            response.read()
+        events = read_sse(response)
+
+        assert [name for name, _ in events] == [
+            "status", "status", "task_started", "task_finished", "report", "status", "done"]
+        assert [data["status"] for name, data in events if name == "status"] == ["queued", "running", "completed"]
+        assert events[3][1]["output"] == "- point 1"
+        assert events[4][1]["report_id"]
+        assert events[-1][1]["result"]["report_content"] == "# AI"
+        assert not os.path.exists(events_files[0])
+
+        # Reconnecting resumes after the last event seen
+        replay = read_sse(test_client.get(f"/api/research/jobs/{job_id}/events", headers={"Last-Event-ID": "3"}))
+        assert [name for name, _ in replay] == ["report", "status", "done"]
+        assert test_client.get("/api/research/jobs/missing/events").status_code == 404
+
+def test_failed_research_resumes_from_checkpoint(report_store, tmp_path, monkeypatch):
+    (tmp_path / "crews" / "test_ollama_agent").mkdir(parents=True)
+    monkeypatch.setattr(main, "BASE_RESEARCH_PATH", str(tmp_path / "crews"))
+    monkeypatch.setattr(main, "RESEARCH_EXECUTION_MODE", "subprocess")
+    monkeypatch.setattr(main, "RESEARCH_EVENTS_POLL", 0.01)
+    monkeypatch.setattr(main, "research_jobs", ResearchJobManager(main.run_research))
+    checkpoints = []
+
+    async def fake_crew(crew_project_path, topic, model, output_file, events_file=None, checkpoint_file=None):
+        if checkpoint_file is None:
+            # First run: the research finishes, the report times out
+            with open(events_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"event": "task_finished", "task": "research_task", "output": "- point 1"}) + "\n")
+            raise subprocess.TimeoutExpired("crewai run", 300)
+        with open(checkpoint_file, encoding="utf-8") as f:
+            checkpoints.append(json.load(f))
+        with open(os.path.join(crew_project_path, output_file), "w", encoding="utf-8") as f:
+            f.write(f"# {topic}")
+        return "crew stdout"
+
+    monkeypatch.setattr(main, "run_crew_subprocess", fake_crew)
+
+    with TestClient(app) as test_client:
+        job_id = test_client.post("/api/research/jobs", json={"topic": "AI", "model": "llama3", "backend": "ollama"}).json()["job_id"]
+        failed = wait_for_job(test_client, job_id, "completed")
+        assert "timed out" in failed["result"]["error"]
+        assert failed["result"]["resumable"] is True
+
+        response = test_client.post(f"/api/research/jobs/{job_id}/resume")
+        assert response.status_code == 202
+        resumed_id = response.json()["job_id"]
+        resumed = wait_for_job(test_client, resumed_id, "completed")
+        assert resumed["result"]["report_content"] == "# AI"
+        assert checkpoints == [{"research_task": "- point 1"}]
+        events = read_sse(test_client.get(f"/api/research/jobs/{resumed_id}/events"))
+        assert ("task_restored", "research_task") in [(name, data.get("task")) for name, data in events]
+
+        # The checkpoint is gone once the resumed run succeeded
+        assert test_client.post(f"/api/research/jobs/{job_id}/resume").status_code == 404
+        assert test_client.post("/api/research/jobs/missing/resume").status_code == 404
+
+async def test_report_download_caching_compression_and_ranges(report_store, tmp_path):
+    content = "# Report\n" + "Some findings about AI.\n" * 200
+    record = await add_report(report_store, tmp_path, "research_AI_1.md", "AI")
+    with open(report_store.full_path(record), "w", encoding="utf-8") as f:
+        f.write(content)
+    url = f"/api/reports/{record['id']}/content"
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert plain.text == content
+    assert plain.headers["etag"] == f'"{record["sha256"]}"'
+    assert plain.headers["accept-ranges"] == "bytes"
+    assert client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": plain.headers["etag"]}).status_code == 304
+
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == f'"{record["sha256"]}-gzip"'
+    assert int(compressed.headers["content-length"]) < len(content)
+    assert compressed.text == content # httpx decodes it
+    assert os.path.exists(report_store.full_path(record) + ".gz")
+    assert client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]}).status_code == 304
+
+    partial = client.get(url, headers={"Range": "bytes=2-7"})
+    assert partial.status_code == 206
+    assert partial.content == content.encode()[2:8]
+    assert partial.headers["content-range"] == f"bytes 2-7/{len(content)}"
+    assert client.get(url, headers={"Range": f"bytes={len(content)}-"}).status_code == 416
+
+    other = await add_report(report_store, tmp_path, "research_ML_2.md", "ML")
+    archive = client.get("/api/reports/archive", params=[("id", record["id"]), ("id", other["id"])])
+    assert archive.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(archive.content)) as zf:
+        assert zf.read("ollama/research_AI_1.md").decode() == content
+        assert zf.read("ollama/research_ML_2.md").decode() == "# ML"
+    assert client.get("/api/reports/archive", params={"id": "missing"}).status_code == 404
+
+    # Deleting a report also removes its compressed copy
+    assert client.delete(url.rsplit("/", 1)[0]).status_code == 204
+    assert not os.path.exists(report_store.full_path(record) + ".gz")
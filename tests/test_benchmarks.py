@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from bench_load import percentile, summarize  # noqa: E402
+from fake_ollama import create_app  # noqa: E402
+
+def fake_client(**settings):
+    transport = httpx.ASGITransport(app=create_app(**settings))
+    return httpx.AsyncClient(transport=transport, base_url="http://fake-ollama")
+
+async def test_fake_ollama_streams_tokens_with_stats():
+    async with fake_client(tokens_per_second=1000, first_token_latency=0, response_tokens=3) as client:
+        response = await client.post("/api/generate", json={"model": "llama3", "prompt": "hello there"})
+
+    chunks = [json.loads(line) for line in response.text.splitlines()]
+    assert "".join(c["response"] for c in chunks) == "tok0 tok1 tok2 "
+    assert chunks[-1]["done"] is True
+    assert chunks[-1]["eval_count"] == 3
+    assert chunks[-1]["prompt_eval_count"] == 2
+
+async def test_fake_ollama_chat_and_model_listing():
+    async with fake_client(first_token_latency=0, models=["llama3:latest"]) as client:
+        reply = await client.post("/api/chat", json={
+            "model": "llama3:latest", "stream": False,
+            "messages": [{"role": "user", "content": "hi"}], "options": {"num_predict": 2}
+        })
+        tags = await client.get("/api/tags")
+        ps = await client.get("/api/ps")
+
+    assert reply.json()["message"]["content"] == "tok0 tok1 "
+    assert [m["name"] for m in tags.json()["models"]] == ["llama3:latest"]
+    assert [m["name"] for m in ps.json()["models"]] == ["llama3:latest"]
+
+def test_percentiles_use_nearest_rank():
+    samples = [i / 100 for i in range(1, 101)]
+    assert percentile(samples, 50) == 0.5
+    assert percentile(samples, 99) == 0.99
+    assert summarize(samples)["p95_s"] == 0.95
+    assert summarize([]) == {"n": 0}
@@ -0,0 +1,42 @@
+import time
+
+from app.chat_cache import ChatCache
+
+async def test_key_depends_on_model_prompt_and_options():
+    key = ChatCache.make_key("llama3", "Hi", {"temperature": 0})
+    assert key == ChatCache.make_key("llama3", "Hi", {"temperature": 0})
+    assert key != ChatCache.make_key("llama3", "Hi", {"temperature": 1})
+    assert key != ChatCache.make_key("mistral", "Hi", {"temperature": 0})
+    assert ChatCache.make_key("llama3", "Hi") == ChatCache.make_key("llama3", "Hi", {})
+
+async def test_lru_eviction_by_size():
+    key_size = len(ChatCache.make_key("m", "p"))
+    cache = ChatCache(max_bytes=2 * (key_size + 10))
+    a, b, c = (ChatCache.make_key("m", p) for p in "abc")
+
+    await cache.set(a, "x" * 10)
+    await cache.set(b, "x" * 10)
+    assert await cache.get(a) is not None # a is now most recently used
+    await cache.set(c, "x" * 10)
+
+    assert await cache.get(b) is None
+    assert await cache.get(a) is not None
+    assert await cache.get(c) is not None
+    assert cache.current_bytes <= cache.max_bytes
+
+async def test_entries_expire():
+    cache = ChatCache(ttl=0.01)
+    await cache.set("k", "v")
+    time.sleep(0.02)
+    assert await cache.get("k") is None
+    assert cache.current_bytes == 0
+
+async def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "chat_cache.db")
+    cache = ChatCache(sqlite_path=path)
+    await cache.set("k", "persisted")
+    cache.close()
+
+    reopened = ChatCache(sqlite_path=path)
+    assert await reopened.get("k") == "persisted"
+    reopened.close()
@@ -0,0 +1,128 @@
+import asyncio
+import textwrap
+
+import pytest
+
+from app.crew_workers import CrewWorkerPool, CrewUnavailableError, CrewExecutionError, TailBuffer
+
+FAKE_CREW = textwrap.dedent('''
+    import os
+    import time
+
+    class _Crew:
+        def __init__(self, model, output_file):
+            self.model = model
+            self.output_file = output_file
+
+        def kickoff(self, inputs):
+            if inputs["topic"] == "explode":
+                raise ValueError("boom")
+            if inputs["topic"] == "crash":
+                os._exit(1)
+            if inputs["topic"].startswith("sleep "):
+                time.sleep(float(inputs["topic"].split()[1]))
+            print(f"pid={os.getpid()} model={self.model} "
+                  f"api_base={os.getenv('API_BASE')} extra={os.getenv('CREW_EXTRA')}")
+            with open(self.output_file, "w") as f:
+                f.write(f"# {inputs['topic']}")
+
+    class TestOllamaAgent:
+        def __init__(self, model=None, output_file="report.md"):
+            self.model = model
+            self.output_file = output_file
+
+        def crew(self):
+            return _Crew(self.model, self.output_file)
+''')
+
+@pytest.fixture
+def research_path(tmp_path):
+    package_dir = tmp_path / "test_ollama_agent" / "src" / "test_ollama_agent"
+    package_dir.mkdir(parents=True)
+    (package_dir / "__init__.py").write_text("")
+    (package_dir / "crew.py").write_text(FAKE_CREW)
+    return tmp_path
+
+async def test_worker_runs_crew_in_warm_process(research_path):
+    pool = CrewWorkerPool(str(research_path), max_workers=1)
+    project_path = str(research_path / "test_ollama_agent")
+    try:
+        await pool.warm_up()
+        first = await pool.run("ollama", "ollama/smollm2:135m", "AI", project_path, "a.md", timeout=30)
+        second = await pool.run("ollama", "ollama/smollm2:135m", "ML", project_path, "b.md", timeout=30)
+    finally:
+        pool.shutdown(kill=True)
+
+    assert "model=ollama/smollm2:135m" in first
+    # Both runs are served by the same long-lived worker
+    assert first.split()[0] == second.split()[0]
+    assert (research_path / "test_ollama_agent" / "a.md").read_text() == "# AI"
+    assert (research_path / "test_ollama_agent" / "b.md").read_text() == "# ML"
+
+async def test_worker_errors(research_path):
+    pool = CrewWorkerPool(str(research_path), max_workers=1)
+    project_path = str(research_path / "test_ollama_agent")
+    try:
+        with pytest.raises(CrewUnavailableError):
+            await pool.run("gemini", "gemini/gemini-pro", "AI", project_path, "a.md", timeout=30)
+        with pytest.raises(CrewExecutionError, match="boom"):
+            await pool.run("ollama", "ollama/smollm2:135m", "explode", project_path, "a.md", timeout=30)
+    finally:
+        pool.shutdown(kill=True)
+
+async def test_timeout_only_kills_its_own_worker(research_path):
+    pool = CrewWorkerPool(str(research_path), max_workers=2)
+    project_path = str(research_path / "test_ollama_agent")
+    try:
+        await pool.warm_up()
+        slow, stuck = await asyncio.gather(
+            pool.run("ollama", "ollama/smollm2:135m", "sleep 2", project_path, "a.md", timeout=30),
+            pool.run("ollama", "ollama/smollm2:135m", "sleep 60", project_path, "b.md", timeout=0.5),
+            return_exceptions=True,
+        )
+        assert "model=ollama/smollm2:135m" in slow
+        assert isinstance(stuck, asyncio.TimeoutError)
+        # The replaced worker takes new runs
+        assert "model=" in await pool.run("ollama", "ollama/smollm2:135m", "AI", project_path, "c.md", timeout=30)
+    finally:
+        pool.shutdown(kill=True)
+
+async def test_dead_worker_is_replaced(research_path):
+    pool = CrewWorkerPool(str(research_path), max_workers=1)
+    project_path = str(research_path / "test_ollama_agent")
+    try:
+        for _ in range(2):
+            # Callers fall back to `crewai run` for this run ...
+            with pytest.raises(CrewUnavailableError, match="died"):
+                await pool.run("ollama", "ollama/smollm2:135m", "crash", project_path, "a.md", timeout=30)
+            # ... and the next one gets a fresh worker
+            assert "model=" in await pool.run("ollama", "ollama/smollm2:135m", "AI", project_path, "a.md", timeout=30)
+    finally:
+        pool.shutdown(kill=True)
+
+async def test_project_env_does_not_override_and_does_not_leak(research_path, monkeypatch):
+    monkeypatch.setenv("API_BASE", "http://operator:11434")
+    monkeypatch.delenv("CREW_EXTRA", raising=False)
+    project_dir = research_path / "test_ollama_agent"
+    (project_dir / ".env").write_text("API_BASE=http://dotenv:11434\nCREW_EXTRA=from-dotenv\n")
+    pool = CrewWorkerPool(str(research_path), max_workers=1)
+    try:
+        first = await pool.run("ollama", "ollama/smollm2:135m", "AI", str(project_dir), "a.md", timeout=30)
+        (project_dir / ".env").unlink()
+        second = await pool.run("ollama", "ollama/smollm2:135m", "AI", str(project_dir), "a.md", timeout=30)
+    finally:
+        pool.shutdown(kill=True)
+
+    assert "api_base=http://operator:11434 extra=from-dotenv" in first
+    assert "api_base=http://operator:11434 extra=None" in second
+
+def test_tail_buffer_keeps_the_end_of_long_output():
+    buffer = TailBuffer(10)
+    for i in range(100):
+        buffer.write(f"line {i}\n")
+
+    text = buffer.text()
+    assert text.endswith("line 99\n")
+    assert text.startswith("[")
+    assert len(text.split("\n", 1)[1]) == 10
+    assert TailBuffer(0).write("short") == 5
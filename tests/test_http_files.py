@@ -0,0 +1,46 @@
+import io
+import zipfile
+
+import pytest
+
+from app.http_files import choose_encoding, etag_matches, iter_zip, parse_range
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    # Ignored: answered with the whole file
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("bytes=5-2", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+    with pytest.raises(ValueError):
+        parse_range("bytes=-0", 100)
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("*") is not None
+    assert choose_encoding("") is None
+
+def test_etag_matches():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+
+def test_iter_zip_streams_a_valid_archive(tmp_path):
+    first = tmp_path / "a.md"
+    first.write_bytes(b"# A\n" * 50000)
+    second = tmp_path / "b.md"
+    second.write_text("# B", encoding="utf-8")
+
+    chunks = list(iter_zip([(str(first), "ollama/a.md"), (str(second), "gemini/b.md")]))
+
+    assert len(chunks) > 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == ["ollama/a.md", "gemini/b.md"]
+        assert archive.read("ollama/a.md") == first.read_bytes()
+        assert archive.read("gemini/b.md") == b"# B"
@@ -0,0 +1,104 @@
+import os
+import random
+import statistics
+import time
+
+import pytest
+
+from app.research.crew_common import knowledge_index
+from app.research.crew_common.knowledge_index import KnowledgeIndex, split_passages
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    # Tests rewrite files within the filesystem's mtime resolution
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+@pytest.fixture
+def knowledge(tmp_path):
+    root = tmp_path / "knowledge"
+    write(root / "user_preference.txt", "User name is John Doe. He is an AI Engineer interested in AI Agents.")
+    write(root / "gpus.md", "# GPUs\n\nGraphics cards run matrix multiplications for neural networks.")
+    write(root / "reports" / "2025" / "cooking.md", "Pasta is boiled in salted water for ten minutes.")
+    write(root / "notes.pdf", "AI Agents")
+    return root
+
+def test_split_passages_packs_paragraphs():
+    text = "one two three\n\nfour five\n\n" + " ".join(["word"] * 7)
+    assert split_passages(text, max_words=5) == ["one two three four five", "word word word word word", "word word"]
+
+def test_search_ranks_matching_passages_first(knowledge):
+    index = KnowledgeIndex([str(knowledge)])
+    results = index.search("Which agents does the AI engineer like?", k=2)
+    assert [os.path.basename(result.source) for result in results] == ["user_preference.txt"]
+    assert index.search("boiled pasta")[0].text.startswith("Pasta is boiled")
+    assert index.search("quantum chromodynamics") == []
+    # Only markdown and text files are indexed
+    assert len(index) == 3
+
+def test_refresh_only_reindexes_changed_files(knowledge):
+    index = KnowledgeIndex([str(knowledge)], refresh_interval=0)
+    assert index.refresh() == 3
+    assert index.refresh() == 0
+
+    write(knowledge / "gpus.md", "TPUs are accelerators for tensor workloads.")
+    (knowledge / "reports" / "2025" / "cooking.md").unlink()
+    write(knowledge / "rust.md", "Rust is a systems programming language.")
+    assert index.refresh() == 3
+    assert index.search("matrix multiplications") == []
+    assert index.search("boiled pasta") == []
+    assert index.search("tensor accelerators")[0].source.endswith("gpus.md")
+    assert index.search("systems language")[0].source.endswith("rust.md")
+
+def test_search_picks_up_changes_after_the_refresh_interval(knowledge):
+    index = KnowledgeIndex([str(knowledge)], refresh_interval=3600)
+    assert index.search("rust") == []
+    write(knowledge / "rust.md", "Rust is a systems programming language.")
+    assert index.search("rust") == []
+    index.refresh_interval = 0
+    assert index.search("rust")[0].source.endswith("rust.md")
+
+def test_lookup_is_fast_for_thousands_of_passages(tmp_path):
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    for i in range(200):
+        paragraphs = [" ".join(rng.choices(vocabulary, k=100)) for _ in range(10)]
+        write(tmp_path / f"doc{i}.md", "\n\n".join(paragraphs))
+    index = KnowledgeIndex([str(tmp_path)], max_words=100, refresh_interval=3600)
+    index.refresh()
+    assert len(index) == 2000
+
+    timings = []
+    for _ in range(50):
+        query = " ".join(rng.choices(vocabulary, k=4))
+        start = time.perf_counter()
+        index.search(query, k=5)
+        timings.append(time.perf_counter() - start)
+    assert statistics.median(timings) < 0.01
+
+@pytest.mark.skipif(knowledge_index.np is None, reason="NumPy is not installed")
+def test_embeddings_are_memory_mapped_and_reused(knowledge, tmp_path):
+    # One dimension per topic, set when any of its words occurs in the text
+    topics = [("agent",), ("gpu", "graphics"), ("pasta",)]
+    embedded = []
+
+    def embed(texts):
+        embedded.extend(texts)
+        return [[float(any(word in text.lower() for word in words)) for words in topics] for text in texts]
+
+    index_dir = tmp_path / "index"
+    index = KnowledgeIndex([str(knowledge)], index_dir=str(index_dir), embed=embed)
+    index.refresh()
+    assert len(embedded) == 3
+    assert (index_dir / "embeddings.npy").exists()
+    assert isinstance(index._vectors, knowledge_index.np.memmap)
+    # No word in common with the passage: found by its vector
+    assert index.search("which gpu", k=1)[0].source.endswith("gpus.md")
+
+    # A new process reuses the stored vectors; only new passages are embedded
+    embedded.clear()
+    write(knowledge / "more.md", "Pasta recipes for AI agents.")
+    reopened = KnowledgeIndex([str(knowledge)], index_dir=str(index_dir), embed=embed)
+    reopened.refresh()
+    assert embedded == ["Pasta recipes for AI agents."]
@@ -0,0 +1,57 @@
+import pytest
+
+from app.research.crew_common.llm_cache import LLMCacheMiss, LLMCallCache
+
+MESSAGES = [{"role": "user", "content": "Summarize AI news"}]
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMCallCache(str(tmp_path / "llm_cache.sqlite3"))
+    yield cache
+    cache.close()
+
+def test_record_mode_only_calls_the_model_for_new_prompts(cache):
+    calls = []
+
+    def generate(text):
+        def call():
+            calls.append(text)
+            return text
+        return call
+
+    options = {"temperature": 0.2}
+    assert cache.call("record", "ollama/smollm2", MESSAGES, options, generate("first")) == "first"
+    assert cache.call("record", "ollama/smollm2", MESSAGES, options, generate("second")) == "first"
+    # Any change to model, messages or options is a different call
+    assert cache.call("record", "ollama/llama3", MESSAGES, options, generate("other model")) == "other model"
+    assert cache.call("record", "ollama/smollm2", MESSAGES, {"temperature": 0.7}, generate("hot")) == "hot"
+    assert calls == ["first", "other model", "hot"]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+def test_replay_and_passthrough_modes(cache):
+    cache.call("record", "m", MESSAGES, {}, lambda: "recorded")
+
+    assert cache.call("replay", "m", MESSAGES, {}, lambda: "live") == "recorded"
+    with pytest.raises(LLMCacheMiss):
+        cache.call("replay", "m", [{"role": "user", "content": "new"}], {}, lambda: "live")
+    assert cache.call("passthrough", "m", MESSAGES, {}, lambda: "live") == "live"
+    # Non-text responses (e.g. tool calls) are not stored
+    cache.call("record", "m", "tools", {}, lambda: {"tool": "search"})
+    assert cache.get(cache.make_key("m", "tools", {})) is None
+
+def test_cache_is_persistent_and_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    cache = LLMCallCache(path, max_bytes=300)
+    for name in ("a", "b"):
+        cache.set(name, "m", name * 100)
+    cache.get("a")
+    cache.set("c", "m", "c" * 100)
+    cache.close()
+
+    reopened = LLMCallCache(path, max_bytes=300)
+    try:
+        assert reopened.get("a") == "a" * 100
+        assert reopened.get("b") is None
+        assert reopened.get("c") == "c" * 100
+    finally:
+        reopened.close()
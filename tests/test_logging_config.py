@@ -0,0 +1,71 @@
+import json
+import logging
+import queue
+
+from app import logging_config
+from app.logging_config import AsyncQueueHandler, JsonFormatter, parse_levels, request_id_var, setup_logging, shutdown_logging
+
+def make_logger(name, max_field_chars=2000, size=100):
+    log_queue = queue.Queue(size)
+    handler = AsyncQueueHandler(log_queue, max_field_chars=max_field_chars)
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger, log_queue, handler
+
+def formatted(log_queue):
+    return json.loads(JsonFormatter().format(log_queue.get_nowait()))
+
+def test_records_are_json_with_request_id_and_extra_fields():
+    logger, log_queue, _ = make_logger("test.json")
+    token = request_id_var.set("req-123")
+    try:
+        logger.info("Queued %s", "job", extra={"job_id": "abc"})
+    finally:
+        request_id_var.reset(token)
+
+    entry = formatted(log_queue)
+    assert entry["message"] == "Queued job"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "req-123"
+    assert entry["job_id"] == "abc"
+
+def test_large_payloads_are_truncated_before_queueing():
+    logger, log_queue, _ = make_logger("test.truncate", max_field_chars=10)
+    logger.debug("x" * 50, extra={"stdout": "y" * 1000})
+
+    entry = formatted(log_queue)
+    assert entry["message"] == "x" * 10 + "...[truncated 40 chars]"
+    assert entry["stdout"].startswith("y" * 10 + "...[truncated 990")
+
+def test_exceptions_keep_their_traceback():
+    logger, log_queue, _ = make_logger("test.exc")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+
+    assert "ValueError: boom" in formatted(log_queue)["exc_info"]
+
+def test_full_queue_drops_instead_of_blocking():
+    logger, log_queue, handler = make_logger("test.full", size=1)
+    logger.info("one")
+    logger.info("two")
+
+    assert log_queue.qsize() == 1
+    assert handler.dropped == 1
+
+def test_parse_per_module_levels():
+    assert parse_levels("app.main=debug, httpx=WARNING,bogus") == {"app.main": "DEBUG", "httpx": "WARNING"}
+
+def test_shutdown_stops_the_writer_and_restores_root_handlers():
+    root = logging.getLogger()
+    before = list(root.handlers)
+    setup_logging()
+    listener = logging_config._listener
+    assert [type(handler) for handler in root.handlers] == [AsyncQueueHandler]
+
+    shutdown_logging()
+    assert root.handlers == before
+    assert listener._thread is None and logging_config._listener is None
@@ -0,0 +1,50 @@
+import pytest
+
+from app.metrics import Counter, Gauge, Histogram, Registry, observe_generation, OLLAMA_TOKENS_PER_SECOND
+
+def test_counter_and_gauge_render_with_labels():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests.", ["route"]))
+    in_flight = registry.register(Gauge("in_flight", "In flight."))
+    requests.inc(route="/api/chat")
+    requests.inc(2, route='/say "hi"')
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/api/chat"} 1' in text
+    assert 'requests_total{route="/say \\"hi\\""} 2' in text
+    assert "in_flight 1" in text
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", ["model"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 5):
+        histogram.observe(value, model="llama3")
+
+    lines = histogram.samples()
+    assert 'latency_seconds_bucket{model="llama3",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{model="llama3",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{model="llama3",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{model="llama3"} 4' in lines
+    assert 'latency_seconds_sum{model="llama3"} 6.25' in lines
+
+def test_wrong_labels_rejected():
+    counter = Counter("errors_total", "Errors.", ["model"])
+    with pytest.raises(ValueError):
+        counter.inc(route="/")
+
+def test_collectors_run_before_render():
+    registry = Registry()
+    depth = registry.register(Gauge("queue_depth", "Queue depth."))
+    registry.add_collector(lambda: depth.set(7))
+
+    assert "queue_depth 7" in registry.render()
+
+def test_tokens_per_second_from_ollama_stats():
+    before = OLLAMA_TOKENS_PER_SECOND.count(model="stats-test")
+    observe_generation("stats-test", {"eval_count": 50, "eval_duration": 2_000_000_000})
+
+    assert OLLAMA_TOKENS_PER_SECOND.count(model="stats-test") == before + 1
+    assert OLLAMA_TOKENS_PER_SECOND.values[("stats-test",)][1] == 25
@@ -0,0 +1,47 @@
+import asyncio
+
+from app.model_registry import ModelRegistry
+
+def counting_fetcher(delay=0.0, complete=True):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return [{"name": f"model-{len(calls)}", "backend": "ollama"}], complete
+
+    return fetch, calls
+
+async def test_concurrent_cold_requests_share_one_fetch():
+    registry = ModelRegistry(ttl=60)
+    fetch, calls = counting_fetcher(delay=0.05)
+
+    results = await asyncio.gather(*(registry.get(fetch) for _ in range(10)))
+
+    assert len(calls) == 1
+    assert all(models == results[0] for models in results)
+    assert registry.max_age() > 0
+
+async def test_stale_list_is_served_while_refreshing():
+    registry = ModelRegistry(ttl=0, stale_ttl=60)
+    fetch, calls = counting_fetcher(delay=0.05)
+    first = await registry.get(fetch)
+    first_etag = registry.etag
+
+    # Stale: returned immediately, refresh runs in the background
+    assert await registry.get(fetch) == first
+    assert await registry.get(fetch) == first
+    await asyncio.sleep(0.1)
+
+    assert len(calls) == 2
+    assert registry.models[0]["name"] == "model-2"
+    assert registry.etag != first_etag
+
+async def test_incomplete_list_uses_error_ttl():
+    registry = ModelRegistry(ttl=60, error_ttl=0, stale_ttl=0)
+    fetch, calls = counting_fetcher(complete=False)
+
+    await registry.get(fetch)
+    await registry.get(fetch)
+
+    assert len(calls) == 2
@@ -0,0 +1,118 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "agentic_workflow", "crewai_ollama_native", "src"))
+
+from crewai_ollama_native.llm.ollama_chat import LLMCallStats, OllamaChat, settings_from_env  # noqa: E402
+
+CHUNKS = [
+    {"message": {"role": "assistant", "content": "Hello"}, "done": False},
+    {"message": {"role": "assistant", "content": " world"}, "done": False},
+    {"message": {"role": "assistant", "content": ""}, "done": True,
+     "prompt_eval_count": 12, "eval_count": 3, "load_duration": 500_000_000},
+]
+
+class FakeClient:
+    """Stands in for ollama.Client: records chat() arguments and streams CHUNKS."""
+
+    def __init__(self):
+        self.requests = []
+
+    def chat(self, **kwargs):
+        self.requests.append(kwargs)
+        return iter(CHUNKS)
+
+class FakeAsyncClient(FakeClient):
+    """Stands in for ollama.AsyncClient."""
+
+    async def chat(self, **kwargs):
+        self.requests.append(kwargs)
+
+        async def stream():
+            for chunk in CHUNKS:
+                yield chunk
+        return stream()
+
+def test_call_streams_tokens_to_on_token():
+    tokens = []
+    llm = OllamaChat(model="smollm2:135m", on_token=tokens.append, client=FakeClient())
+
+    assert llm.call("Say hello") == "Hello world"
+    assert tokens == ["Hello", " world"]
+
+async def test_call_accepts_crewai_keyword_arguments():
+    llm = OllamaChat(client=FakeClient(), async_client=FakeAsyncClient())
+
+    assert llm.call("Say hello", from_task=object(), from_agent=object()) == "Hello world"
+    assert await llm.acall("Say hello", from_task=object(), from_agent=object()) == "Hello world"
+    assert len(llm.stats) == 2
+
+def test_request_carries_keep_alive_options_and_stop():
+    llm = OllamaChat(model="ollama/llama3", keep_alive="5m", options={"num_ctx": 4096}, temperature=0.2,
+                     client=FakeClient())
+    # Set by crewAI for the ReAct loop
+    llm.stop = ["\nObservation:"]
+    llm.call([{"role": "user", "content": "Hi"}])
+
+    request = llm.client.requests[0]
+    assert llm.model == "llama3"
+    assert request["model"] == "llama3"
+    assert request["stream"] is True
+    assert request["keep_alive"] == "5m"
+    assert request["options"] == {"num_ctx": 4096, "temperature": 0.2, "stop": ["\nObservation:"]}
+    assert request["messages"] == [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": "Hi"},
+    ]
+
+def test_call_records_stats():
+    reported = []
+    llm = OllamaChat(on_stats=reported.append, max_stats=2, client=FakeClient())
+    for _ in range(3):
+        llm.call("Say hello")
+
+    stats = llm.stats[-1]
+    assert isinstance(stats, LLMCallStats)
+    assert reported[-1] == stats
+    assert (stats.model, stats.prompt_tokens, stats.completion_tokens) == ("smollm2", 12, 3)
+    assert stats.load_duration_s == 0.5
+    assert 0 <= stats.time_to_first_token_s <= stats.latency_s
+    # Only the last max_stats calls are kept
+    assert len(llm.stats) == 2
+    assert llm.total_stats()["completion_tokens"] == 6
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("OLLAMA_MODEL", "ollama/qwen2:0.5b")
+    monkeypatch.setenv("OLLAMA_HOST", "http://gpu:11434")
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "1h")
+    monkeypatch.setenv("OLLAMA_NUM_CTX", "4096")
+    monkeypatch.setenv("OLLAMA_NUM_PREDICT", "256")
+
+    assert settings_from_env() == {
+        "model": "ollama/qwen2:0.5b",
+        "host": "http://gpu:11434",
+        "keep_alive": "1h",
+        "options": {"num_ctx": 4096, "num_predict": 256},
+    }
+    assert settings_from_env(keep_alive=0)["keep_alive"] == 0
+
+def test_crewai_llm_and_agent_options(monkeypatch):
+    pytest.importorskip("crewai")
+    # agents_ollama builds its shared LLM with a real client at import
+    pytest.importorskip("ollama")
+    monkeypatch.setenv("OLLAMA_NUM_CTX", "4096")
+    from crewai_ollama_native.config.agents_ollama import agent_llm, create_llm
+
+    llm = create_llm(client=FakeClient())
+    assert llm.call("Say hello", from_task=None, from_agent=None) == "Hello world"
+    assert llm.get_context_window_size() == 4096
+
+    # Agents without llm_options share the one instance, the others get their own
+    assert agent_llm({"role": "Researcher"}, llm) is llm
+    config = {"role": "Writer", "llm_options": {"num_predict": 64, "temperature": 0.1}}
+    writer_llm = agent_llm(config, llm)
+    assert writer_llm is not llm
+    assert writer_llm.options == {"num_ctx": 4096, "num_predict": 64, "temperature": 0.1}
+    assert config == {"role": "Writer"}
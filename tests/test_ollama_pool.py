@@ -0,0 +1,71 @@
+import httpx
+
+from app.ollama_pool import OllamaPool, base_url
+
+def test_base_url_accepts_generate_endpoint():
+    assert base_url("http://gpu-1:11434/api/generate") == "http://gpu-1:11434"
+    assert base_url(" http://gpu-1:11434/ ") == "http://gpu-1:11434"
+
+def test_pick_least_outstanding():
+    pool = OllamaPool(["http://a:11434", "http://b:11434"])
+    first = pool.pick("llama3")
+    second = pool.pick("llama3")
+
+    assert {first.url, second.url} == {"http://a:11434", "http://b:11434"}
+    pool.release(first)
+    assert pool.pick("llama3") is first
+
+def test_pick_prefers_backend_with_model_loaded():
+    pool = OllamaPool(["http://a:11434", "http://b:11434"], affinity_weight=2)
+    a, b = pool.backends
+    b.loaded_models.add("llama3:latest")
+    b.outstanding = 1
+
+    assert pool.pick("llama3") is b
+    # Two more in flight than the idle host outweighs the affinity bonus
+    assert pool.pick("llama3") is a
+
+def test_pick_skips_backends_without_the_model():
+    pool = OllamaPool(["http://a:11434", "http://b:11434", "http://c:11434"])
+    a, b, c = pool.backends
+    a.installed_models = {"mistral:latest"}
+    b.installed_models = {"llama3:latest"}
+    # c hasn't been checked yet, so it may have any model
+
+    assert {pool.pick("llama3").url for _ in range(4)} == {b.url, c.url}
+    pool.model_missing(b, "llama3")
+    assert pool.pick("llama3", exclude=[c]) is a # Nobody has it: Ollama reports the error
+
+def test_backend_ejected_after_repeated_errors():
+    pool = OllamaPool(["http://a:11434", "http://b:11434"], eject_after=2, eject_seconds=60)
+    a, b = pool.backends
+    for _ in range(2):
+        pool.release(pool.pick(exclude=[b]), failed=True)
+
+    assert pool.stats()[0]["ejected"] is True
+    assert [pool.pick() for _ in range(3)] == [b, b, b]
+
+def test_all_backends_down_still_tries_them():
+    pool = OllamaPool(["http://a:11434"], eject_after=1)
+    backend = pool.pick()
+    pool.release(backend, failed=True)
+
+    assert pool.pick() is backend
+
+async def test_health_check_tracks_loaded_models_and_failures():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "down":
+            raise httpx.ConnectError("connection refused", request=request)
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [{"name": "mistral:7b"}, {"name": "llama3:latest"}]})
+        return httpx.Response(200, json={"models": [{"name": "mistral:7b", "model": "mistral:7b"}]})
+
+    pool = OllamaPool(["http://up:11434", "http://down:11434"])
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await pool.check_all(client)
+
+    up, down = pool.backends
+    assert up.healthy and up.loaded_models == {"mistral:7b"}
+    assert up.installed_models == {"mistral:7b", "llama3:latest"}
+    assert not down.healthy
+    assert pool.pick("mistral:7b") is up
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from app.research.crew_common.report_sections import (
+    assemble_report, clean_section, parse_bullets, run_bounded, section_title
+)
+
+RESEARCH = """Here is what I found:
+
+1. **Open weights** are catching up with closed models,
+   e.g. Llama 3 and Mistral.
+   - Licenses vary
+2. Agents - tool use becomes standard.
+* Context windows: now over 100k tokens
+
+These trends will continue.
+"""
+
+def test_parse_bullets_joins_wrapped_and_nested_lines():
+    assert parse_bullets(RESEARCH) == [
+        "**Open weights** are catching up with closed models, e.g. Llama 3 and Mistral. - Licenses vary",
+        "Agents - tool use becomes standard.",
+        "Context windows: now over 100k tokens",
+    ]
+    assert parse_bullets("Just a paragraph.") == ["Just a paragraph."]
+    assert parse_bullets("  ") == []
+
+def test_sections_are_titled_and_assembled_in_order():
+    titles = [section_title(item) for item in parse_bullets(RESEARCH)]
+    assert titles == ["Open weights", "Agents", "Context windows"]
+    assert clean_section("```markdown\nBody text\n```", "Agents") == "## Agents\n\nBody text"
+    assert clean_section("## Own heading\nBody", "Agents") == "## Own heading\nBody"
+    assert assemble_report("AI", ["## A", "## B"]) == "# AI Report\n\n## A\n\n## B\n"
+
+def test_run_bounded_keeps_order_and_limits_concurrency():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def generate(index, item):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02 * (5 - index))
+        with lock:
+            running[0] -= 1
+        return f"{index}:{item}"
+
+    assert run_bounded(list("abcde"), generate, 2) == ["0:a", "1:b", "2:c", "3:d", "4:e"]
+    assert peak[0] == 2
+    assert run_bounded([], generate, 2) == []
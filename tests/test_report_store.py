@@ -0,0 +1,104 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.report_store import ReportStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReportStore(str(tmp_path / "reports"))
+    yield store
+    store.close()
+
+async def add(store, tmp_path, name, topic="topic", model="ollama/llama3", backend="ollama"):
+    source = tmp_path / name
+    source.write_text(f"# {topic}\n", encoding="utf-8")
+    return await store.import_report(str(source), topic=topic, model=model, backend=backend,
+                                     started_at=100.0, finished_at=112.5)
+
+async def test_import_moves_report_into_dated_directory(store, tmp_path):
+    record = await add(store, tmp_path, "report.md", topic="AI trends")
+
+    assert not (tmp_path / "report.md").exists()
+    path = store.full_path(record)
+    assert os.path.exists(path)
+    assert record["path"] == os.path.join(time.strftime("%Y/%m/%d"), "report.md")
+    assert record["size"] == len("# AI trends\n")
+    assert len(record["sha256"]) == 64
+    assert record["duration_s"] == 12.5
+    assert await store.get(record["id"]) == record
+    assert await store.find("ollama", "report.md") == record
+
+async def test_list_paginates_newest_first(store, tmp_path):
+    ids = []
+    for i in range(5):
+        ids.append((await add(store, tmp_path, f"r{i}.md", backend="gemini" if i % 2 else "ollama"))["id"])
+        await asyncio.sleep(0.01)
+
+    page, total = await store.list(limit=2, offset=1)
+    assert total == 5
+    assert [r["id"] for r in page] == [ids[3], ids[2]]
+    page, total = await store.list(backend="gemini")
+    assert total == 2
+    assert [r["id"] for r in page] == [ids[3], ids[1]]
+
+async def test_search_matches_topic_model_and_filename(store, tmp_path):
+    await add(store, tmp_path, "research_ai.md", topic="AI trends")
+    await add(store, tmp_path, "research_sports.md", topic="Baseball", model="gemini/gemini-1.5-pro-latest")
+    await add(store, tmp_path, "research_100_percent.md", topic="Growth")
+
+    assert [r["topic"] for r in (await store.search("ai t"))[0]] == ["AI trends"]
+    assert [r["topic"] for r in (await store.search("GEMINI"))[0]] == ["Baseball"]
+    assert [r["topic"] for r in (await store.search("sports"))[0]] == ["Baseball"]
+    # LIKE wildcards in the query are matched literally
+    assert (await store.search("%"))[1] == 0
+    assert [r["topic"] for r in (await store.search("_percent"))[0]] == ["Growth"]
+
+async def test_gc_applies_age_and_count_limits(tmp_path):
+    store = ReportStore(str(tmp_path / "reports"), retention_days=1, max_reports=2)
+    old = await add(store, tmp_path, "old.md")
+    with store._lock:
+        store._db.execute("UPDATE reports SET created_at = ? WHERE id = ?", (time.time() - 2 * 86400, old["id"]))
+        store._db.commit()
+    kept = []
+    for i in range(3):
+        await asyncio.sleep(0.01)
+        kept.append(await add(store, tmp_path, f"new{i}.md"))
+
+    assert await store.gc() == 2
+    records, total = await store.list()
+    assert total == 2
+    assert [r["id"] for r in records] == [kept[2]["id"], kept[1]["id"]]
+    assert not os.path.exists(store.full_path(old))
+    assert not os.path.exists(store.full_path(kept[0]))
+    store.close()
+
+async def test_find_cached_returns_newest_fresh_report(store, tmp_path):
+    source = tmp_path / "a.md"
+    source.write_text("a", encoding="utf-8")
+    old = await store.import_report(str(source), topic="AI", model="m", backend="ollama", cache_key="key")
+    with store._lock:
+        store._db.execute("UPDATE reports SET created_at = created_at - 100 WHERE id = ?", (old["id"],))
+        store._db.commit()
+
+    assert (await store.find_cached("key", max_age=1000))["id"] == old["id"]
+    assert await store.find_cached("key", max_age=50) is None
+    assert await store.find_cached("other", max_age=1000) is None
+
+    source = tmp_path / "b.md"
+    source.write_text("b", encoding="utf-8")
+    new = await store.import_report(str(source), topic="AI", model="m", backend="ollama", cache_key="key")
+    assert (await store.find_cached("key", max_age=1000))["id"] == new["id"]
+    # A report whose file is gone is not served
+    os.remove(store.full_path(new))
+    assert (await store.find_cached("key", max_age=1000))["id"] == old["id"]
+
+async def test_delete_removes_file_and_entry(store, tmp_path):
+    record = await add(store, tmp_path, "report.md")
+
+    assert await store.delete(record["id"])
+    assert not os.path.exists(store.full_path(record))
+    assert await store.get(record["id"]) is None
+    assert not await store.delete(record["id"])
@@ -0,0 +1,40 @@
+import os
+import time
+
+import pytest
+
+from app.research_checkpoints import CheckpointStore
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / "checkpoints"), ttl=60)
+
+async def test_save_load_and_delete(store):
+    request = {"topic": "AI", "model": "llama3", "backend": "ollama"}
+    await store.save("abc123", request, {"research_task": "- point 1"})
+
+    checkpoint = await store.load("abc123")
+    assert checkpoint["request"] == request
+    assert checkpoint["tasks"] == {"research_task": "- point 1"}
+    assert await store.load("missing") is None
+    # Ids that aren't plain job ids never reach the filesystem
+    assert await store.load("../abc123") is None
+
+    assert await store.delete("abc123") is True
+    assert await store.load("abc123") is None
+    assert await store.delete("abc123") is False
+
+async def test_checkpoints_expire(store):
+    await store.save("old", {}, {"research_task": "x"})
+    await store.save("new", {}, {"research_task": "y"})
+    old_path = os.path.join(store.root, "old.json")
+    past = time.time() - 120
+    os.utime(old_path, (past, past))
+
+    assert await store.gc() == 1
+    assert not os.path.exists(old_path)
+    assert await store.load("new") is not None
+
+    store.ttl = 0
+    # Expired checkpoints are not returned even before the next GC run
+    assert await store.load("new") is None
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from app.scheduler import ModelScheduler, QueueFullError, QueueTimeoutError
+
+async def test_per_model_concurrency_cap():
+    scheduler = ModelScheduler(per_model_concurrency=2, max_active_models=1)
+    await scheduler.acquire("llama3")
+    await scheduler.acquire("llama3")
+    third = asyncio.create_task(scheduler.acquire("llama3"))
+    await asyncio.sleep(0.01)
+
+    assert not third.done()
+    assert scheduler.stats()["models"]["llama3"] == {"running": 2, "queued": 1}
+    scheduler.release("llama3")
+    await asyncio.wait_for(third, 1)
+    assert scheduler.queue_depth() == 0
+
+async def test_models_are_not_limited_by_default():
+    scheduler = ModelScheduler(per_model_concurrency=1)
+    for model in ("llama3", "mistral", "phi3"):
+        await asyncio.wait_for(scheduler.acquire(model), 1)
+    assert scheduler.stats()["running"] == 3
+    assert scheduler.retry_after() >= 1
+
+async def test_limits_scale_with_backends():
+    scheduler = ModelScheduler(per_model_concurrency=2, max_active_models=1, backends=3)
+    for _ in range(6):
+        await asyncio.wait_for(scheduler.acquire("llama3"), 1)
+    # Other models fit on the other backends' slots
+    await asyncio.wait_for(scheduler.acquire("mistral"), 1)
+    await asyncio.wait_for(scheduler.acquire("phi3"), 1)
+    seventh = asyncio.create_task(scheduler.acquire("llama3"))
+    await asyncio.sleep(0.01)
+    assert not seventh.done()
+
+    # A backend coming back adds slots for the waiting request
+    scheduler.set_backends(4)
+    await asyncio.wait_for(seventh, 1)
+    assert scheduler.stats()["backends"] == 4
+
+async def test_loaded_model_is_admitted_before_other_models():
+    scheduler = ModelScheduler(per_model_concurrency=1, max_active_models=1, switch_after=60)
+    await scheduler.acquire("llama3")
+    order = []
+
+    async def request(model):
+        await scheduler.acquire(model)
+        order.append(model)
+
+    other = asyncio.create_task(request("mistral"))
+    await asyncio.sleep(0.01)
+    same = asyncio.create_task(request("llama3"))
+    await asyncio.sleep(0.01)
+
+    scheduler.release("llama3")
+    await asyncio.sleep(0.01)
+    # The llama3 request arrived later but doesn't need a weight reload
+    assert order == ["llama3"]
+    scheduler.release("llama3")
+    await asyncio.gather(other, same)
+    assert order == ["llama3", "mistral"]
+
+async def test_starving_model_gets_a_turn():
+    scheduler = ModelScheduler(per_model_concurrency=1, max_active_models=1, switch_after=0.01)
+    await scheduler.acquire("llama3")
+    other = asyncio.create_task(scheduler.acquire("mistral"))
+    await asyncio.sleep(0.02)
+    same = asyncio.create_task(scheduler.acquire("llama3"))
+    await asyncio.sleep(0.01)
+
+    scheduler.release("llama3")
+    await asyncio.wait_for(other, 1)
+    assert not same.done()
+    scheduler.release("mistral")
+    await asyncio.wait_for(same, 1)
+
+async def test_full_queue_rejects_immediately():
+    scheduler = ModelScheduler(per_model_concurrency=1, max_queue=1)
+    await scheduler.acquire("llama3")
+    waiting = asyncio.create_task(scheduler.acquire("llama3"))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(QueueFullError) as excinfo:
+        await scheduler.acquire("llama3")
+    assert excinfo.value.retry_after >= 1
+    assert scheduler.stats()["rejected"] == 1
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+    assert scheduler.queue_depth() == 0
+
+async def test_queue_timeout():
+    scheduler = ModelScheduler(per_model_concurrency=1, queue_timeout=0.01)
+    await scheduler.acquire("llama3")
+
+    with pytest.raises(QueueTimeoutError):
+        await scheduler.acquire("llama3")
+    assert scheduler.queue_depth() == 0
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight, StreamFanout
+
+async def test_single_flight_shares_result_and_errors():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    assert await asyncio.gather(*(flights.do("k", work) for _ in range(3))) == ["result"] * 3
+    assert len(calls) == 1
+    assert flights.in_flight() == 0
+
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await flights.do("k", fail)
+
+def make_source(chunks, closed, delay=0.01):
+    async def source():
+        async def iterate():
+            for chunk in chunks:
+                await asyncio.sleep(delay)
+                yield chunk
+
+        async def aclose():
+            closed.append(True)
+
+        return iterate(), aclose
+    return source
+
+async def collect(iterator):
+    return [chunk async for chunk in iterator]
+
+async def test_late_subscriber_replays_earlier_chunks():
+    fanout = StreamFanout()
+    closed = []
+    source = make_source(["a", "b", "c"], closed)
+
+    first = await fanout.join("k", source)
+    first_task = asyncio.create_task(collect(first))
+    await asyncio.sleep(0.025)
+    second = await fanout.join("k", source)
+
+    assert await collect(second) == ["a", "b", "c"]
+    assert await first_task == ["a", "b", "c"]
+    assert closed == [True]
+    assert fanout.in_flight() == 0
+
+async def test_upstream_cancelled_when_all_subscribers_leave():
+    fanout = StreamFanout()
+    closed = []
+    iterator = await fanout.join("k", make_source(["a"] * 100, closed))
+
+    assert await iterator.__anext__() == "a"
+    await iterator.aclose()
+    await asyncio.sleep(0.02)
+
+    assert closed == [True]
+    assert fanout.in_flight() == 0
+
+async def test_closing_a_subscription_that_was_never_iterated_releases_it():
+    fanout = StreamFanout()
+    closed = []
+    source = make_source(["a"] * 100, closed)
+    first = await fanout.join("k", source)
+    second = await fanout.join("k", source)
+
+    await first.aclose()
+    assert await second.__anext__() == "a"
+    await second.aclose()
+    await asyncio.sleep(0.02)
+
+    assert closed == [True]
+    assert fanout.in_flight() == 0
+    with pytest.raises(StopAsyncIteration):
+        await first.__anext__()
+
+async def test_open_errors_reach_every_subscriber():
+    fanout = StreamFanout()
+
+    async def source():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(fanout.join("k", source), fanout.join("k", source), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
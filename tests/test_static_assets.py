@@ -0,0 +1,68 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.static_assets import IMMUTABLE, REVALIDATE, StaticAssets
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "index.html").write_text(
+        '<link href="/static/style.css"><script src="/static/script.js"></script>'
+        '<img src="/static/missing.png">', encoding="utf-8")
+    (tmp_path / "script.js").write_text("console.log('hello');\n" * 200, encoding="utf-8")
+    (tmp_path / "style.css").write_text("body { margin: 0; }", encoding="utf-8")
+    return tmp_path
+
+@pytest.fixture
+def client(static_dir):
+    assets = StaticAssets(str(static_dir))
+    app = FastAPI()
+
+    @app.get("/")
+    async def index(request: Request):
+        return await assets.response(request, assets.index)
+
+    @app.get("/static/{name:path}")
+    async def static_file(name: str, request: Request):
+        return await assets.response(request, name)
+
+    return TestClient(app), assets
+
+def test_index_references_hashed_assets(client):
+    test_client, assets = client
+    html = test_client.get("/").text
+
+    script = assets.hashed["script.js"]
+    assert script.startswith("script.") and script.endswith(".js") and script != "script.js"
+    assert f'src="/static/{script}"' in html
+    assert f'href="/static/{assets.hashed["style.css"]}"' in html
+    # Unknown references are left alone
+    assert 'src="/static/missing.png"' in html
+    assert test_client.get("/").headers["cache-control"] == REVALIDATE
+
+def test_hashed_assets_are_immutable_and_compressed(client, static_dir):
+    test_client, assets = client
+    response = test_client.get(f"/static/{assets.hashed['script.js']}", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/javascript")
+    assert response.text == (static_dir / "script.js").read_text(encoding="utf-8")
+    assert int(response.headers["content-length"]) == len(gzip.compress((static_dir / "script.js").read_bytes(), 9, mtime=0))
+
+    plain = test_client.get("/static/script.js", headers={"Accept-Encoding": "identity"})
+    assert plain.headers["cache-control"] == REVALIDATE
+    assert "content-encoding" not in plain.headers
+    revalidated = test_client.get("/static/script.js", headers={"Accept-Encoding": "identity", "If-None-Match": plain.headers["etag"]})
+    assert revalidated.status_code == 304
+
+    # Too small to be worth compressing
+    assert "content-encoding" not in test_client.get("/static/style.css").headers
+    assert test_client.get("/static/nope.js").status_code == 404
+
+def test_large_files_are_streamed_from_disk(static_dir):
+    assets = StaticAssets(str(static_dir), max_memory_bytes=100)
+    assert assets.assets["script.js"].body is None
+    assert assets.assets["style.css"].body is not None